@@ -1,15 +1,40 @@
 import os
+import re
+import glob
+import html
+import json
+import stat
+import shutil
+import subprocess
 import time
+import queue
+import atexit
+import random
+import signal
+import asyncio
+import threading
+import unicodedata
+import base64
+import hashlib
 import logging
+from enum import Enum
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 import calendar
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from email.utils import parsedate_to_datetime
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlparse, parse_qs, parse_qsl, urlencode
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
+from requests.adapters import HTTPAdapter
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.wait import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.chrome.service import Service as ChromeService
 from selenium.webdriver.firefox.service import Service as FirefoxService
 from selenium.webdriver.chrome.options import Options as ChromeOptions
@@ -17,10 +42,15 @@ from selenium.webdriver.firefox.options import Options as FirefoxOptions
 from webdriver_manager.chrome import ChromeDriverManager
 from webdriver_manager.firefox import GeckoDriverManager
 from dotenv import load_dotenv
-import schedule
+from cryptography.fernet import Fernet, InvalidToken
 import pytz
 from typing import Optional, Union
 
+try:
+    import fcntl
+except ImportError:  # Windows - persistent browser profiles are unavailable
+    fcntl = None
+
 # Load environment variables
 load_dotenv()
 
@@ -32,7 +62,7 @@ if not os.path.exists(log_dir):
 
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
+    format='%(asctime)s - %(levelname)s - [%(threadName)s] %(message)s',
     handlers=[
         logging.FileHandler(os.path.join(log_dir, 'gym_reservation.log')),
         logging.StreamHandler()
@@ -40,72 +70,1749 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-class GymReservationCloud:
-    def __init__(self):
-        self.driver: Optional[Union[webdriver.Chrome, webdriver.Firefox]] = None
-        self.wait: Optional[WebDriverWait] = None
-        self.driver_type: Optional[str] = None
-        self.username = os.getenv('CONDOMISOFT_USERNAME')
-        self.password = os.getenv('CONDOMISOFT_PASSWORD')
+# Local state kept between runs (session cache, etc.)
+cache_dir = os.getenv('CACHE_DIR') or ('/app/cache' if os.path.exists('/app') else './cache')
+
+# Default per-step readiness budgets in seconds, overridable with
+# STEP_TIMEOUTS="login=15,apartment=10,calendar=10,slot=10,confirm=10,validate=10"
+DEFAULT_STEP_TIMEOUTS = {
+    "login": 15,
+    "apartment": 10,
+    "calendar": 10,
+    "slot": 10,
+    "confirm": 10,
+    "validate": 10,
+}
+
+# Collects the target (href or onclick) and text of every element linking to a resource page
+COLLECT_RESOURCE_LINKS_SCRIPT = """
+var links = [];
+document.querySelectorAll('[href*="detalle_recursos"], [onclick*="detalle_recursos"]').forEach(function(element) {
+    links.push([element.getAttribute('href') || element.getAttribute('onclick') || '', element.innerText || '']);
+});
+return links;
+"""
+
+# Requests the lean browser profile blocks: images, fonts, media and third-party trackers/widgets
+# (extend with LEAN_BLOCKED_URLS). First-party scripts and stylesheets still load
+LEAN_BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico", "*.bmp",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.mp4", "*.webm", "*.mp3", "*.ogg", "*.wav",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*googlesyndication.com*",
+    "*fonts.googleapis.com*", "*fonts.gstatic.com*", "*facebook.net*", "*connect.facebook.com*",
+    "*hotjar.com*", "*youtube.com*", "*ytimg.com*", "*zopim.com*", "*tawk.to*",
+]
+
+# Elements whose presence means a page is usable, so navigation can return before subresources load
+PAGE_READY_LOCATORS = {
+    "login": (By.XPATH, "//input[@type='password'] | //a[contains(text(), 'Salir') or contains(text(), 'Logout')]"),
+    # Calendar cells, or the login form when the session turned out to be logged out
+    "calendar": (By.XPATH, "//td[@onclick] | //input[@type='password']"),
+}
+
+# Records the time of the last DOM mutation in window.__gymLastMutation
+INSTALL_MUTATION_OBSERVER_JS = """
+if (!window.__gymObserver) {
+    window.__gymLastMutation = performance.now();
+    window.__gymObserver = new MutationObserver(function() { window.__gymLastMutation = performance.now(); });
+    window.__gymObserver.observe(document.documentElement, {childList: true, subtree: true, attributes: true, characterData: true});
+}
+"""
+
+# Page readiness probe: document parsed, no jQuery requests in flight, and neither the
+# DOM nor the network has changed for arguments[0] milliseconds
+PAGE_READY_SCRIPT = """
+var quietMs = arguments[0];
+if (document.readyState !== 'complete' && document.readyState !== 'interactive') return false;
+""" + INSTALL_MUTATION_OBSERVER_JS + """
+var now = performance.now();
+if (window.jQuery && window.jQuery.active > 0) return false;
+var lastNetwork = 0;
+var resources = performance.getEntriesByType('resource');
+for (var i = 0; i < resources.length; i++) {
+    if (resources[i].responseEnd > lastNetwork) lastNetwork = resources[i].responseEnd;
+}
+return (now - window.__gymLastMutation) >= quietMs && (now - lastNetwork) >= quietMs;
+"""
+
+# Remembers the last mutation time right before a click so a DOM update can be detected
+MARK_BEFORE_CLICK_SCRIPT = INSTALL_MUTATION_OBSERVER_JS + """
+window.__gymClickMark = window.__gymLastMutation;
+"""
+
+def get_step_timeouts():
+    """Return the readiness budget for each step, applying STEP_TIMEOUTS overrides"""
+    timeouts = dict(DEFAULT_STEP_TIMEOUTS)
+    for entry in os.getenv('STEP_TIMEOUTS', '').split(','):
+        if '=' not in entry:
+            continue
+        step, value = entry.split('=', 1)
+        try:
+            timeouts[step.strip()] = float(value)
+        except ValueError:
+            logger.warning(f"Ignoring invalid STEP_TIMEOUTS entry: {entry}")
+    return timeouts
+
+class Outcome(Enum):
+    """How a reservation step ended"""
+    CONFIRMED = "confirmed"
+    TOO_EARLY = "too_early"
+    TAKEN_BY_OTHER = "taken_by_other"
+    SESSION_EXPIRED = "session_expired"
+    SELECTOR_MISS = "selector_miss"
+    TIMEOUT = "timeout"
+    NOT_CONFIRMED = "not_confirmed"
+    ERROR = "error"
+
+@dataclass
+class AttemptOutcome:
+    """Result of one reservation step: its outcome, a human-readable message and how long it took"""
+    outcome: Outcome
+    message: str = ""
+    time_slot: Optional[str] = None
+    elapsed: float = 0.0
+
+    @property
+    def success(self):
+        return self.outcome is Outcome.CONFIRMED
+
+# In-session retries allowed per outcome and the first backoff in seconds (doubling per retry);
+# outcomes not listed are final. Override with RETRY_POLICIES=outcome=retries:backoff,...
+DEFAULT_RETRY_POLICIES = {
+    Outcome.TOO_EARLY: (20, 0.5),
+    Outcome.NOT_CONFIRMED: (5, 0.5),
+    Outcome.SELECTOR_MISS: (1, 0.5),
+    Outcome.SESSION_EXPIRED: (2, 0.0),
+    Outcome.TIMEOUT: (5, 1.0),
+    Outcome.TAKEN_BY_OTHER: (0, 0.0),
+}
+
+# When slots fail differently, the first outcome in this order drives the next retry
+RETRY_PRIORITY = [Outcome.SESSION_EXPIRED, Outcome.TIMEOUT, Outcome.TOO_EARLY, Outcome.NOT_CONFIRMED,
+                  Outcome.SELECTOR_MISS, Outcome.TAKEN_BY_OTHER, Outcome.ERROR]
+
+# Outcomes a later scheduled run can fix (the window was not open yet, the site or session failed);
+# the scheduler only reruns an unreserved job for these, and only while their RETRY_POLICIES entry allows retries
+SCHEDULER_RETRY_OUTCOMES = (Outcome.TOO_EARLY, Outcome.TIMEOUT, Outcome.SESSION_EXPIRED)
+
+def get_retry_policies():
+    """Return the in-session retry policy of each outcome, applying RETRY_POLICIES overrides"""
+    policies = dict(DEFAULT_RETRY_POLICIES)
+    for entry in os.getenv('RETRY_POLICIES', '').split(','):
+        if '=' not in entry:
+            continue
+        name, value = entry.split('=', 1)
+        try:
+            retries, _, backoff = value.partition(':')
+            policies[Outcome(name.strip())] = (int(retries), float(backoff or 0))
+        except ValueError:
+            logger.warning(f"Ignoring invalid RETRY_POLICIES entry: {entry}")
+    return policies
+
+def is_transient_error(error):
+    """True for network and timeout errors worth retrying in the same session"""
+    return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout, TimeoutException))
+
+class SessionRetry:
+    """Bounded retry budget for one live session: retries per outcome, backoff with jitter, total deadline"""
+
+    def __init__(self, policies=None, deadline_seconds=None, max_backoff=None, jitter=None, clock=time.monotonic):
+        try:
+            deadline_seconds = float(os.getenv('RETRY_DEADLINE_SECONDS', '120')) if deadline_seconds is None else deadline_seconds
+            self.max_backoff = float(os.getenv('RETRY_MAX_BACKOFF_SECONDS', '8')) if max_backoff is None else max_backoff
+            self.jitter = float(os.getenv('RETRY_JITTER', '0.25')) if jitter is None else jitter
+        except ValueError:
+            logger.warning("Invalid retry settings, using a 120s deadline, 8s backoff ceiling and 25% jitter")
+            deadline_seconds, self.max_backoff, self.jitter = 120.0, 8.0, 0.25
+        self.policies = get_retry_policies() if policies is None else policies
+        self.clock = clock
+        self.deadline = clock() + deadline_seconds
+        self.retries = {}
+
+    def can_retry(self, failure):
+        return self.retries.get(failure, 0) < self.policies.get(failure, (0, 0.0))[0]
+
+    def next_delay(self, failure):
+        """Seconds to wait before retrying after failure, or None if it is final or the budget is spent"""
+        if not self.can_retry(failure):
+            return None
+        backoff = self.policies[failure][1]
+        retry = self.retries.get(failure, 0)
+        delay = min(self.max_backoff, backoff * 2 ** retry)
+        delay = max(0.0, delay * (1 + self.jitter * random.uniform(-1, 1)))
+        if self.clock() + delay > self.deadline:
+            return None
+        self.retries[failure] = retry + 1
+        return delay
+
+# Time slots tried when an account does not configure its own
+DEFAULT_TIME_SLOTS = ["07:30-08:00", "08:00-08:30"]
+
+# Gym days booked (Mon, Wed, Fri); each opens for reservation at midnight 7 days before
+GYM_DAYS = [0, 2, 4]
+
+# Gym day page booked when an account does not name a resource
+DEFAULT_RESERVATION_URL = "https://www.condomisoft.com/system/detalle_recursos.php?id_recurso=1780&nombre_recurso=GIMNASIO%20CUARTO%20PILATES%20Y%20%20SAL%C3%93N%20AEROBI"
+
+def get_default_account():
+    """Build the single account configured through the CONDOMISOFT_* environment variables"""
+    time_slots = [slot.strip() for slot in os.getenv('TIME_SLOTS', '').split(',') if slot.strip()]
+    return {
+        "name": os.getenv('ACCOUNT_NAME') or os.getenv('CONDOMISOFT_USERNAME'),
+        "username": os.getenv('CONDOMISOFT_USERNAME'),
+        "password": os.getenv('CONDOMISOFT_PASSWORD'),
+        "apartment": os.getenv('APARTMENT', 'G-502'),
+        "resource": os.getenv('RESOURCE_NAME'),
+        "time_slots": time_slots or list(DEFAULT_TIME_SLOTS),
+        "email_to": os.getenv('EMAIL_TO'),
+    }
+
+def load_accounts():
+    """Load the accounts to book for from ACCOUNTS_FILE (JSON list), or fall back to the env account.
+
+    Each entry may set name, username, password (or password_env naming an environment variable
+    holding it), apartment, resource, time_slots and email_to; missing keys default to the env account.
+    """
+    accounts_file = os.getenv('ACCOUNTS_FILE')
+    if not accounts_file:
+        return [get_default_account()]
+
+    with open(accounts_file, 'r', encoding='utf-8') as f:
+        entries = json.load(f)
+
+    defaults = get_default_account()
+    accounts = []
+    for entry in entries:
+        account = dict(defaults, **{key: value for key, value in entry.items() if key != 'password_env'})
+        if entry.get('password_env'):
+            account["password"] = os.getenv(entry['password_env'])
+        if 'name' not in entry:
+            account["name"] = account["username"]
+        accounts.append(account)
+
+    logger.info(f"Loaded {len(accounts)} accounts from {accounts_file}")
+    return accounts
+
+def get_account_cache_id(username):
+    """Short, non-reversible identifier used to name an account's cache files"""
+    return hashlib.sha256(username.encode('utf-8')).hexdigest()[:16]
+
+def normalize_resource_name(name):
+    """Lower-case, accent-free, single-spaced resource name used for lookups"""
+    decomposed = unicodedata.normalize('NFKD', name or '')
+    return ' '.join(''.join(char for char in decomposed if not unicodedata.combining(char)).casefold().split())
+
+class ResourceIndex:
+    """Local index of the amenities (resources) an account can book, discovered once and cached"""
+    RESOURCE_LINK_PATTERN = re.compile(r"[^'\"\s]*detalle_recursos\.php\?id_recurso=(\d+)[^'\"\s]*")
+    SLOT_PATTERN = re.compile(r"\b\d{2}:\d{2}\s*-\s*\d{2}:\d{2}\b")
+
+    def __init__(self, username):
+        self.path = os.path.join(cache_dir, f"resources_{get_account_cache_id(username)}.json")
+        self.resources = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as index_file:
+                    self.resources = json.load(index_file).get("resources", {})
+            except (ValueError, OSError) as e:
+                logger.warning(f"Ignoring unreadable resource index: {str(e)}")
+
+    def save(self):
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as index_file:
+                json.dump({"updated_at": time.time(), "resources": self.resources}, index_file, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not save resource index: {str(e)}")
+
+    def add_links(self, links, page_url):
+        """Index resource links given as (href or onclick, text) pairs found on page_url; returns how many were new"""
+        added = 0
+        for target, text in links:
+            match = self.RESOURCE_LINK_PATTERN.search(html.unescape(target or ''))
+            if not match:
+                continue
+            resource_id = match.group(1)
+            url = urljoin(page_url, match.group(0))
+            query_name = parse_qs(urlparse(url).query).get('nombre_recurso', [''])[0]
+            name = ' '.join((query_name or text or f"Resource {resource_id}").split())
+            if resource_id not in self.resources:
+                self.resources[resource_id] = {"id": resource_id, "name": name, "url": url, "slots": []}
+                added += 1
+        return added
+
+    def find(self, name):
+        """Find a resource by id, exact name or name fragment (case and accent insensitive)"""
+        if name in self.resources:
+            return self.resources[name]
+        wanted = normalize_resource_name(name)
+        for resource in self.resources.values():
+            if normalize_resource_name(resource["name"]) == wanted:
+                return resource
+        for resource in self.resources.values():
+            if wanted in normalize_resource_name(resource["name"]):
+                return resource
+        return None
+
+    def record_slots(self, resource_id, page_text):
+        """Remember the slot grid seen on a resource's day page; returns True if it changed"""
+        slots = sorted({' '.join(slot.replace(' ', '').split()) for slot in self.SLOT_PATTERN.findall(page_text or '')})
+        resource = self.resources.get(resource_id)
+        if not resource or not slots or resource.get("slots") == slots:
+            return False
+        resource["slots"] = slots
+        return True
+
+    def get_day_url_template(self, resource_id):
+        resource = self.resources.get(resource_id)
+        return resource.get("day_url") if resource else None
+
+    def set_day_url_template(self, resource_id, template):
+        """Remember (or forget, with None) how a resource's day pages are linked; returns True if it changed"""
+        resource = self.resources.get(resource_id)
+        if not resource or resource.get("day_url") == template:
+            return False
+        resource["day_url"] = template
+        return True
+
+# Whole-date encodings tried when learning how the calendar links a day page
+DAY_URL_DATE_FORMATS = ["%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d", "%Y%m%d", "%d%m%Y"]
+DAY_URL_MONTH_KEYS = ("mes", "month", "m", "mm")
+DAY_URL_YEAR_KEYS = ("ano", "anio", "año", "year", "y", "yy", "yyyy", "a")
+
+def learn_day_url_template(links, year, month, page_url):
+    """Infer how the calendar's day links encode the date from (href or onclick, day text) pairs.
+
+    Returns {"url", "params", "month"} where each param is [name, value, kind] with kind
+    "literal" or "format" (a str.format template over date/day/month/year), and "month" is
+    set when only the day is encoded so the pattern is valid for that month alone. Returns
+    None unless at least two day links follow one consistent pattern.
+    """
+    samples = []
+    for target, text in links:
+        text = (text or '').strip()
+        target = html.unescape(target or '')
+        url = extract_onclick_url(target) or (target if '.php' in target and not target.startswith('javascript:') else None)
+        if not url or not text.isdigit():
+            continue
+        try:
+            date = datetime(year, month, int(text))
+        except ValueError:
+            continue
+        parsed = urlparse(urljoin(page_url, url))
+        samples.append((date, f"{parsed.scheme}://{parsed.netloc}{parsed.path}", parse_qsl(parsed.query, keep_blank_values=True)))
+
+    if len(samples) < 2 or len({date for date, base, query in samples}) < 2:
+        return None
+    base = samples[0][1]
+    names = [name for name, value in samples[0][2]]
+    if any(sample_base != base or [name for name, value in query] != names for date, sample_base, query in samples):
+        return None
+
+    params = []
+    has_day = has_month = has_year = False
+    for index, name in enumerate(names):
+        values = [(date, query[index][1]) for date, sample_base, query in samples]
+        fmt = next((fmt for fmt in DAY_URL_DATE_FORMATS if all(value == date.strftime(fmt) for date, value in values)), None)
+        if fmt:
+            params.append([name, "{date:" + fmt + "}", "format"])
+            has_day = has_month = has_year = True
+        elif len({value for date, value in values}) > 1:
+            if all(value == str(date.day) for date, value in values):
+                params.append([name, "{day}", "format"])
+            elif all(value == f"{date.day:02d}" for date, value in values):
+                params.append([name, "{day:02d}", "format"])
+            else:
+                return None
+            has_day = True
+        else:
+            value = values[0][1]
+            key = name.lower()
+            if key in DAY_URL_MONTH_KEYS and value in (str(month), f"{month:02d}"):
+                params.append([name, "{month}" if value == str(month) else "{month:02d}", "format"])
+                has_month = True
+            elif key in DAY_URL_YEAR_KEYS and value == str(year):
+                params.append([name, "{year}", "format"])
+                has_year = True
+            else:
+                params.append([name, value, "literal"])
+
+    if not has_day:
+        return None
+    return {"url": base, "params": params, "month": None if has_month and has_year else f"{year}-{month:02d}"}
+
+def build_day_url(template, date):
+    """Build the day page URL for date from a learned template, or None if the template does not cover it"""
+    if template.get("month") and template["month"] != date.strftime("%Y-%m"):
+        return None
+    query = [(name, value.format(date=date, day=date.day, month=date.month, year=date.year) if kind == "format" else value)
+             for name, value, kind in template["params"]]
+    return f"{template['url']}?{urlencode(query)}" if query else template["url"]
+
+# Fallback XPath strategies for every element lookup, in their default order. Templates are
+# formatted with the lookup parameters (time_slot, building, number)
+LOCATOR_STRATEGIES = {
+    "login_username": [
+        ("name_usuario", "//input[@name='usuario']"),
+        ("name_user", "//input[@name='user']"),
+        ("text_or_email_input", "//input[@type='text' or @type='email']"),
+    ],
+    "login_password": [
+        ("name_clave", "//input[@name='clave']"),
+        ("name_pass", "//input[@name='pass']"),
+        ("password_input", "//input[@type='password']"),
+    ],
+    "apartment_button": [
+        ("button_or_link", "//button[contains(text(), '{building}') and contains(text(), '{number}')] | //a[contains(text(), '{building}') and contains(text(), '{number}')]"),
+        ("flow_row", "//tr[contains(., 'FLOW')]//button[contains(text(), '{building}') and contains(text(), '{number}')] | //tr[contains(., 'FLOW')]//a[contains(text(), '{building}') and contains(text(), '{number}')]"),
+        ("any_text", "//*[contains(text(), '{building}') and contains(text(), '{number}')]"),
+    ],
+    "next_month": [
+        ("double_arrow", "//a[contains(text(), '>>') or contains(@onclick, 'next') or contains(@title, 'next')]"),
+        # Usually the >> button is the last one
+        ("last_arrow_link", "(//a[contains(text(), '>') or contains(text(), 'siguiente') or contains(text(), 'next')])[last()]"),
+    ],
+    "calendar_days": [
+        ("highlighted_cell", "//td[contains(@style, 'background-color: #90EE90') or contains(@style, 'background-color: green') or contains(@class, 'available')]"),
+        ("numeric_cell", "//td[@onclick and text() and string-length(text()) <= 2 and text() != ' ']"),
+        ("enabled_cell", "//td[text() and @onclick and not(contains(@class, 'disabled'))]"),
+    ],
+    "slot_button": [
+        ("sibling_disponible_button", "//td[contains(text(), '{time_slot}')]//following-sibling::td//button[contains(text(), 'Disponible')]"),
+        ("sibling_clickable", "//td[normalize-space()='{time_slot}']/following-sibling::td//*[(self::button or self::a) and contains(., 'Disponible')]"),
+        ("row_disponible", "//tr[contains(., '{time_slot}')]//button[contains(text(), 'Disponible')] | //tr[contains(., '{time_slot}')]//a[contains(text(), 'Disponible')]"),
+        ("clickable_with_time", "//*[contains(text(), '{time_slot}') and (@onclick or @href)]"),
+    ],
+}
+
+# Catch-all strategies that can match the wrong element (any text input, any link with the slot
+# time); they stay a last resort and are never promoted to be tried first
+LOOSE_LOCATOR_STRATEGIES = {"text_or_email_input", "password_input", "any_text", "last_arrow_link", "enabled_cell", "clickable_with_time"}
+
+# Step budget (see DEFAULT_STEP_TIMEOUTS) a lookup may wait for any of its strategies to match
+LOCATOR_BUDGET_STEPS = {
+    "login_username": "login",
+    "login_password": "login",
+    "apartment_button": "apartment",
+    "next_month": "calendar",
+    "calendar_days": "calendar",
+    "slot_button": "slot",
+}
+
+# Evaluates XPaths in order and returns [index, nodes] for the first one that matches, or null
+FIND_FIRST_MATCH_SCRIPT = """
+var xpaths = arguments[0];
+for (var i = 0; i < xpaths.length; i++) {
+    var result = document.evaluate(xpaths[i], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    if (result.snapshotLength) {
+        var nodes = [];
+        for (var j = 0; j < result.snapshotLength; j++) {
+            nodes.push(result.snapshotItem(j));
+        }
+        return [i, nodes];
+    }
+}
+return null;
+"""
+
+# Structured view of the page in one round trip: text, table rows (cell texts and buttons),
+# all buttons, and the calendar cells matched by the first of the given XPaths. Elements are
+# tagged with data-gym-ref so an entry can be clicked later with a single lookup
+PAGE_SNAPSHOT_SCRIPT = """
+var calendarXpaths = arguments[0] || [];
+var nextRef = window.__gymNextRef || 0;
+function ref(element) {
+    if (!element.hasAttribute('data-gym-ref')) {
+        element.setAttribute('data-gym-ref', String(nextRef++));
+    }
+    return element.getAttribute('data-gym-ref');
+}
+function text(element) {
+    return (element.innerText || element.textContent || '').replace(/\\s+/g, ' ').trim();
+}
+function describe(element) {
+    return {ref: ref(element), tag: element.tagName.toLowerCase(), text: text(element),
+            link: element.getAttribute('onclick') || element.getAttribute('href') || ''};
+}
+var snapshot = {url: location.href, text: text(document.body || document.documentElement), calendar: null, rows: [], buttons: []};
+for (var i = 0; i < calendarXpaths.length; i++) {
+    var result = document.evaluate(calendarXpaths[i], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    if (result.snapshotLength) {
+        var cells = [];
+        for (var j = 0; j < result.snapshotLength; j++) {
+            cells.push(describe(result.snapshotItem(j)));
+        }
+        snapshot.calendar = {strategy: i, cells: cells};
+        break;
+    }
+}
+document.querySelectorAll('tr').forEach(function(row) {
+    var cells = [], buttons = [];
+    row.querySelectorAll('td, th').forEach(function(cell) { cells.push(text(cell)); });
+    row.querySelectorAll('button, a').forEach(function(button) { buttons.push(describe(button)); });
+    snapshot.rows.push({text: text(row), cells: cells, buttons: buttons});
+});
+document.querySelectorAll('button, a, input[type=submit]').forEach(function(button) {
+    snapshot.buttons.push(describe(button));
+});
+window.__gymNextRef = nextRef;
+return snapshot;
+"""
+
+# Fetches a page with the browser's cookies and returns its text and table rows in the
+# PAGE_SNAPSHOT_SCRIPT shape, without reloading the document on screen (null on failure)
+FETCH_SLOT_GRID_SCRIPT = """
+var url = arguments[0], timeoutMs = arguments[1], done = arguments[arguments.length - 1];
+function text(element) {
+    return (element.textContent || '').replace(/\\s+/g, ' ').trim();
+}
+var controller = window.AbortController ? new AbortController() : null;
+if (controller) {
+    setTimeout(function() { controller.abort(); }, timeoutMs);
+}
+fetch(url, {credentials: 'include', cache: 'no-store', signal: controller ? controller.signal : undefined}).then(function(response) {
+    return response.text().then(function(body) {
+        var doc = new DOMParser().parseFromString(body, 'text/html');
+        var snapshot = {url: response.url, text: text(doc.body || doc.documentElement), calendar: null, rows: [], buttons: []};
+        doc.querySelectorAll('tr').forEach(function(row) {
+            var cells = [], buttons = [];
+            row.querySelectorAll('td, th').forEach(function(cell) { cells.push(text(cell)); });
+            row.querySelectorAll('button, a').forEach(function(button) { buttons.push({tag: button.tagName.toLowerCase(), text: text(button)}); });
+            snapshot.rows.push({text: text(row), cells: cells, buttons: buttons});
+        });
+        done(snapshot);
+    });
+}).catch(function() { done(null); });
+"""
+
+def is_advance_error_snapshot(snapshot):
+    """True if a page snapshot shows the 'more than 7 days in advance' rejection"""
+    return ("apology.php" in snapshot["url"] and "m%C3%A1s%20de%207%20d%C3%ADas" in snapshot["url"]) or \
+        "No se acepta reservaciones con más de 7 días" in snapshot["text"]
+
+def find_slot_row(snapshot, time_slot):
+    """Return the snapshot row of time_slot, or None"""
+    # Layout tables nest rows - the innermost row containing the slot is the slot's own row
+    rows = [row for row in snapshot["rows"] if time_slot in row["text"]]
+    return min(rows, key=lambda row: len(row["text"])) if rows else None
+
+def get_available_slots(snapshot, time_slots):
+    """Return the time slots whose row in a page snapshot still offers a 'Disponible' button"""
+    available = []
+    for time_slot in time_slots:
+        row = find_slot_row(snapshot, time_slot)
+        if row and any("Disponible" in button["text"] for button in row["buttons"]):
+            available.append(time_slot)
+    return available
+
+def get_settled_slots(snapshot, time_slots):
+    """Return the time slots whose row in a page snapshot shows a final status (confirmed or taken) and no 'Disponible' button"""
+    settled = []
+    for time_slot in time_slots:
+        row = find_slot_row(snapshot, time_slot)
+        if row and not any("Disponible" in button["text"] for button in row["buttons"]) and \
+                any(status in row["text"] for status in ("Confirmado", "Ocupado", "Reservado")):
+            settled.append(time_slot)
+    return settled
+
+def get_response_slot_status(snapshot, time_slot, apartment):
+    """Decide from the page a booking action answered with; returns an AttemptOutcome, or None if it does not settle the slot.
+
+    Only a slot row carrying a final status (confirmed, still 'Disponible', taken) counts, so a
+    confirmation form that merely repeats the slot time is left to a re-read of the slot grid.
+    """
+    row = find_slot_row(snapshot, time_slot)
+    if not row:
+        return None
+    if "Confirmado" in row["text"] or "Ocupado" in row["text"] or "Reservado" in row["text"] or \
+            any("Disponible" in button["text"] for button in row["buttons"]):
+        return get_slot_status(snapshot, time_slot, apartment)
+    return None
+
+def get_slot_status(snapshot, time_slot, apartment):
+    """Decide from a page snapshot whether time_slot is confirmed for apartment; returns an AttemptOutcome"""
+    row = find_slot_row(snapshot, time_slot)
+    if not row:
+        logger.warning(f"❌ Could not find time slot {time_slot} in the table")
+        return AttemptOutcome(Outcome.SELECTOR_MISS, "Time slot not found in table", time_slot)
+    row_text = row["text"]
+
+    # Check if the time slot shows "Confirmado para <apartment>"
+    if any(f"Confirmado para {apartment}" in cell for cell in row["cells"]):
+        logger.info(f"✅ Reservation confirmed! {time_slot} shows 'Confirmado para {apartment}'")
+        return AttemptOutcome(Outcome.CONFIRMED, "Confirmed successfully", time_slot)
+
+    # Check if there's still a "Disponible" button (means reservation failed)
+    if any("Disponible" in button["text"] for button in row["buttons"]):
+        logger.warning(f"❌ Reservation failed! {time_slot} still shows 'Disponible' button")
+        return AttemptOutcome(Outcome.NOT_CONFIRMED, "Time slot still available - reservation not successful", time_slot)
+
+    logger.info(f"Time slot row content: {row_text}")
+
+    # Check if it shows any other confirmation status
+    if "Confirmado" in row_text:
+        if apartment not in row_text:
+            logger.warning(f"❌ Time slot confirmed for different apartment: {row_text}")
+            return AttemptOutcome(Outcome.TAKEN_BY_OTHER, "Time slot confirmed for different apartment", time_slot)
+        logger.info(f"✅ Reservation confirmed for {apartment}")
+        return AttemptOutcome(Outcome.CONFIRMED, "Confirmed successfully", time_slot)
+
+    # Check for other statuses
+    if "Ocupado" in row_text or "Reservado" in row_text:
+        logger.warning(f"❌ Time slot occupied by another user: {row_text}")
+        return AttemptOutcome(Outcome.TAKEN_BY_OTHER, "Time slot occupied by another user", time_slot)
+
+    logger.warning(f"❌ Unexpected status for time slot: {row_text}")
+    return AttemptOutcome(Outcome.ERROR, f"Unexpected status: {row_text}", time_slot)
+
+# What each unsuccessful outcome means, for notifications
+OUTCOME_DESCRIPTIONS = {
+    Outcome.TOO_EARLY: "the reservation window was not open yet",
+    Outcome.TAKEN_BY_OTHER: "already taken by another user",
+    Outcome.SESSION_EXPIRED: "the session expired",
+    Outcome.SELECTOR_MISS: "the expected button or row was not on the page",
+    Outcome.TIMEOUT: "the site did not respond in time",
+    Outcome.NOT_CONFIRMED: "the booking did not stick",
+    Outcome.ERROR: "an unexpected error",
+}
+
+def describe_outcomes(reservation_results):
+    """Summarize why the slots failed from their recorded outcomes, e.g. '07:30-08:00: already taken by another user'"""
+    reasons = []
+    for time_slot, result in reservation_results.items():
+        if result.get("success") or not result.get("outcome"):
+            continue
+        reasons.append(f"{time_slot}: {OUTCOME_DESCRIPTIONS.get(Outcome(result['outcome']), result['outcome'])}")
+    return "; ".join(reasons)
+
+def get_final_outcomes(reservation_results, time_slots, default=Outcome.ERROR):
+    """Return {time_slot: Outcome} for a finished run; slots without a recorded outcome get default"""
+    outcomes = {}
+    for time_slot in time_slots:
+        result = reservation_results.get(time_slot) or {}
+        outcomes[time_slot] = Outcome(result["outcome"]) if result.get("outcome") else default
+    return outcomes
+
+def is_reserved(outcomes):
+    """True if a run's {time_slot: Outcome} has at least one confirmed slot"""
+    return any(outcome is Outcome.CONFIRMED for outcome in outcomes.values())
+
+def record_outcome_metrics(account_name, outcomes):
+    """Append one JSON line with every attempt outcome of a run to CACHE_DIR/outcomes.jsonl"""
+    if not outcomes or os.getenv('OUTCOME_METRICS_ENABLED', 'true').lower() != 'true':
+        return
+    counts = {}
+    for attempt in outcomes:
+        counts[attempt.outcome.value] = counts.get(attempt.outcome.value, 0) + 1
+    entry = {
+        "at": datetime.now(pytz.timezone('America/Mexico_City')).isoformat(),
+        "account": account_name,
+        "counts": counts,
+        "attempts": [{"slot": attempt.time_slot, "outcome": attempt.outcome.value, "elapsed": round(attempt.elapsed, 3)}
+                     for attempt in outcomes],
+    }
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(os.path.join(cache_dir, "outcomes.jsonl"), 'a', encoding='utf-8') as metrics_file:
+            metrics_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    except OSError as e:
+        logger.warning(f"Could not record outcome metrics: {str(e)}")
+
+class LocatorRegistry:
+    """Remembers which locator strategy last worked for each step so it is tried first next time"""
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(cache_dir, "locators.json")
+        self.lock = threading.Lock()
+        self.steps = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as registry_file:
+                    self.steps = json.load(registry_file).get("steps", {})
+            except (ValueError, OSError) as e:
+                logger.warning(f"Ignoring unreadable locator registry: {str(e)}")
+
+    def ordered(self, step):
+        """Return the step's (name, xpath) strategies with the last successful precise one first"""
+        strategies = LOCATOR_STRATEGIES[step]
+        last = self.steps.get(step, {}).get("last")
+        if last in LOOSE_LOCATOR_STRATEGIES:
+            last = None
+        return sorted(strategies, key=lambda strategy: strategy[0] != last)
+
+    def record(self, step, tried, winner):
+        """Count a lookup: a hit for the winning strategy, a miss for every one tried before it"""
+        with self.lock:
+            entry = self.steps.setdefault(step, {"last": None, "lookups": 0, "first_try_hits": 0, "strategies": {}})
+            entry["lookups"] += 1
+            if winner and tried and tried[0] == winner:
+                entry["first_try_hits"] += 1
+            for name in tried:
+                counters = entry["strategies"].setdefault(name, {"hits": 0, "misses": 0})
+                counters["hits" if name == winner else "misses"] += 1
+            if winner and winner not in LOOSE_LOCATOR_STRATEGIES:
+                entry["last"] = winner
+
+    def summary(self):
+        """One line per step with its preferred strategy and first-try hit rate"""
+        with self.lock:
+            return [f"{step}: {entry['last'] or '-'} ({entry['first_try_hits']}/{entry['lookups']} first-try hits)"
+                    for step, entry in sorted(self.steps.items())]
+
+    def save(self):
+        with self.lock:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                temp_path = f"{self.path}.{threading.get_ident()}.tmp"
+                with open(temp_path, 'w', encoding='utf-8') as registry_file:
+                    json.dump({"updated_at": time.time(), "steps": self.steps}, registry_file, indent=2)
+                os.replace(temp_path, self.path)
+            except OSError as e:
+                logger.warning(f"Could not save locator registry: {str(e)}")
+
+# Locator registry shared by every account in the process
+_locator_registry = None
+_locator_registry_lock = threading.Lock()
+
+def get_locator_registry():
+    """Return the process-wide locator registry, loading it from disk on first use"""
+    global _locator_registry
+    with _locator_registry_lock:
+        if _locator_registry is None:
+            _locator_registry = LocatorRegistry()
+        return _locator_registry
+
+class BrowserProfile:
+    """Persistent per-account Chrome profile (HTTP cache, cookies, DNS/TLS state), locked while in use"""
+    CACHE_SUBDIRS = [
+        os.path.join("Default", "Cache"),
+        os.path.join("Default", "Code Cache"),
+        os.path.join("Default", "GPUCache"),
+        os.path.join("Default", "Service Worker", "CacheStorage"),
+        "GrShaderCache",
+        "ShaderCache",
+    ]
+
+    def __init__(self, username):
+        self.path = os.path.join(cache_dir, "profiles", get_account_cache_id(username))
+        self.lock_file = None
+        try:
+            self.max_bytes = int(float(os.getenv('PROFILE_MAX_MB', '200')) * 1024 * 1024)
+        except ValueError:
+            self.max_bytes = 200 * 1024 * 1024
+
+    def acquire(self):
+        """Lock the profile for this browser; returns False if another browser is using it"""
+        if fcntl is None:
+            return False
+        os.makedirs(self.path, exist_ok=True)
+        lock_file = open(f"{self.path}.lock", 'w')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self.lock_file = lock_file
+
+        # Nobody else can be using the profile now, so these are leftovers of a crashed Chrome
+        for name in ("SingletonLock", "SingletonSocket", "SingletonCookie"):
+            leftover = os.path.join(self.path, name)
+            if os.path.lexists(leftover):
+                os.remove(leftover)
+        self.trim()
+        return True
+
+    def release(self):
+        if self.lock_file:
+            fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+            self.lock_file.close()
+            self.lock_file = None
+
+    def size(self):
+        total = 0
+        for root, dirs, files in os.walk(self.path):
+            for name in files:
+                try:
+                    total += os.lstat(os.path.join(root, name)).st_size
+                except OSError:
+                    pass
+        return total
+
+    def trim(self):
+        """Drop the cache directories (keeping cookies and settings) once the profile exceeds PROFILE_MAX_MB"""
+        size = self.size()
+        if size <= self.max_bytes:
+            return
+        for subdir in self.CACHE_SUBDIRS:
+            shutil.rmtree(os.path.join(self.path, subdir), ignore_errors=True)
+        logger.info(f"Trimmed browser profile from {size / 1048576:.0f} MB to {self.size() / 1048576:.0f} MB")
+
+class SessionCache:
+    """Encrypted on-disk store of an account's authenticated session cookies"""
+
+    def __init__(self, username, password):
+        self.username = username
+        self.path = os.path.join(cache_dir, f"session_{get_account_cache_id(username)}.bin")
+
+        # Runs are up to 72 hours apart (Thursday to Sunday night), so the default keeps a session
+        # until the next run; restore_session still asks the server whether it is alive
+        try:
+            self.ttl_minutes = int(os.getenv('SESSION_CACHE_TTL_MINUTES', '5760'))
+        except Exception:
+            self.ttl_minutes = 5760
+
+        # Use an explicit key if provided, otherwise derive one from the credentials so that
+        # the cache is useless to anyone who does not already know them
+        key = os.getenv('SESSION_CACHE_KEY')
+        if key:
+            try:
+                self.fernet = Fernet(key)
+                return
+            except ValueError:
+                logger.warning("Invalid SESSION_CACHE_KEY (expected 32 url-safe base64-encoded bytes) - using a key derived from the credentials")
+        derived = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), username.encode('utf-8'), 100000)
+        self.fernet = Fernet(base64.urlsafe_b64encode(derived))
+
+    def load(self, apartment):
+        """Return the cached cookies for this account/apartment, or None if missing or expired"""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, 'rb') as cache_file:
+                payload = json.loads(self.fernet.decrypt(cache_file.read()))
+        except (InvalidToken, ValueError, OSError) as e:
+            logger.warning(f"Discarding unreadable session cache ({type(e).__name__})")
+            self.clear()
+            return None
+
+        if payload.get("username") != self.username or payload.get("apartment") != apartment:
+            logger.info("Cached session belongs to another account/apartment - ignoring it")
+            return None
+        if time.time() >= payload.get("expires_at", 0):
+            logger.info("Cached session expired - ignoring it")
+            self.clear()
+            return None
+
+        age_minutes = (time.time() - payload.get("saved_at", 0)) / 60
+        logger.info(f"Found cached session for {apartment} ({age_minutes:.0f} minutes old)")
+        return payload["cookies"]
+
+    def save(self, cookies, apartment):
+        """Encrypt and store the session cookies with an expiry"""
+        now = time.time()
+        payload = {
+            "username": self.username,
+            "apartment": apartment,
+            "cookies": cookies,
+            "saved_at": now,
+            "expires_at": now + self.ttl_minutes * 60,
+        }
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, 'wb') as cache_file:
+                cache_file.write(self.fernet.encrypt(json.dumps(payload).encode('utf-8')))
+            os.chmod(temp_path, 0o600)
+            os.replace(temp_path, self.path)
+            logger.info(f"Saved session cache ({len(cookies)} cookies, valid {self.ttl_minutes} minutes)")
+        except OSError as e:
+            logger.warning(f"Could not save session cache: {str(e)}")
+
+    def clear(self):
+        """Remove the cached session"""
+        try:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+        except OSError as e:
+            logger.warning(f"Could not remove session cache: {str(e)}")
+
+# WebDriverManager results shared by every account in the process
+_managed_driver_paths = {}
+_managed_driver_lock = threading.Lock()
+
+# Installed browser versions, read once per process
+_browser_versions = {}
+
+BROWSER_BINARIES = {
+    "chrome": ["/Applications/Google Chrome.app/Contents/MacOS/Google Chrome", "google-chrome", "google-chrome-stable", "chromium", "chromium-browser"],
+    "firefox": ["firefox", "firefox-esr"],
+}
+
+def get_browser_version(browser):
+    """Return the installed browser's version string (e.g. '120.0.6099.109'), or None if unknown"""
+    if browser in _browser_versions:
+        return _browser_versions[browser]
+
+    version = None
+    for binary in BROWSER_BINARIES.get(browser, []):
+        binary_path = binary if os.path.isabs(binary) else shutil.which(binary)
+        if not binary_path or not os.path.exists(binary_path):
+            continue
+        try:
+            output = subprocess.run([binary_path, "--version"], capture_output=True, text=True, timeout=10).stdout
+            match = re.search(r"\d+(\.\d+)+", output)
+            if match:
+                version = match.group(0)
+                break
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.debug(f"Could not read {browser} version from {binary_path}: {str(e)}")
+    _browser_versions[browser] = version
+    return version
+
+def get_major_version(version):
+    return (version or '').split('.')[0]
+
+def _load_driver_cache():
+    path = os.path.join(cache_dir, "drivers.json")
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as cache_file:
+            return json.load(cache_file)
+    except (ValueError, OSError) as e:
+        logger.warning(f"Ignoring unreadable driver cache: {str(e)}")
+        return {}
+
+def _save_driver_cache(entries):
+    path = os.path.join(cache_dir, "drivers.json")
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as cache_file:
+            json.dump(entries, cache_file, indent=2)
+        os.replace(temp_path, path)
+    except OSError as e:
+        logger.warning(f"Could not save driver cache: {str(e)}")
+
+def get_cached_driver_path(browser):
+    """Return the driver that last worked for browser, unless it is gone or the browser was upgraded"""
+    with _managed_driver_lock:
+        entry = _load_driver_cache().get(browser)
+    if not entry or not os.path.isfile(entry.get("driver_path", "")) or not os.access(entry["driver_path"], os.X_OK):
+        return None
+
+    installed = get_browser_version(browser)
+    if installed and get_major_version(installed) != get_major_version(entry.get("browser_version")):
+        logger.info(f"{browser} upgraded from {entry.get('browser_version')} to {installed} - re-resolving its driver")
+        return None
+    return entry["driver_path"]
+
+def record_working_driver(browser, driver_path, capabilities):
+    """Remember the browser/driver pair that just launched so later runs skip resolution"""
+    if browser == "firefox":
+        driver_version = capabilities.get("moz:geckodriverVersion")
+    else:
+        driver_version = capabilities.get("chrome", {}).get("chromedriverVersion", "").split(' ')[0]
+    with _managed_driver_lock:
+        entries = _load_driver_cache()
+        entries[browser] = {
+            "driver_path": driver_path,
+            "driver_version": driver_version,
+            "browser_version": capabilities.get("browserVersion"),
+            "resolved_at": time.time(),
+        }
+        _save_driver_cache(entries)
+    logger.info(f"Cached {browser} {capabilities.get('browserVersion')} driver {driver_version} at {driver_path}")
+
+def forget_cached_driver(browser):
+    """Drop a cached driver that failed to launch"""
+    with _managed_driver_lock:
+        entries = _load_driver_cache()
+        if entries.pop(browser, None):
+            _save_driver_cache(entries)
+
+def resolve_managed_driver_path(browser):
+    """Return the WebDriverManager driver path for chrome/firefox, installing it only once per process"""
+    with _managed_driver_lock:
+        if browser in _managed_driver_paths:
+            return _managed_driver_paths[browser]
+
+        if browser == "firefox":
+            driver_path = GeckoDriverManager().install()
+        else:
+            driver_path = ChromeDriverManager().install()
+            # Fix the path if WebDriverManager returns wrong file
+            if 'THIRD_PARTY_NOTICES' in driver_path:
+                # Find the actual chromedriver binary in the same directory
+                driver_dir = os.path.dirname(driver_path)
+                possible_drivers = glob.glob(os.path.join(driver_dir, '**/chromedriver*'), recursive=True)
+                actual_driver = None
+                for candidate in possible_drivers:
+                    if os.path.isfile(candidate) and 'chromedriver' in os.path.basename(candidate) and 'THIRD_PARTY' not in candidate:
+                        actual_driver = candidate
+                        break
+                if actual_driver and os.path.exists(actual_driver):
+                    driver_path = actual_driver
+                    logger.info(f"Fixed WebDriverManager path to: {driver_path}")
+                    # Fix permissions if needed
+                    if not os.access(driver_path, os.X_OK):
+                        os.chmod(driver_path, stat.S_IRWXU | stat.S_IRGRP | stat.S_IXGRP | stat.S_IROTH | stat.S_IXOTH)
+                        logger.info("Fixed chromedriver permissions")
+
+        _managed_driver_paths[browser] = driver_path
+        return driver_path
+
+class ReservationEngine:
+    """Shared configuration and booking flow for the Selenium and HTTP reservation engines"""
+    engine_name = "base"
+
+    def __init__(self, account=None):
+        account = account or get_default_account()
+        self.account = account
+        self.account_name = account.get("name") or account.get("username")
+        self.username = account.get("username")
+        self.password = account.get("password")
+        self.email_to = account.get("email_to")
         self.base_url = "https://www.condomisoft.com"
         self.login_url = "https://www.condomisoft.com/system/login.php?sin_apps=true&plataforma="
-        self.reservation_url = "https://www.condomisoft.com/system/detalle_recursos.php?id_recurso=1780&nombre_recurso=GIMNASIO%20CUARTO%20PILATES%20Y%20%20SAL%C3%93N%20AEROBI"
+        self.reservation_url = DEFAULT_RESERVATION_URL
+        self.resources_url = os.getenv('RESOURCES_URL', 'https://www.condomisoft.com/system/recursos.php')
+        self.apartment = account.get("apartment", "G-502")
         
-        # Time slots to try - both main early morning slots
-        self.time_slots = ["07:30-08:00", "08:00-08:30"]
+        # Amenity to book, by name or id (e.g. "gimnasio", "alberca"); defaults to the gym URL above
+        self.resource_name = account.get("resource")
+        
+        # Time slots to try - by default both main early morning slots
+        self.time_slots = list(account.get("time_slots") or DEFAULT_TIME_SLOTS)
         
         # Results tracking
         self.reservation_results = {
-            "07:30-08:00": {"success": False, "message": ""},
-            "08:00-08:30": {"success": False, "message": ""}
+            time_slot: {"success": False, "message": "", "outcome": None, "elapsed": 0.0} for time_slot in self.time_slots
         }
         
+        # Every AttemptOutcome of the run, retries included, for metrics
+        self.outcomes = []
+        
+        # Set once warm_up() has parked a logged-in session on the reservation page
+        self.session_ready = False
+        
+        # (year, month) shown by the calendar once it was moved off the current month
+        self.calendar_month = None
+        
+        # Page each slot's booking action answered with, checked before re-reading the slot grid
+        self.booking_responses = {}
+        
+        # Book all slots concurrently instead of one after the other
+        self.parallel_slots = os.getenv('PARALLEL_SLOTS', 'false').lower() == 'true'
+        
+        # Book every slot first and validate them together afterwards, off the contested phase
+        self.deferred_validation = os.getenv('DEFERRED_VALIDATION', 'false').lower() == 'true'
+        
+        # Keep the session open and re-read the day's slot grid until a slot shows 'Disponible'
+        self.availability_polling = os.getenv('AVAILABILITY_POLLING', 'false').lower() == 'true'
+        try:
+            self.poll_window = float(os.getenv('POLL_WINDOW_SECONDS', '180'))
+        except Exception:
+            self.poll_window = 180.0
+        # Passed on to get_poll_interval(), so only 1-3 positive values (fastest, slowest, tight seconds) are taken
+        try:
+            self.poll_intervals = [float(value) for value in os.getenv('POLL_INTERVALS', '0.25,5,15').split(',')]
+            if not 1 <= len(self.poll_intervals) <= 3 or any(value <= 0 for value in self.poll_intervals):
+                raise ValueError(self.poll_intervals)
+        except ValueError:
+            logger.warning("Invalid POLL_INTERVALS (expected 1-3 positive numbers), using 0.25,5,15")
+            self.poll_intervals = [0.25, 5.0, 15.0]
+        
         if not self.username or not self.password:
-            logger.error("Username and password must be set in environment variables")
+            logger.error(f"Username and password must be set for account '{self.account_name}'")
             raise ValueError("Missing credentials")
+        
+        self.session_cache = SessionCache(self.username, self.password) if os.getenv('SESSION_CACHE_ENABLED', 'true').lower() == 'true' else None
+        self.resource_index = ResourceIndex(self.username)
+
+    def start_session(self):
+        """Create the browser or HTTP session used by the engine"""
+        raise NotImplementedError
+
+    def refresh_reservation_page(self):
+        """Reload the reservation page of an already warmed-up session"""
+        raise NotImplementedError
+
+    def reserve_time_slots_parallel(self, time_slots):
+        """Fire all slot bookings concurrently; returns {time_slot: attempted}"""
+        raise NotImplementedError
+
+    def get_session_cookies(self):
+        """Return the session cookies as a list of Selenium-style cookie dicts"""
+        raise NotImplementedError
+
+    def apply_session_cookies(self, cookies):
+        """Load cached cookies into the current session"""
+        raise NotImplementedError
+
+    def is_authenticated(self):
+        """Check that the current page was served to a logged-in session"""
+        raise NotImplementedError
+
+    def load_page(self, url):
+        """Open an arbitrary page in the current session"""
+        raise NotImplementedError
+
+    def get_page_links(self):
+        """Return (href or onclick, text) pairs for the clickable elements of the current page"""
+        raise NotImplementedError
+
+    def get_page_text(self):
+        """Return the visible text of the current page"""
+        raise NotImplementedError
+
+    def get_current_url(self):
+        """Return the URL of the page the session is on"""
+        raise NotImplementedError
+
+    def advance_calendar(self, months, log_prefix=""):
+        """Click the calendar's next-month control the given number of times"""
+        raise NotImplementedError
+
+    def locate_target_day(self, target_date):
+        """Check that the target day can be clicked in the calendar on screen"""
+        raise NotImplementedError
+
+    def read_slot_grid(self, reload=True):
+        """Re-read the target day's slot grid; returns its page snapshot, or None off the grid"""
+        raise NotImplementedError
+
+    def get_calendar_month(self):
+        """Return the (year, month) the calendar page is showing"""
+        if self.calendar_month:
+            return self.calendar_month
+        now = datetime.now(pytz.timezone('America/Mexico_City'))
+        return (now.year, now.month)
+
+    def get_months_to_advance(self, target_date):
+        """Months between the calendar month on screen and the target date's month"""
+        year, month = self.get_calendar_month()
+        return max(0, (target_date.year - year) * 12 + (target_date.month - month))
+
+    def note_month_advanced(self):
+        year, month = self.get_calendar_month()
+        self.calendar_month = (year + month // 12, month % 12 + 1)
+
+    def preposition_calendar(self):
+        """Move the parked calendar to the target month before the opening so only the day click is left"""
+        try:
+            target_date = self.get_target_date()
+            months_to_advance = self.get_months_to_advance(target_date)
+            if months_to_advance:
+                self.advance_calendar(months_to_advance, "Pre-position: ")
+                if self.get_current_url() == self.reservation_url:
+                    # The month is not part of the URL, so the refresh at the opening would lose it
+                    logger.info("Calendar month is not URL-addressable - months will be advanced after the opening")
+                    self.navigate_to_reservation()
+                    return
+
+            if self.locate_target_day(target_date):
+                logger.info(f"📅 Calendar pre-positioned on {target_date.strftime('%B %Y')} with day {target_date.day} located")
+            else:
+                logger.info(f"📅 Calendar pre-positioned on {target_date.strftime('%B %Y')} - day {target_date.day} not listed yet")
+        except Exception as e:
+            logger.warning(f"Could not pre-position calendar ({str(e)}) - parking on the reservation page")
+            self.navigate_to_reservation()
+
+    def get_resource_id(self):
+        """Return the id_recurso of the resource being booked"""
+        return parse_qs(urlparse(self.reservation_url).query).get('id_recurso', [None])[0]
+
+    def resolve_resource(self):
+        """Point reservation_url at the configured resource, discovering amenities only if it is not indexed yet"""
+        if not self.resource_name:
+            return
+
+        resource = self.resource_index.find(self.resource_name)
+        if not resource:
+            logger.info(f"Resource '{self.resource_name}' is not in the local index - discovering amenities")
+            links = self.get_page_links()
+            added = self.resource_index.add_links(links, self.get_current_url()) if links else 0
+            if not self.resource_index.find(self.resource_name) and self.resources_url:
+                self.load_page(self.resources_url)
+                added += self.resource_index.add_links(self.get_page_links(), self.get_current_url())
+            if added:
+                self.resource_index.save()
+                names = ', '.join(entry["name"] for entry in self.resource_index.resources.values())
+                logger.info(f"Indexed {added} new resources: {names}")
+            resource = self.resource_index.find(self.resource_name)
+
+        if not resource:
+            raise Exception(f"Resource '{self.resource_name}' not found among the account's amenities")
+        self.reservation_url = resource["url"]
+        logger.info(f"Booking resource '{resource['name']}' (id {resource['id']})")
+
+    def get_indexed_resource_id(self):
+        """Return the id of the resource being booked, adding it to the resource index if needed"""
+        resource_id = self.get_resource_id()
+        if resource_id and resource_id not in self.resource_index.resources:
+            self.resource_index.add_links([(self.reservation_url, '')], self.reservation_url)
+        return resource_id
+
+    def learn_day_url(self, links):
+        """Learn how the calendar on screen links day pages, from its (href or onclick, day text) pairs"""
+        try:
+            resource_id = self.get_indexed_resource_id()
+            if not resource_id or self.resource_index.get_day_url_template(resource_id):
+                return
+            year, month = self.get_calendar_month()
+            template = learn_day_url_template(links, year, month, self.get_current_url())
+            if template and self.resource_index.set_day_url_template(resource_id, template):
+                self.resource_index.save()
+                logger.info(f"🔗 Learned the day page link pattern for resource {resource_id}: {template['url']}")
+        except Exception as e:
+            logger.debug(f"Could not learn day page links: {str(e)}")
+
+    def get_day_url(self, target_date):
+        """Return the direct URL of the target day's slot grid, if its link pattern is known"""
+        template = self.resource_index.get_day_url_template(self.get_resource_id())
+        return build_day_url(template, target_date) if template else None
+
+    def load_day_page(self, url):
+        """Open a day page directly; returns "ok", "too_early" or "invalid" (no slot grid)"""
+        raise NotImplementedError
+
+    def open_day_directly(self, target_date):
+        """Load the target day's slot grid with a single request instead of clicking through the calendar"""
+        day_url = self.get_day_url(target_date)
+        if not day_url:
+            return False
+
+        logger.info(f"🔗 Opening {target_date.strftime('%Y-%m-%d')} directly: {day_url}")
+        try:
+            status = self.load_day_page(day_url)
+        except Exception as e:
+            logger.warning(f"Direct day link failed: {str(e)}")
+            status = "invalid"
+        if status == "ok":
+            logger.info(f"Selected calendar day: {target_date.day} in {target_date.strftime('%B %Y')} (direct link)")
+            return True
+
+        if status == "invalid":
+            logger.warning("Direct day link did not show the slot grid - forgetting it and using the calendar")
+            if self.resource_index.set_day_url_template(self.get_resource_id(), None):
+                self.resource_index.save()
+        else:
+            logger.warning("Direct day link got the '7 days in advance' error - retrying through the calendar")
+        self.navigate_to_reservation()
+        return False
+
+    def validate_reservations(self, time_slots):
+        """Validate several booked slots; returns {time_slot: AttemptOutcome}"""
+        return {time_slot: self.validate_reservation(time_slot) for time_slot in time_slots}
+
+    def is_too_early(self):
+        """Check whether the page on screen is the '7 days in advance' rejection"""
+        raise NotImplementedError
+
+    def classify_failure(self, error=None):
+        """Work out why a step failed from its exception and the page on screen"""
+        if error is not None and is_transient_error(error):
+            return Outcome.TIMEOUT
+        try:
+            if self.is_too_early():
+                return Outcome.TOO_EARLY
+            if not self.is_authenticated():
+                return Outcome.SESSION_EXPIRED
+        except Exception as e:
+            return Outcome.TIMEOUT if is_transient_error(e) else Outcome.ERROR
+        return Outcome.ERROR if error is not None else Outcome.SELECTOR_MISS
+
+    def prepare_retry(self, outcome):
+        """Get the live session ready for the next attempt with as few requests as possible"""
+        if outcome is Outcome.SESSION_EXPIRED:
+            logger.info("Session expired - logging in again in the same session")
+            self.login()
+            self.select_apartment()
+            self.resolve_resource()
+            self.navigate_to_reservation()
+            self.save_session()
+        elif not self.get_day_url(self.get_target_date()):
+            # Without a direct day link the retry has to start from the calendar
+            self.navigate_to_reservation()
+
+    def record_result(self, attempt):
+        """Log a slot's attempt outcome and make it the slot's current result"""
+        if attempt.success:
+            logger.info(f"✅ {attempt.time_slot} reservation validated successfully: {attempt.message} ({attempt.elapsed:.2f}s)")
+        else:
+            logger.error(f"❌ {attempt.time_slot} reservation failed ({attempt.outcome.value}): {attempt.message}")
+        self.outcomes.append(attempt)
+        self.reservation_results[attempt.time_slot].update(
+            success=attempt.success, message=attempt.message, outcome=attempt.outcome.value, elapsed=attempt.elapsed)
+
+    def book_slots(self, time_slots, parallel_attempts):
+        """Book and validate each slot in turn; returns {time_slot: Outcome} for the unconfirmed ones"""
+        failures = {}
+        for time_slot in time_slots:
+            logger.info(f"Attempting to reserve {time_slot}")
+            started = time.monotonic()
+            
+            try:
+                if time_slot in parallel_attempts:
+                    reservation_attempted = parallel_attempts[time_slot]
+                else:
+                    reservation_attempted = self.reserve_time_slot(time_slot)
+                
+                if reservation_attempted:
+                    # Validate the reservation was successful
+                    attempt = self.validate_reservation(time_slot)
+                else:
+                    attempt = AttemptOutcome(self.classify_failure(), "Failed to find available time slot", time_slot)
+                    
+            except EngineFallbackError:
+                # Let run_cloud_reservation switch to Selenium for this step
+                raise
+            except Exception as e:
+                attempt = AttemptOutcome(self.classify_failure(e), f"Exception: {str(e)}", time_slot)
+            
+            attempt.elapsed = time.monotonic() - started
+            self.record_result(attempt)
+            if not attempt.success:
+                failures[time_slot] = attempt.outcome
+        return failures
+
+    def book_then_validate(self, time_slots, parallel_attempts):
+        """Book every slot, then validate them all in one pass; returns {time_slot: Outcome} for the unconfirmed ones"""
+        failures = {}
+        attempted = []
+        started = time.monotonic()
+        for time_slot in time_slots:
+            try:
+                if time_slot in parallel_attempts:
+                    reservation_attempted = parallel_attempts[time_slot]
+                else:
+                    logger.info(f"Attempting to reserve {time_slot}")
+                    reservation_attempted = self.reserve_time_slot(time_slot)
+            except EngineFallbackError:
+                raise
+            except Exception as e:
+                attempt = AttemptOutcome(self.classify_failure(e), f"Exception: {str(e)}", time_slot, time.monotonic() - started)
+                self.record_result(attempt)
+                failures[time_slot] = attempt.outcome
+                continue
+            
+            if reservation_attempted:
+                attempted.append(time_slot)
+            else:
+                attempt = AttemptOutcome(self.classify_failure(), "Failed to find available time slot", time_slot, time.monotonic() - started)
+                self.record_result(attempt)
+                failures[time_slot] = attempt.outcome
+        
+        if not attempted:
+            return failures
+        
+        logger.info(f"Validating {len(attempted)} booked slots in one pass")
+        attempts = self.validate_reservations(attempted)
+        for time_slot in attempted:
+            attempt = attempts[time_slot]
+            attempt.elapsed = time.monotonic() - started
+            self.record_result(attempt)
+            if not attempt.success:
+                failures[time_slot] = attempt.outcome
+        return failures
+
+    def settle_from_grid(self, time_slots):
+        """Read the day's slot grid once and settle the slots it no longer offers; returns {time_slot: AttemptOutcome}.
+
+        Used before a retry round: a booking that went through after all shows as confirmed, and a
+        slot someone else took shows as taken, instead of both being rebooked and missing the button.
+        """
+        try:
+            grid = self.read_slot_grid(reload=False)
+        except Exception as e:
+            logger.warning(f"Could not read the slot grid before retrying: {str(e)}")
+            return {}
+        if grid is None:
+            return {}
+        return {time_slot: get_slot_status(grid, time_slot, self.apartment) for time_slot in get_settled_slots(grid, time_slots)}
+
+    def attempt_reservations(self, time_slots, retrying=False):
+        """Select the target day and book time_slots once; returns {time_slot: Outcome} for the unconfirmed ones.
+
+        On a retry round only the slots whose row still shows 'Disponible' are booked again.
+        """
+        # Select the next occurrence of the same day of the week
+        started = time.monotonic()
+        day_selected = self.select_calendar_day()
+        settled = {}
+        if self.availability_polling:
+            day_selected, settled = self.poll_for_availability(day_selected, time_slots)
+        elif retrying and day_selected:
+            settled = self.settle_from_grid(time_slots)
+        if not day_selected:
+            outcome = self.classify_failure()
+            logger.warning(f"Failed to select target day from calendar ({outcome.value})")
+            for time_slot in time_slots:
+                self.record_result(AttemptOutcome(outcome, "Failed to select target day from calendar", time_slot, time.monotonic() - started))
+            return {time_slot: outcome for time_slot in time_slots}
+        
+        # Slots the grid already shows as confirmed or taken are not booked again
+        failures = {}
+        for time_slot, attempt in settled.items():
+            attempt.elapsed = time.monotonic() - started
+            self.record_result(attempt)
+            if not attempt.success:
+                failures[time_slot] = attempt.outcome
+        time_slots = [time_slot for time_slot in time_slots if time_slot not in settled]
+        if not time_slots:
+            return failures
+        
+        # Fire every slot at once so they all reach the server within the same few hundred ms
+        parallel_attempts = {}
+        if self.parallel_slots and len(time_slots) > 1:
+            try:
+                parallel_attempts = self.reserve_time_slots_parallel(time_slots)
+            except EngineFallbackError:
+                raise
+            except Exception as e:
+                logger.warning(f"Parallel booking could not start ({str(e)}) - booking slots one by one")
+        
+        if self.deferred_validation:
+            failures.update(self.book_then_validate(time_slots, parallel_attempts))
+        else:
+            failures.update(self.book_slots(time_slots, parallel_attempts))
+        return failures
+
+    def run_with_retries(self):
+        """Attempt the reservations, retrying unconfirmed slots inside this live session.
+
+        Each outcome follows its RETRY_POLICIES entry (retries and doubling backoff with
+        RETRY_JITTER), all within RETRY_DEADLINE_SECONDS; the most severe pending outcome (see
+        RETRY_PRIORITY) drives the next wait, and confirmed or taken slots are never attempted again.
+        """
+        retry = SessionRetry()
+        pending = list(self.time_slots)
+        retrying = False
+        while pending:
+            failures = self.attempt_reservations(pending, retrying)
+            retryable = {time_slot: outcome for time_slot, outcome in failures.items() if retry.can_retry(outcome)}
+            if not retryable:
+                return
+            
+            outcome = next(outcome for outcome in RETRY_PRIORITY if outcome in retryable.values())
+            delay = retry.next_delay(outcome)
+            if delay is None:
+                logger.warning(f"Retry deadline reached ({outcome.value}) - giving up on {', '.join(retryable)}")
+                return
+            logger.info(f"🔁 Retrying {', '.join(retryable)} in {delay:.2f}s ({outcome.value}, retry {retry.retries[outcome]})")
+            time.sleep(delay)
+            self.prepare_retry(outcome)
+            pending = list(retryable)
+            retrying = True
+
+    def poll_for_availability(self, day_selected, time_slots):
+        """Keep this session and re-read the target day's slot grid until a wanted slot shows 'Disponible'.
+
+        Polls at get_poll_interval() pace, tight around the opening and backing off after, for up to
+        POLL_WINDOW_SECONDS, and stops early once every wanted slot shows a final status. Returns
+        whether the day's slot grid is on screen when polling stops, and {time_slot: AttemptOutcome}
+        for the slots the last grid already settled (confirmed or taken).
+        """
+        opening = get_reservation_opening(self.get_target_date())
+        deadline = time.monotonic() + self.poll_window
+        polls = 0
+        reload = False
+        while True:
+            grid = self.read_slot_grid(reload) if day_selected else None
+            polls += 1
+            reload = True
+            if grid is None:
+                # Still too early (or the day page was lost) - select the day again on the next poll
+                day_selected = False
+            else:
+                available = get_available_slots(grid, time_slots)
+                settled = get_settled_slots(grid, time_slots)
+                if available or len(settled) == len(time_slots):
+                    if available:
+                        logger.info(f"🟢 {', '.join(available)} showing 'Disponible' after {polls} polls - booking now")
+                    else:
+                        logger.info(f"Every wanted slot already shows a final status after {polls} polls - stopping")
+                    return True, {time_slot: get_slot_status(grid, time_slot, self.apartment) for time_slot in settled}
+
+            seconds_since_opening = (datetime.now(opening.tzinfo) - opening).total_seconds()
+            interval = get_poll_interval(seconds_since_opening, *self.poll_intervals)
+            if time.monotonic() + interval > deadline:
+                logger.warning(f"No wanted slot showed 'Disponible' within {self.poll_window:.0f}s ({polls} polls)")
+                settled = get_settled_slots(grid, time_slots) if grid else []
+                return day_selected, {time_slot: get_slot_status(grid, time_slot, self.apartment) for time_slot in settled}
+            logger.info(f"Poll {polls}: no wanted slot available yet - next read in {interval:.2f}s")
+            time.sleep(interval)
+
+            if not day_selected:
+                self.navigate_to_reservation()
+                day_selected = self.select_calendar_day()
+                reload = False
+
+    def record_slot_grid(self):
+        """Store the slot grid of the current day page in the resource index"""
+        try:
+            resource_id = self.get_indexed_resource_id()
+            if self.resource_index.record_slots(resource_id, self.get_page_text()):
+                self.resource_index.save()
+        except Exception as e:
+            logger.debug(f"Could not record slot grid: {str(e)}")
+
+    def close(self):
+        """Release the session and forget any warmed-up state"""
+        self.session_ready = False
+
+    def restore_session(self):
+        """Reuse a cached authenticated session, returning False if a full login is needed"""
+        if not self.session_cache:
+            return False
+        cookies = self.session_cache.load(self.apartment)
+        if not cookies:
+            return False
+
+        try:
+            self.apply_session_cookies(cookies)
+            self.resolve_resource()
+            self.navigate_to_reservation()
+            if self.is_authenticated():
+                logger.info("♻️ Reusing cached session - skipped login and apartment selection")
+                return True
+            logger.info("Cached session was rejected by the server - doing a full login")
+        except Exception as e:
+            logger.warning(f"Could not reuse cached session: {str(e)}")
+
+        self.session_cache.clear()
+        return False
+
+    def save_session(self):
+        """Store the current session cookies for the next run"""
+        if not self.session_cache:
+            return
+        try:
+            self.session_cache.save(self.get_session_cookies(), self.apartment)
+        except Exception as e:
+            logger.warning(f"Could not read session cookies for caching: {str(e)}")
+
+    def get_target_date(self):
+        """Calculate the target reservation date for the FOLLOWING week's gym day.
+
+        Requirements:
+        - When running Sunday/Tuesday/Thursday at ~23:30, target is the next day (Mon/Wed/Fri) PLUS 7 days.
+        - When running at 00:00–06:00 on Mon/Wed/Fri (post-midnight), target is the SAME weekday plus 7 days.
+        - For ad-hoc daytime runs, target is next week's same weekday.
+        """
+        mexico_tz = pytz.timezone('America/Mexico_City')
+        now = datetime.now(mexico_tz)
+
+        current_weekday = now.weekday()  # Monday=0, ... Sunday=6
+        current_hour = now.hour
+
+        # Determine the base day we want to reserve FOR (this week or next) before adding +7
+        if current_hour >= 23:
+            # Night before: base is tomorrow (e.g., Sun->Mon, Tue->Wed, Thu->Fri)
+            base_day = now + timedelta(days=1)
+        elif 0 <= current_hour < 6:
+            # Early morning of gym day: base is today (e.g., Mon/Wed/Fri)
+            base_day = now
+        else:
+            # Daytime/manual run: base is today (we'll roll to next gym day if needed)
+            base_day = now
+
+        # Find the next gym day relative to base_day (including today if it is a gym day)
+        days_until_next_gym = min(((d - base_day.weekday()) % 7) for d in GYM_DAYS)
+        next_gym_day = base_day + timedelta(days=days_until_next_gym)
+
+        # Target is the same weekday in the FOLLOWING week
+        target_date = next_gym_day + timedelta(days=7)
+
+        logger.info(f"Current time (Mexico City): {now.strftime('%Y-%m-%d %H:%M:%S %Z')}")
+        logger.info(f"Computed base day: {base_day.strftime('%Y-%m-%d (%A)')}")
+        logger.info(f"Next gym day (this week): {next_gym_day.strftime('%Y-%m-%d (%A)')}")
+        logger.info(f"Target reservation date (following week): {target_date.strftime('%Y-%m-%d (%A)')}")
+
+        return target_date
+
+    def warm_up(self):
+        """Start a session, log in and park on the reservation page ahead of the opening"""
+        warm_start = time.monotonic()
+        
+        # Only start-up is bounded by MAX_CONCURRENT_ACCOUNTS - every account still waits at the opening
+        with get_startup_limiter():
+            self.start_session()
+            if not self.restore_session():
+                self.login()
+                self.select_apartment()
+                self.resolve_resource()
+                self.navigate_to_reservation()
+                self.save_session()
+            self.preposition_calendar()
+        
+        self.session_ready = True
+        logger.info(f"🔥 Session warmed up in {time.monotonic() - warm_start:.1f}s - parked on the target month's calendar")
+
+    def make_reservations(self):
+        """Main function to make both reservations"""
+        try:
+            if self.session_ready and self.get_day_url(self.get_target_date()):
+                # The day page is opened directly, so reloading the parked calendar would be wasted
+                logger.info(f"Using pre-warmed {self.engine_name} session - opening the target day directly")
+            elif self.session_ready:
+                # Session was warmed up before the opening - reload the parked page so the
+                # newly opened day shows up, instead of paying for startup and login now
+                logger.info(f"Using pre-warmed {self.engine_name} session - reloading reservation page")
+                self.refresh_reservation_page()
+            else:
+                self.warm_up()
+            
+            self.run_with_retries()
+            
+            logger.info(f"Reservation process completed for both early morning time slots")
+            
+            # Bookings are done - remember this resource's slot grid for later runs
+            self.record_slot_grid()
+            
+            # Log results for both slots
+            successful_slots = [slot for slot, result in self.reservation_results.items() if result["success"]]
+            failed_slots = [slot for slot, result in self.reservation_results.items() if not result["success"]]
+            
+            logger.info(f"✅ Successful reservations: {successful_slots if successful_slots else 'None'}")
+            logger.info(f"❌ Failed reservations: {failed_slots if failed_slots else 'None'}")
+            
+            # Check if at least one reservation was successful
+            any_success = any(result["success"] for result in self.reservation_results.values())
+            if not any_success:
+                raise Exception(f"Both early morning reservations failed - no available slots found")
+            
+        except Exception as e:
+            logger.error(f"Reservation process failed: {str(e)}")
+            raise
+        finally:
+            self.close()
+
+class GymReservationCloud(ReservationEngine):
+    """Selenium engine - drives a real browser through the reservation flow"""
+    engine_name = "selenium"
+
+    def __init__(self, account=None):
+        self.driver: Optional[Union[webdriver.Chrome, webdriver.Firefox]] = None
+        self.wait: Optional[WebDriverWait] = None
+        self.driver_type: Optional[str] = None
+        self.slot_tabs = {}
+        self.day_url: Optional[str] = None
+        self.last_snapshot = None
+        self.step_timeouts = get_step_timeouts()
+        
+        # "lean" blocks images, fonts, media and third-party requests and loads pages eagerly
+        self.browser_profile = os.getenv('BROWSER_PROFILE', 'standard').lower()
+        
+        # Keep a per-account Chrome profile between runs so its HTTP cache and connections stay warm
+        self.persistent_profile = os.getenv('PERSISTENT_PROFILE', 'false').lower() == 'true'
+        self.profile: Optional[BrowserProfile] = None
+        
+        # normal waits for every subresource; eager/none return early and rely on PAGE_READY_LOCATORS
+        self.page_load_strategy = (os.getenv('PAGE_LOAD_STRATEGY') or ("eager" if self.browser_profile == "lean" else "normal")).lower()
+        if self.page_load_strategy not in ("normal", "eager", "none"):
+            logger.warning(f"Unknown PAGE_LOAD_STRATEGY '{self.page_load_strategy}', using normal")
+            self.page_load_strategy = "normal"
+        self.locators = get_locator_registry()
+        try:
+            self.settle_ms = int(os.getenv('PAGE_SETTLE_MS', '150'))
+        except Exception:
+            self.settle_ms = 150
+        super().__init__(account)
     
     def setup_chrome_driver(self):
-        """Set up Chrome WebDriver with cloud-optimized options"""
+        """Set up Chrome WebDriver, handing the persistent profile back if Chrome does not start"""
+        if self.start_chrome_driver():
+            return True
+        # The profile lock was taken for Chrome - release it before falling back to Firefox
+        self.release_profile()
+        return False
+    
+    def start_chrome_driver(self):
+        """Start Chrome WebDriver with cloud-optimized options"""
         try:
             chrome_options = ChromeOptions()
             
+            # Arguments are collected first and added once each, since several groups below share flags
+            arguments = []
+            
             # Essential options for cloud deployment
             # Only use headless mode in cloud/CI environments
             if os.getenv('GITHUB_ACTIONS') == 'true' or os.getenv('RAILWAY_ENVIRONMENT') or os.getenv('RENDER'):
-                chrome_options.add_argument("--headless")
+                arguments.append("--headless")
             else:
                 logger.info("Running in local mode - browser window will be visible for debugging")
             # Core stability options
-            chrome_options.add_argument("--no-sandbox")
-            chrome_options.add_argument("--disable-dev-shm-usage")
-            chrome_options.add_argument("--window-size=1920,1080")
+            arguments += ["--no-sandbox", "--disable-dev-shm-usage", "--window-size=1920,1080"]
             
             # Cloud-specific optimizations (only in production)
             if os.getenv('GITHUB_ACTIONS') == 'true' or os.getenv('RAILWAY_ENVIRONMENT') or os.getenv('RENDER'):
-                chrome_options.add_argument("--disable-gpu")
-                chrome_options.add_argument("--disable-extensions")
-                chrome_options.add_argument("--disable-plugins")
-                chrome_options.add_argument("--disable-images")
-                chrome_options.add_argument("--disable-background-timer-throttling")
-                chrome_options.add_argument("--disable-backgrounding-occluded-windows")
-                chrome_options.add_argument("--disable-renderer-backgrounding")
-            
-            # Anti-detection options
-            chrome_options.add_argument("--disable-features=TranslateUI")
-            chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-            chrome_options.add_argument("--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
+                arguments += [
+                    "--disable-gpu",
+                    "--disable-extensions",
+                    "--disable-plugins",
+                    "--blink-settings=imagesEnabled=false",
+                    "--disable-background-timer-throttling",
+                    "--disable-backgrounding-occluded-windows",
+                    "--disable-renderer-backgrounding",
+                ]
+            
+            chrome_options.page_load_strategy = self.page_load_strategy
+            
+            # Lean profile: minimal renderer that never fetches what the booking flow does not read
+            if self.browser_profile == "lean":
+                arguments += [
+                    "--blink-settings=imagesEnabled=false",
+                    "--disable-remote-fonts",
+                    "--disable-gpu",
+                    "--disable-extensions",
+                    "--disable-background-networking",
+                    "--disable-component-update",
+                    "--disable-default-apps",
+                    "--disable-sync",
+                    "--no-first-run",
+                    "--mute-audio",
+                    "--renderer-process-limit=2",
+                ]
+                chrome_options.add_experimental_option("prefs", {
+                    "profile.managed_default_content_settings.images": 2,
+                    "profile.default_content_setting_values.notifications": 2,
+                })
+            
+            # Anti-detection options (Chrome honours only one --disable-features, so both features share it)
+            arguments += [
+                "--disable-features=TranslateUI,VizDisplayCompositor",
+                "--disable-blink-features=AutomationControlled",
+                "--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+            ]
             chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
             chrome_options.add_experimental_option('useAutomationExtension', False)
             
+            if self.persistent_profile and not self.profile:
+                profile = BrowserProfile(self.username)
+                if profile.acquire():
+                    self.profile = profile
+                    arguments += [f"--user-data-dir={profile.path}", f"--disk-cache-size={profile.max_bytes}"]
+                    logger.info(f"Using persistent browser profile {profile.path}")
+                else:
+                    logger.warning("Persistent browser profile unavailable or in use - using a temporary profile")
+            
             # Set Chrome binary path for macOS
             if os.path.exists("/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"):
                 chrome_options.binary_location = "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"
             
             # Additional stability options
-            chrome_options.add_argument("--disable-web-security")
-            chrome_options.add_argument("--allow-running-insecure-content")
-            chrome_options.add_argument("--disable-features=VizDisplayCompositor")
-            chrome_options.add_argument("--remote-debugging-port=9222")
+            arguments += ["--disable-web-security", "--allow-running-insecure-content"]
+            
+            for argument in dict.fromkeys(arguments):
+                chrome_options.add_argument(argument)
+            
+            # Reuse the driver that worked last time, as long as the browser has not been upgraded
+            cached_path = get_cached_driver_path("chrome")
+            if cached_path:
+                try:
+                    service = ChromeService(cached_path)
+                    self.driver = webdriver.Chrome(service=service, options=chrome_options)
+                    logger.info(f"Chrome driver initialized from driver cache: {cached_path}")
+                    self.driver_type = "chrome"
+                    return True
+                except Exception as e:
+                    logger.warning(f"Cached Chrome driver failed ({e}) - re-resolving")
+                    forget_cached_driver("chrome")
             
             # Try different ChromeDriver paths
             driver_paths = [
@@ -121,6 +1828,7 @@ class GymReservationCloud:
                         self.driver = webdriver.Chrome(service=service, options=chrome_options)
                         logger.info(f"Chrome driver initialized successfully using: {path}")
                         self.driver_type = "chrome"
+                        record_working_driver("chrome", path, self.driver.capabilities)
                         return True
                     except Exception as e:
                         logger.warning(f"Chrome driver failed at {path}: {e}")
@@ -128,31 +1836,12 @@ class GymReservationCloud:
             
             # Try WebDriverManager as fallback with error handling
             try:
-                chrome_driver_path = ChromeDriverManager().install()
-                # Fix the path if WebDriverManager returns wrong file
-                if 'THIRD_PARTY_NOTICES' in chrome_driver_path:
-                    import glob
-                    # Find the actual chromedriver binary in the same directory
-                    driver_dir = os.path.dirname(chrome_driver_path)
-                    possible_drivers = glob.glob(os.path.join(driver_dir, '**/chromedriver*'), recursive=True)
-                    actual_driver = None
-                    for driver_path in possible_drivers:
-                        if os.path.isfile(driver_path) and 'chromedriver' in os.path.basename(driver_path) and 'THIRD_PARTY' not in driver_path:
-                            actual_driver = driver_path
-                            break
-                    if actual_driver and os.path.exists(actual_driver):
-                        chrome_driver_path = actual_driver
-                        logger.info(f"Fixed WebDriverManager path to: {chrome_driver_path}")
-                        # Fix permissions if needed
-                        import stat
-                        if not os.access(chrome_driver_path, os.X_OK):
-                            os.chmod(chrome_driver_path, stat.S_IRWXU | stat.S_IRGRP | stat.S_IXGRP | stat.S_IROTH | stat.S_IXOTH)
-                            logger.info("Fixed chromedriver permissions")
-                
+                chrome_driver_path = resolve_managed_driver_path("chrome")
                 service = ChromeService(chrome_driver_path)
                 self.driver = webdriver.Chrome(service=service, options=chrome_options)
                 logger.info(f"Chrome driver initialized using WebDriverManager: {chrome_driver_path}")
                 self.driver_type = "chrome"
+                record_working_driver("chrome", chrome_driver_path, self.driver.capabilities)
                 return True
             except Exception as e:
                 logger.warning(f"WebDriverManager Chrome failed: {e}")
@@ -162,6 +1851,12 @@ class GymReservationCloud:
             logger.error(f"Failed to initialize Chrome driver: {str(e)}")
             return False
     
+    def release_profile(self):
+        """Unlock the persistent browser profile, if this engine holds it"""
+        if self.profile:
+            self.profile.release()
+            self.profile = None
+    
     def setup_firefox_driver(self):
         """Set up Firefox WebDriver as fallback"""
         try:
@@ -180,6 +1875,26 @@ class GymReservationCloud:
             firefox_options.set_preference("dom.webdriver.enabled", False)
             firefox_options.set_preference("useAutomationExtension", False)
             
+            firefox_options.page_load_strategy = self.page_load_strategy
+            if self.browser_profile == "lean":
+                firefox_options.set_preference("permissions.default.image", 2)
+                firefox_options.set_preference("gfx.downloadable_fonts.enabled", False)
+                firefox_options.set_preference("media.autoplay.default", 5)
+                firefox_options.set_preference("browser.cache.disk.enable", False)
+            
+            # Reuse the driver that worked last time, as long as the browser has not been upgraded
+            cached_path = get_cached_driver_path("firefox")
+            if cached_path:
+                try:
+                    service = FirefoxService(cached_path)
+                    self.driver = webdriver.Firefox(service=service, options=firefox_options)
+                    logger.info(f"Firefox driver initialized from driver cache: {cached_path}")
+                    self.driver_type = "firefox"
+                    return True
+                except Exception as e:
+                    logger.warning(f"Cached Firefox driver failed ({e}) - re-resolving")
+                    forget_cached_driver("firefox")
+            
             # Try different GeckoDriver paths
             driver_paths = [
                 '/usr/local/bin/geckodriver',
@@ -194,6 +1909,7 @@ class GymReservationCloud:
                         self.driver = webdriver.Firefox(service=service, options=firefox_options)
                         logger.info(f"Firefox driver initialized successfully using: {path}")
                         self.driver_type = "firefox"
+                        record_working_driver("firefox", path, self.driver.capabilities)
                         return True
                     except Exception as e:
                         logger.warning(f"Firefox driver failed at {path}: {e}")
@@ -201,11 +1917,12 @@ class GymReservationCloud:
             
             # Try WebDriverManager as fallback
             try:
-                gecko_driver_path = GeckoDriverManager().install()
+                gecko_driver_path = resolve_managed_driver_path("firefox")
                 service = FirefoxService(gecko_driver_path)
                 self.driver = webdriver.Firefox(service=service, options=firefox_options)
                 logger.info(f"Firefox driver initialized using WebDriverManager: {gecko_driver_path}")
                 self.driver_type = "firefox"
+                record_working_driver("firefox", gecko_driver_path, self.driver.capabilities)
                 return True
             except Exception as e:
                 logger.warning(f"WebDriverManager Firefox failed: {e}")
@@ -233,13 +1950,232 @@ class GymReservationCloud:
         if self.driver is None:
             raise Exception("Driver is None after initialization")
         
-        # Set timeouts
+        if self.browser_profile == "lean":
+            self.block_lean_resources()
+        
+        # Set timeouts - no implicit wait, so an empty lookup returns at once and every wait
+        # is an explicit one bounded by its step budget
         self.driver.set_page_load_timeout(30)
-        self.driver.implicitly_wait(10)
+        self.driver.implicitly_wait(0)
         self.wait = WebDriverWait(self.driver, 20)
         
         logger.info(f"WebDriver initialized successfully using {self.driver_type}")
 
+    def block_lean_resources(self):
+        """Block non-essential requests through DevTools (Chrome only; Firefox relies on its prefs)"""
+        if self.driver_type != "chrome":
+            return
+        patterns = LEAN_BLOCKED_URL_PATTERNS + [pattern.strip() for pattern in os.getenv('LEAN_BLOCKED_URLS', '').split(',') if pattern.strip()]
+        try:
+            self.driver.execute_cdp_cmd('Network.enable', {})
+            self.driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+            logger.info(f"Lean profile: blocking {len(patterns)} URL patterns")
+        except Exception as e:
+            logger.warning(f"Could not enable request blocking: {str(e)}")
+
+    def start_session(self):
+        """Launch the WebDriver"""
+        self.setup_driver()
+        if not self.driver:
+            raise Exception("Failed to initialize driver")
+
+    def refresh_reservation_page(self):
+        """Reload the parked reservation page"""
+        self.navigate(None, PAGE_READY_LOCATORS["calendar"], "calendar", "Reservation page")
+
+    def navigate(self, url, ready_locator, step, description):
+        """Load url (or reload the current page when url is None) and return once ready_locator exists.
+
+        The old document must be gone first, so with the eager/none strategies a match on the
+        page being replaced is never mistaken for the new page being ready.
+        """
+        started = time.monotonic()
+        try:
+            old_root = self.driver.find_element(By.TAG_NAME, "html")
+        except Exception:
+            old_root = None
+
+        if url is None:
+            self.driver.refresh()
+        else:
+            self.driver.get(url)
+
+        def page_ready(driver):
+            if old_root is not None and not EC.staleness_of(old_root)(driver):
+                return False
+            return driver.find_elements(*ready_locator)
+        ready = self.wait_until(step, page_ready, description)
+        logger.info(f"{description} {'ready' if ready else 'loaded'} in {time.monotonic() - started:.2f}s ({self.page_load_strategy} page load)")
+        return ready
+
+    def step_wait(self, step):
+        """Return a WebDriverWait bounded by the budget configured for the step"""
+        return WebDriverWait(self.driver, self.step_timeouts.get(step, 10), poll_frequency=0.1)
+
+    def wait_until(self, step, condition, description):
+        """Wait for a readiness condition; on timeout log and carry on like the old fixed sleeps did"""
+        started = time.monotonic()
+        try:
+            result = self.step_wait(step).until(condition)
+            logger.debug(f"{description} ready after {time.monotonic() - started:.2f}s")
+            return result
+        except TimeoutException:
+            logger.warning(f"{description} not ready after {self.step_timeouts.get(step, 10)}s budget ({step}) - continuing")
+            return None
+
+    def wait_for_page_ready(self, step):
+        """Wait until the page is parsed and both DOM and network have gone quiet"""
+        return self.wait_until(step, lambda d: d.execute_script(PAGE_READY_SCRIPT, self.settle_ms), "Page")
+
+    def mark_page(self):
+        """Remember the current document and DOM state so a reaction to a click can be detected"""
+        old_root = self.driver.find_element(By.TAG_NAME, "html")
+        self.driver.execute_script(MARK_BEFORE_CLICK_SCRIPT)
+        return old_root
+
+    def wait_for_reaction(self, old_root, step):
+        """Wait until the marked page navigates or updates, then until it settles"""
+        # Either the click loads a new document (old root goes stale) or it updates this one
+        def page_reacted(driver):
+            try:
+                return EC.staleness_of(old_root)(driver) or \
+                    driver.execute_script("return window.__gymLastMutation !== window.__gymClickMark;")
+            except Exception:
+                return True
+        self.wait_until(step, page_reacted, "Click response")
+        self.wait_for_page_ready(step)
+
+    def click_and_wait(self, element, step):
+        """Click an element and wait for the resulting navigation or DOM update to settle"""
+        old_root = self.mark_page()
+        element.click()
+        self.wait_for_reaction(old_root, step)
+
+    def find_with_strategies(self, step, **params):
+        """Wait for the first of the step's locator strategies to match, last known-good first.
+
+        Every poll evaluates all strategies in one script call and the whole chain shares a single
+        deadline (the step's budget), so a miss costs the budget once rather than once per strategy.
+        """
+        strategies = self.locators.ordered(step)
+        xpaths = [xpath.format(**params) for name, xpath in strategies]
+        match = self.wait_until(LOCATOR_BUDGET_STEPS.get(step, step),
+                                lambda d: d.execute_script(FIND_FIRST_MATCH_SCRIPT, xpaths), f"Locator '{step}'")
+        if not match:
+            self.locators.record(step, [name for name, xpath in strategies], None)
+            return []
+
+        index, elements = match
+        tried = [name for name, xpath in strategies[:index + 1]]
+        self.locators.record(step, tried, tried[-1])
+        if index > 0:
+            logger.info(f"Locator '{step}' matched with fallback strategy '{tried[-1]}'")
+        return elements
+
+    def snapshot_page(self, calendar_step=None):
+        """Read the page's rows, buttons, text and (optionally) calendar cells in one script call"""
+        xpaths = [xpath for name, xpath in self.locators.ordered(calendar_step)] if calendar_step else []
+        return self.driver.execute_script(PAGE_SNAPSHOT_SCRIPT, xpaths)
+
+    def element_for(self, entry):
+        """Resolve a snapshot entry back to its live element"""
+        return self.driver.find_element(By.CSS_SELECTOR, f'[data-gym-ref="{entry["ref"]}"]')
+
+    def find_calendar_days(self):
+        """Return the available calendar day cells from a page snapshot, using the locator registry"""
+        strategies = self.locators.ordered("calendar_days")
+        calendar = self.snapshot_page("calendar_days")["calendar"]
+        if not calendar:
+            self.locators.record("calendar_days", [name for name, xpath in strategies], None)
+            return []
+        tried = [name for name, xpath in strategies[:calendar["strategy"] + 1]]
+        self.locators.record("calendar_days", tried, tried[-1])
+        self.learn_day_url([(cell["link"], cell["text"]) for cell in calendar["cells"]])
+        return calendar["cells"]
+
+    def get_session_cookies(self):
+        """Return the browser cookies"""
+        return self.driver.get_cookies()
+
+    def apply_session_cookies(self, cookies):
+        """Load cached cookies into the browser"""
+        if self.driver_type == "chrome":
+            # CDP can set cookies before any page is loaded, saving a navigation
+            cdp_cookies = []
+            for cookie in cookies:
+                cdp_cookie = {key: cookie[key] for key in ('name', 'value', 'domain', 'path', 'secure', 'httpOnly') if key in cookie}
+                if 'expiry' in cookie:
+                    cdp_cookie['expires'] = cookie['expiry']
+                cdp_cookies.append(cdp_cookie)
+            self.driver.execute_cdp_cmd('Network.setCookies', {'cookies': cdp_cookies})
+        else:
+            # Firefox only accepts cookies for the domain currently loaded
+            self.driver.get(self.base_url)
+            for cookie in cookies:
+                self.driver.add_cookie({key: value for key, value in cookie.items() if key != 'sameSite'})
+        logger.info(f"Loaded {len(cookies)} cached cookies into the browser")
+
+    def is_authenticated(self):
+        """Check that the reservation page was not replaced by the login form"""
+        if "login.php" in self.driver.current_url:
+            return False
+        return not self.driver.execute_script("return !!document.querySelector('input[type=password]');")
+
+    def load_page(self, url):
+        """Open a page in the browser and wait for it to be ready"""
+        self.driver.get(url)
+        self.wait_for_page_ready("apartment")
+
+    def get_day_page_locator(self):
+        """Locator matching the wanted slots' rows, or the 'Regresar' button of the apology page"""
+        slot_rows = " or ".join(f"contains(., '{time_slot}')" for time_slot in self.time_slots)
+        return (By.XPATH, f"//tr[{slot_rows}] | //a[contains(text(), 'Regresar')] | //button[contains(text(), 'Regresar')]")
+
+    def load_day_page(self, url):
+        """Open a day page with a single driver.get and check it shows the slot grid"""
+        self.navigate(url, self.get_day_page_locator(), "calendar", "Day page")
+        snapshot = self.snapshot_page()
+        if is_advance_error_snapshot(snapshot):
+            return "too_early"
+        if not any(time_slot in snapshot["text"] for time_slot in self.time_slots):
+            return "invalid"
+        self.day_url = snapshot["url"]
+        return "ok"
+
+    def read_slot_grid(self, reload=True):
+        """Reload the day page in place and return one snapshot of it, or None off the slot grid"""
+        if reload:
+            self.navigate(None, self.get_day_page_locator(), "slot", "Day page")
+        snapshot = self.snapshot_page()
+        if is_advance_error_snapshot(snapshot) or not any(time_slot in snapshot["text"] for time_slot in self.time_slots):
+            return None
+        return snapshot
+
+    def get_page_links(self):
+        """Collect resource links from the current page in a single script call"""
+        return self.driver.execute_script(COLLECT_RESOURCE_LINKS_SCRIPT) or []
+
+    def get_page_text(self):
+        """Return the visible text of the current page"""
+        return self.driver.execute_script("return document.body ? document.body.innerText : '';") or ''
+
+    def close(self):
+        """Quit the driver and forget any warmed-up session"""
+        if self.driver:
+            try:
+                self.driver.quit()
+                logger.info("Driver closed")
+            except Exception as e:
+                logger.warning(f"Error while closing driver: {str(e)}")
+        self.driver = None
+        self.wait = None
+        self.slot_tabs = {}
+        self.release_profile()
+        self.locators.save()
+        for line in self.locators.summary():
+            logger.debug(f"Locator {line}")
+        super().close()
+
     def login(self):
         """Login to the condomisoft system"""
         try:
@@ -247,10 +2183,9 @@ class GymReservationCloud:
             assert self.wait is not None, "Wait must be initialized before login"
             
             logger.info("Navigating to login page")
-            self.driver.get(self.login_url)
             
-            # Wait for page to load
-            time.sleep(3)
+            # Return as soon as either the login form or a logout link (already logged in) is present
+            self.navigate(self.login_url, PAGE_READY_LOCATORS["login"], "login", "Login form")
             
             # Check if we're already logged in by looking for logout link or user info
             if self.driver.find_elements(By.XPATH, "//a[contains(text(), 'Salir') or contains(text(), 'Logout')]"):
@@ -261,12 +2196,8 @@ class GymReservationCloud:
             username_field = None
             password_field = None
             
-            # Try to find username field - first try correct name, then fallback
-            username_elements = self.driver.find_elements(By.NAME, "usuario")
-            if not username_elements:
-                username_elements = self.driver.find_elements(By.NAME, "user")
-            if not username_elements:
-                username_elements = self.driver.find_elements(By.XPATH, "//input[@type='text' or @type='email']")
+            # Try to find username field - last working strategy first, then fallbacks
+            username_elements = self.find_with_strategies("login_username")
             
             if username_elements:
                 username_field = username_elements[0]
@@ -275,12 +2206,8 @@ class GymReservationCloud:
                 logger.error("No username field found")
                 raise Exception("Username field not found")
             
-            # Try to find password field - first try correct name, then fallback
-            password_elements = self.driver.find_elements(By.NAME, "clave")
-            if not password_elements:
-                password_elements = self.driver.find_elements(By.NAME, "pass")
-            if not password_elements:
-                password_elements = self.driver.find_elements(By.XPATH, "//input[@type='password']")
+            # Try to find password field - last working strategy first, then fallbacks
+            password_elements = self.find_with_strategies("login_password")
             
             if password_elements:
                 password_field = password_elements[0]
@@ -306,8 +2233,13 @@ class GymReservationCloud:
                 password_field.send_keys("\n")
                 logger.info("Submitted login by pressing Enter")
             
-            # Wait for login to process
-            time.sleep(5)
+            # Wait for login to process: redirect away from the login page, logout link or error message
+            self.wait_until("login", EC.any_of(
+                EC.url_changes(self.login_url),
+                EC.presence_of_element_located((By.XPATH, "//a[contains(text(), 'Salir') or contains(text(), 'Logout')]")),
+                EC.presence_of_element_located((By.XPATH, "//*[contains(text(), 'error') or contains(text(), 'incorrecto') or contains(text(), 'invalid')]"))
+            ), "Login response")
+            self.wait_for_page_ready("login")
             
             # Check for successful login (redirect or presence of logout link)
             current_url = self.driver.current_url
@@ -335,44 +2267,36 @@ class GymReservationCloud:
             raise
 
     def select_apartment(self):
-        """Select the G-502 apartment from the dashboard"""
+        """Select the configured apartment (e.g. G-502) from the dashboard"""
         try:
             assert self.driver is not None, "Driver must be initialized"
             
-            logger.info("Selecting apartment G-502")
+            logger.info(f"Selecting apartment {self.apartment}")
+            building, number = self.apartment.split('-', 1)
             
             # Wait for the condominium list to load
-            time.sleep(3)
+            self.wait_until("apartment", EC.presence_of_element_located(
+                (By.XPATH, f"//*[contains(text(), '{building}') and contains(text(), '{number}')]")), "Apartment list")
             
-            # Look for the G-502 button (it should be in the "Vivienda" column)
+            # Look for the apartment button (it should be in the "Vivienda" column, or the FLOW row)
             # The button text might have spaces like "G - 502"
-            g502_buttons = self.driver.find_elements(By.XPATH, "//button[contains(text(), 'G') and contains(text(), '502')] | //a[contains(text(), 'G') and contains(text(), '502')]")
-            
-            if not g502_buttons:
-                # Try looking in the FLOW building row for G-502
-                g502_buttons = self.driver.find_elements(By.XPATH, "//tr[contains(., 'FLOW')]//button[contains(text(), 'G') and contains(text(), '502')] | //tr[contains(., 'FLOW')]//a[contains(text(), 'G') and contains(text(), '502')]")
+            apartment_buttons = self.find_with_strategies("apartment_button", building=building, number=number)
             
-            if not g502_buttons:
-                # Try looking for any element containing G and 502
-                g502_buttons = self.driver.find_elements(By.XPATH, "//*[contains(text(), 'G') and contains(text(), '502')]")
-            
-            if g502_buttons:
+            if apartment_buttons:
                 # Make sure it's clickable
-                clickable_element = g502_buttons[0]
+                clickable_element = apartment_buttons[0]
                 if clickable_element.tag_name not in ['button', 'a']:
                     # Look for clickable parent or child
                     parent_clickable = clickable_element.find_elements(By.XPATH, ".//button | .//a | ./ancestor::button | ./ancestor::a")
                     if parent_clickable:
                         clickable_element = parent_clickable[0]
                 
-                clickable_element.click()
-                logger.info("Successfully clicked G-502 apartment button")
-                
-                # Wait for the apartment selection to process
-                time.sleep(3)
+                # Click and wait for the apartment selection to process
+                self.click_and_wait(clickable_element, "apartment")
+                logger.info(f"Successfully clicked {self.apartment} apartment button")
                 
             else:
-                logger.warning("G-502 button not found - checking available options")
+                logger.warning(f"{self.apartment} button not found - checking available options")
                 # Log all table rows for debugging
                 rows = self.driver.find_elements(By.XPATH, "//tr")
                 logger.info(f"Found {len(rows)} table rows")
@@ -387,7 +2311,7 @@ class GymReservationCloud:
                 for i, btn in enumerate(all_buttons[:5]):
                     logger.info(f"  Button {i}: {btn.text}")
                 
-                raise Exception("G-502 apartment button not found")
+                raise Exception(f"{self.apartment} apartment button not found")
                 
         except Exception as e:
             logger.error(f"Failed to select apartment: {str(e)}")
@@ -396,16 +2320,11 @@ class GymReservationCloud:
     def navigate_to_reservation(self):
         """Navigate to gym reservation page"""
         try:
-            # Navigate to the gym reservation page
-            reservation_url = "https://www.condomisoft.com/system/detalle_recursos.php?id_recurso=1780&nombre_recurso=GIMNASIO%20CUARTO%20PILATES%20Y%20%20SAL%C3%93N%20AEROBI"
+            logger.info(f"Navigating to reservation page: {self.reservation_url}")
             
-            logger.info(f"Navigating to reservation page: {reservation_url}")
-            self.driver.get(reservation_url)
-            
-            # Wait for page to load with explicit wait instead of sleep
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.TAG_NAME, "body"))
-            )
+            # Return as soon as the calendar table exists
+            self.navigate(self.reservation_url, PAGE_READY_LOCATORS["calendar"], "calendar", "Reservation page")
+            self.calendar_month = None
             
             logger.info("Successfully navigated to reservation page")
             
@@ -413,45 +2332,28 @@ class GymReservationCloud:
             logger.error(f"Failed to navigate to reservation page: {str(e)}")
             raise
 
-    def get_target_date(self):
-        """Calculate the target reservation date for the FOLLOWING week's gym day.
+    def get_current_url(self):
+        """Return the browser's current URL"""
+        return self.driver.current_url
 
-        Requirements:
-        - When running Sunday/Tuesday/Thursday at ~23:30, target is the next day (Mon/Wed/Fri) PLUS 7 days.
-        - When running at 00:00–06:00 on Mon/Wed/Fri (post-midnight), target is the SAME weekday plus 7 days.
-        - For ad-hoc daytime runs, target is next week's same weekday.
-        """
-        mexico_tz = pytz.timezone('America/Mexico_City')
-        now = datetime.now(mexico_tz)
-
-        current_weekday = now.weekday()  # Monday=0, ... Sunday=6
-        current_hour = now.hour
-
-        # Determine the base day we want to reserve FOR (this week or next) before adding +7
-        if current_hour >= 23:
-            # Night before: base is tomorrow (e.g., Sun->Mon, Tue->Wed, Thu->Fri)
-            base_day = now + timedelta(days=1)
-        elif 0 <= current_hour < 6:
-            # Early morning of gym day: base is today (e.g., Mon/Wed/Fri)
-            base_day = now
-        else:
-            # Daytime/manual run: base is today (we'll roll to next gym day if needed)
-            base_day = now
-
-        # Find the next gym day relative to base_day (including today if it is a gym day)
-        gym_days = [0, 2, 4]  # Mon, Wed, Fri
-        days_until_next_gym = min(((d - base_day.weekday()) % 7) for d in gym_days)
-        next_gym_day = base_day + timedelta(days=days_until_next_gym)
-
-        # Target is the same weekday in the FOLLOWING week
-        target_date = next_gym_day + timedelta(days=7)
-
-        logger.info(f"Current time (Mexico City): {now.strftime('%Y-%m-%d %H:%M:%S %Z')}")
-        logger.info(f"Computed base day: {base_day.strftime('%Y-%m-%d (%A)')}")
-        logger.info(f"Next gym day (this week): {next_gym_day.strftime('%Y-%m-%d (%A)')}")
-        logger.info(f"Target reservation date (following week): {target_date.strftime('%Y-%m-%d (%A)')}")
+    def advance_calendar(self, months, log_prefix=""):
+        """Click the >> button the given number of times, stopping at the first failure"""
+        for i in range(months):
+            try:
+                next_buttons = self.find_with_strategies("next_month")
+                if not next_buttons:
+                    logger.error(f"{log_prefix}No next month button found for step {i+1}")
+                    break
+                self.click_and_wait(next_buttons[0], "calendar")
+                self.note_month_advanced()
+                logger.info(f"{log_prefix}Advanced calendar to next month (step {i+1}/{months})")
+            except Exception as e:
+                logger.error(f"{log_prefix}Could not advance to next month (step {i+1}): {str(e)}")
+                break
 
-        return target_date
+    def locate_target_day(self, target_date):
+        """Check the snapshot of the calendar for the target day's cell"""
+        return any(day["text"] in (str(target_date.day), f"{target_date.day:02d}") for day in self.find_calendar_days())
 
     def select_calendar_day(self):
         """Select the next occurrence of the same day of the week from the calendar"""
@@ -463,67 +2365,29 @@ class GymReservationCloud:
             target_month = target_date.month
             target_year = target_date.year
             
-            # Get current month/year from system
-            current_date = datetime.now(pytz.timezone('America/Mexico_City'))
-            current_month = current_date.month
-            current_year = current_date.year
-            
-            logger.info(f"Looking for day {target_day} in {target_date.strftime('%B %Y')} (target: {target_month}/{target_year}, current: {current_month}/{current_year})")
-            
-            # Wait for calendar to load
-            time.sleep(1)  # Reduced from 2
-            
-            # Navigate to the correct month if needed
-            months_to_advance = 0
-            if target_year > current_year:
-                months_to_advance = (target_year - current_year) * 12 + (target_month - current_month)
-            elif target_year == current_year and target_month > current_month:
-                months_to_advance = target_month - current_month
-            
-            # Click the >> button to advance months if necessary
-            for i in range(months_to_advance):
-                try:
-                    next_month_button = self.driver.find_element(By.XPATH, "//a[contains(text(), '>>') or contains(@onclick, 'next') or contains(@title, 'next')]")
-                    next_month_button.click()
-                    logger.info(f"Advanced calendar to next month (step {i+1}/{months_to_advance})")
-                    time.sleep(0.5)  # Reduced from 1
-                except Exception as e:
-                    logger.warning(f"Could not advance to next month (step {i+1}): {str(e)}")
-                    # Try alternative selectors for next month button
-                    try:
-                        # Try looking for >> symbol or similar navigation
-                        next_buttons = self.driver.find_elements(By.XPATH, "//a[contains(text(), '>') or contains(text(), 'siguiente') or contains(text(), 'next')]")
-                        if next_buttons:
-                            next_buttons[-1].click()  # Usually the >> button is the last one
-                            logger.info(f"Advanced calendar using alternative selector (step {i+1}/{months_to_advance})")
-                            time.sleep(0.5)  # Reduced from 1
-                        else:
-                            logger.error(f"No next month button found for step {i+1}")
-                            break
-                    except Exception as e2:
-                        logger.error(f"Failed to find any next month button: {str(e2)}")
-                        break
+            # One driver.get of the day page when the calendar's link pattern is already known
+            if self.open_day_directly(target_date):
+                return True
+            
+            # Month the calendar is showing (the current one unless it was pre-positioned)
+            shown_year, shown_month = self.get_calendar_month()
             
-            # Wait for calendar to update after navigation
-            if months_to_advance > 0:
-                time.sleep(1)  # Reduced from 2
+            logger.info(f"Looking for day {target_day} in {target_date.strftime('%B %Y')} (target: {target_month}/{target_year}, showing: {shown_month}/{shown_year})")
             
-            # Look for available days (green highlighted days in the calendar)
-            available_days = self.driver.find_elements(By.XPATH, "//td[contains(@style, 'background-color: #90EE90') or contains(@style, 'background-color: green') or contains(@class, 'available')]")
+            # Wait for calendar to load
+            self.wait_until("calendar", EC.presence_of_element_located((By.XPATH, "//td[@onclick]")), "Calendar")
             
-            if not available_days:
-                # Try looking for clickable calendar cells that contain numbers
-                available_days = self.driver.find_elements(By.XPATH, "//td[@onclick and text() and string-length(text()) <= 2 and text() != ' ']")
+            # Click the >> button to reach the target month (nothing left to do if pre-positioned)
+            self.advance_calendar(self.get_months_to_advance(target_date))
             
-            if not available_days:
-                # Try looking for any clickable day numbers in the calendar
-                available_days = self.driver.find_elements(By.XPATH, "//td[text() and @onclick and not(contains(@class, 'disabled'))]")
+            # Look for available days (green highlighted days, else clickable day numbers)
+            available_days = self.find_calendar_days()
             
             if available_days:
                 # Log available days for debugging
                 logger.info(f"Found {len(available_days)} available days in the correct month")
                 for i, day in enumerate(available_days[:10]):  # Show first 10 days
-                    logger.info(f"  Day {i}: {day.text}")
+                    logger.info(f"  Day {i}: {day['text']}")
                 
                 # Look for the specific target day (try both single digit and zero-padded)
                 target_day_element = None
@@ -531,35 +2395,33 @@ class GymReservationCloud:
                 target_day_padded = f"{target_day:02d}"  # Zero-padded (e.g., "08")
                 
                 for day_element in available_days:
-                    day_text = day_element.text.strip()
+                    day_text = day_element["text"]
                     if day_text == target_day_str or day_text == target_day_padded:
                         target_day_element = day_element
                         logger.info(f"Found target day: '{day_text}' matches target {target_day}")
                         break
                 
                 if target_day_element:
-                    target_day_element.click()
+                    # Click and wait for the day selection to process
+                    self.click_and_wait(self.element_for(target_day_element), "calendar")
                     logger.info(f"Selected calendar day: {target_day} in {target_date.strftime('%B %Y')}")
                     
-                    # Wait for the day selection to process
-                    time.sleep(1)  # Reduced from 3
-                    
                     # Check if we got the "7 days in advance" error
-                    if self.check_and_handle_advance_error():
-                        return True
-                    
+                    if not self.check_and_handle_advance_error():
+                        return False
+                    self.day_url = self.last_snapshot["url"]
                     return True
                 else:
                     logger.warning(f"Target day {target_day} not found in available days for {target_date.strftime('%B %Y')}")
                     # Fall back to selecting the first available day
-                    available_days[0].click()
-                    logger.info(f"Selected fallback day: {available_days[0].text} in {target_date.strftime('%B %Y')}")
-                    time.sleep(1)  # Reduced from 3
+                    fallback_day_text = available_days[0]["text"]
+                    self.click_and_wait(self.element_for(available_days[0]), "calendar")
+                    logger.info(f"Selected fallback day: {fallback_day_text} in {target_date.strftime('%B %Y')}")
                     
                     # Check if we got the "7 days in advance" error
-                    if self.check_and_handle_advance_error():
-                        return True
-                    
+                    if not self.check_and_handle_advance_error():
+                        return False
+                    self.day_url = self.last_snapshot["url"]
                     return True
             else:
                 logger.warning(f"No available days found in calendar for {target_date.strftime('%B %Y')}")
@@ -570,48 +2432,19 @@ class GymReservationCloud:
             return False
 
     def check_and_handle_advance_error(self):
-        """Check for the '7 days in advance' error message and handle it"""
+        """Check for the '7 days in advance' error message; returns False if the page shows it.
+
+        Getting back to the day is left to the in-session retry loop (run_with_retries).
+        """
         try:
             assert self.driver is not None, "Driver must be initialized"
             
-            # Check if we're on the apology page with the error message
-            current_url = self.driver.current_url
-            if "apology.php" in current_url and "m%C3%A1s%20de%207%20d%C3%ADas" in current_url:
-                logger.warning("Detected '7 days in advance' error - trying to return and select correct date")
-                
-                # Click the "Regresar" button
-                regresar_button = self.driver.find_elements(By.XPATH, "//a[contains(text(), 'Regresar')] | //button[contains(text(), 'Regresar')]")
-                if regresar_button:
-                    regresar_button[0].click()
-                    logger.info("Clicked 'Regresar' button")
-                    time.sleep(2)
-                    
-                    # Return to reservation page and try again with correct date
-                    self.navigate_to_reservation()
-                    return self.select_calendar_day_with_retry()
-                else:
-                    logger.error("Could not find 'Regresar' button")
-                    return False
-            
-            # Check for the error message in the page content
-            error_message_elements = self.driver.find_elements(By.XPATH, "//div[contains(text(), 'No se acepta reservaciones con más de 7 días')] | //p[contains(text(), 'No se acepta reservaciones con más de 7 días')] | //*[contains(text(), 'No se acepta reservaciones con más de 7 días')]")
-            
-            if error_message_elements:
-                logger.warning("Found '7 days in advance' error message on page")
-                
-                # Look for and click "Regresar" button
-                regresar_button = self.driver.find_elements(By.XPATH, "//a[contains(text(), 'Regresar')] | //button[contains(text(), 'Regresar')]")
-                if regresar_button:
-                    regresar_button[0].click()
-                    logger.info("Clicked 'Regresar' button")
-                    time.sleep(2)
-                    
-                    # Return to reservation page and try again with correct date
-                    self.navigate_to_reservation()
-                    return self.select_calendar_day_with_retry()
-                else:
-                    logger.error("Could not find 'Regresar' button")
-                    return False
+            # One snapshot covers both the apology-page URL and the error message in the page
+            snapshot = self.snapshot_page()
+            self.last_snapshot = snapshot
+            if is_advance_error_snapshot(snapshot):
+                logger.warning("Detected '7 days in advance' error")
+                return False
             
             return True  # No error found, continue normally
             
@@ -619,151 +2452,54 @@ class GymReservationCloud:
             logger.error(f"Error checking for advance error: {str(e)}")
             return False
 
-    def select_calendar_day_with_retry(self):
-        """Retry selecting the calendar day using the same target date logic."""
-        try:
-            target_date = self.get_target_date()
-            target_day = target_date.day
-            target_month = target_date.month
-            target_year = target_date.year
+    def is_too_early(self):
+        """Check the page on screen for the '7 days in advance' rejection"""
+        return is_advance_error_snapshot(self.snapshot_page())
 
-            # Current month/year (Mexico City)
-            now = datetime.now(pytz.timezone('America/Mexico_City'))
-            current_month = now.month
-            current_year = now.year
+    def find_slot_button(self, time_slot):
+        """Find the clickable 'Disponible' element for a time slot, or None"""
+        # The 'Disponible' button in the slot's row, else any clickable element with the time
+        time_buttons = self.find_with_strategies("slot_button", time_slot=time_slot)
+        return time_buttons[0] if time_buttons else None
 
-            logger.info(f"Retry: Looking for day {target_day} in {target_date.strftime('%B %Y')} (following week's {target_date.strftime('%A')})")
-            
-            # Wait for calendar to load
-            time.sleep(1)  # Reduced from 2
-            
-            # Navigate to the correct month if needed
-            months_to_advance = 0
-            if target_year > current_year:
-                months_to_advance = (target_year - current_year) * 12 + (target_month - current_month)
-            elif target_year == current_year and target_month > current_month:
-                months_to_advance = target_month - current_month
-            
-            # Click the >> button to advance months if necessary
-            for i in range(months_to_advance):
-                try:
-                    next_month_button = self.driver.find_element(By.XPATH, "//a[contains(text(), '>>') or contains(@onclick, 'next') or contains(@title, 'next')]")
-                    next_month_button.click()
-                    logger.info(f"Retry: Advanced calendar to next month (step {i+1}/{months_to_advance})")
-                    time.sleep(0.5)  # Reduced from 1
-                except Exception as e:
-                    logger.warning(f"Retry: Could not advance to next month (step {i+1}): {str(e)}")
-                    # Try alternative selectors for next month button
-                    try:
-                        next_buttons = self.driver.find_elements(By.XPATH, "//a[contains(text(), '>') or contains(text(), 'siguiente') or contains(text(), 'next')]")
-                        if next_buttons:
-                            next_buttons[-1].click()  # Usually the >> button is the last one
-                            logger.info(f"Retry: Advanced calendar using alternative selector (step {i+1}/{months_to_advance})")
-                            time.sleep(0.5)  # Reduced from 1
-                        else:
-                            logger.error(f"Retry: No next month button found for step {i+1}")
-                            break
-                    except Exception as e2:
-                        logger.error(f"Retry: Failed to find any next month button: {str(e2)}")
-                        break
-            
-            # Wait for calendar to update after navigation
-            if months_to_advance > 0:
-                time.sleep(1)  # Reduced from 2
-            
-            # Look for available days
-            available_days = self.driver.find_elements(By.XPATH, "//td[contains(@style, 'background-color: #90EE90') or contains(@style, 'background-color: green') or contains(@class, 'available')]")
-            
-            if not available_days:
-                available_days = self.driver.find_elements(By.XPATH, "//td[@onclick and text() and string-length(text()) <= 2 and text() != ' ']")
-            
-            if not available_days:
-                available_days = self.driver.find_elements(By.XPATH, "//td[text() and @onclick and not(contains(@class, 'disabled'))]")
-            
-            if available_days:
-                # Log available days for debugging
-                logger.info(f"Retry: Found {len(available_days)} available days in the correct month")
-                for i, day in enumerate(available_days[:10]):  # Show first 10 days
-                    logger.info(f"  Retry Day {i}: {day.text}")
-                
-                # Look for the specific target day (try both single digit and zero-padded)
-                target_day_element = None
-                target_day_str = str(target_day)
-                target_day_padded = f"{target_day:02d}"  # Zero-padded (e.g., "08")
-                
-                for day_element in available_days:
-                    day_text = day_element.text.strip()
-                    if day_text == target_day_str or day_text == target_day_padded:
-                        target_day_element = day_element
-                        logger.info(f"Retry: Found target day: '{day_text}' matches target {target_day}")
-                        break
-                
-                if target_day_element:
-                    target_day_element.click()
-                    logger.info(f"Retry: Selected calendar day: {target_day} in {target_date.strftime('%B %Y')}")
-                    time.sleep(1)  # Reduced from 3
-                    return True
-                else:
-                    logger.warning(f"Retry: Target day {target_day} not found in {target_date.strftime('%B %Y')}, selecting first available day")
-                    available_days[0].click()
-                    logger.info(f"Retry: Selected fallback day: {available_days[0].text} in {target_date.strftime('%B %Y')}")
-                    time.sleep(1)  # Reduced from 3
-                    return True
-            else:
-                logger.warning(f"Retry: No available days found in calendar for {target_date.strftime('%B %Y')}")
-                return False
-                
-        except Exception as e:
-            logger.error(f"Failed to select calendar day with retry: {str(e)}")
-            return False
+    def find_confirm_button(self):
+        """Find the confirmation button shown after picking a slot, or None"""
+        confirm_buttons = self.driver.find_elements(By.XPATH, "//button[contains(text(), 'Confirmar') or contains(text(), 'Reservar') or contains(text(), 'Aceptar')]")
+        return confirm_buttons[0] if confirm_buttons else None
 
     def reserve_time_slot(self, time_slot):
         """Reserve a specific time slot"""
         try:
             logger.info(f"Attempting to reserve {time_slot} slot")
             
-            # Look for the specific time slot in the table
-            # First try to find by exact text match
-            time_buttons = self.driver.find_elements(By.XPATH, f"//td[contains(text(), '{time_slot}')]//following-sibling::td//button[contains(text(), 'Disponible')]")
-            
-            if not time_buttons:
-                # Try finding the "Disponible" button in the same row as the time
-                time_buttons = self.driver.find_elements(By.XPATH, f"//td[text()='{time_slot}']//following-sibling::td//button | //td[text()='{time_slot}']//following-sibling::td//a")
+            # The previous slot's booking left the browser on the page it answered with
+            if self.day_url and self.driver.current_url != self.day_url:
+                self.return_to_day_page()
             
-            if not time_buttons:
-                # Try finding any clickable element with "Disponible" text
-                time_buttons = self.driver.find_elements(By.XPATH, f"//tr[contains(., '{time_slot}')]//button[contains(text(), 'Disponible')] | //tr[contains(., '{time_slot}')]//a[contains(text(), 'Disponible')]")
+            slot_button = self.find_slot_button(time_slot)
             
-            if not time_buttons:
-                # Fallback: look for any clickable element containing the time
-                time_buttons = self.driver.find_elements(By.XPATH, f"//*[contains(text(), '{time_slot}') and (@onclick or @href)]")
-            
-            if time_buttons:
-                # Click the first available button
-                self.driver.execute_script("arguments[0].scrollIntoView(true);", time_buttons[0])
-                time.sleep(0.5)  # Reduced from 1
-                time_buttons[0].click()
+            if slot_button:
+                self.day_url = self.driver.current_url
                 
-                # Wait for confirmation or next step
-                time.sleep(1)  # Reduced from 3
+                # Click the first available button and wait for confirmation or next step
+                self.driver.execute_script("arguments[0].scrollIntoView(true);", slot_button)
+                self.click_and_wait(slot_button, "slot")
                 
                 # Check if we got the "7 days in advance" error after clicking
                 if not self.check_and_handle_advance_error():
                     return False
                 
                 # Look for confirmation button
-                confirm_buttons = self.driver.find_elements(By.XPATH, "//button[contains(text(), 'Confirmar') or contains(text(), 'Reservar') or contains(text(), 'Aceptar')]")
-                if confirm_buttons:
-                    confirm_buttons[0].click()
+                confirm_button = self.find_confirm_button()
+                if confirm_button:
+                    self.click_and_wait(confirm_button, "confirm")
                     logger.info(f"Clicked confirmation button for {time_slot} slot")
-                    time.sleep(1)  # Reduced from 3
                     
                     # Check if we got the "7 days in advance" error after confirmation
                     if not self.check_and_handle_advance_error():
                         return False
                 else:
                     logger.info(f"Reservation for {time_slot} initiated (no confirmation button found)")
-                    time.sleep(1)  # Reduced from 2
                     
                     # Check if we got the "7 days in advance" error
                     if not self.check_and_handle_advance_error():
@@ -772,194 +2508,984 @@ class GymReservationCloud:
             else:
                 logger.warning(f"No available slot found for {time_slot}")
                 return False
-                
+            
+            # The last advance-error check read the page the booking landed on
+            self.booking_responses[time_slot] = self.last_snapshot
             return True
                 
         except Exception as e:
             logger.error(f"Failed to reserve {time_slot} slot: {str(e)}")
             raise
 
+    def fire_click(self, element):
+        """Click via JavaScript without waiting for the navigation it triggers"""
+        self.driver.execute_script("var el = arguments[0]; setTimeout(function() { el.click(); }, 0);", element)
+
+    def reserve_time_slots_parallel(self, time_slots):
+        """Book every slot from its own tab of the logged-in session, firing the clicks back to back"""
+        day_url = self.driver.current_url
+        self.day_url = day_url
+        main_handle = self.driver.current_window_handle
+        existing_handles = set(self.driver.window_handles)
+        
+        try:
+            # Open one tab per extra slot; window.open returns at once so the tabs load concurrently
+            for _ in time_slots[1:]:
+                self.driver.execute_script("window.open(arguments[0], '_blank');", day_url)
+            new_handles = [handle for handle in self.driver.window_handles if handle not in existing_handles]
+            if len(new_handles) != len(time_slots) - 1:
+                raise Exception(f"Expected {len(time_slots) - 1} new tabs, got {len(new_handles)}")
+            self.slot_tabs = dict(zip(time_slots, [main_handle] + new_handles))
+        
+            attempted = {}
+            armed = {}
+            for time_slot, handle in self.slot_tabs.items():
+                self.driver.switch_to.window(handle)
+                if self.browser_profile == "lean" and handle != main_handle:
+                    # Request blocking is per tab - cover the confirm and validation loads of new tabs
+                    self.block_lean_resources()
+                self.wait_until("slot", EC.presence_of_element_located((By.XPATH, f"//tr[contains(., '{time_slot}')]")), f"Slot grid for {time_slot}")
+                slot_button = self.find_slot_button(time_slot)
+                if slot_button:
+                    armed[time_slot] = (slot_button, self.mark_page())
+                else:
+                    logger.warning(f"No available slot found for {time_slot}")
+                    attempted[time_slot] = False
+        
+            # Fire all slot clicks within a few milliseconds of each other
+            fire_start = time.monotonic()
+            for time_slot, (slot_button, _) in armed.items():
+                self.driver.switch_to.window(self.slot_tabs[time_slot])
+                self.fire_click(slot_button)
+            logger.info(f"⚡ Fired {len(armed)} slot clicks in {(time.monotonic() - fire_start) * 1000:.0f} ms")
+        
+            # Arm the confirmation in every tab, then fire those back to back as well
+            confirming = {}
+            for time_slot, (_, old_root) in armed.items():
+                try:
+                    self.driver.switch_to.window(self.slot_tabs[time_slot])
+                    self.wait_for_reaction(old_root, "slot")
+                    if not self.check_and_handle_advance_error():
+                        attempted[time_slot] = False
+                        continue
+                    confirm_button = self.find_confirm_button()
+                    if confirm_button:
+                        confirming[time_slot] = (confirm_button, self.mark_page())
+                    else:
+                        logger.info(f"Reservation for {time_slot} initiated (no confirmation button found)")
+                        attempted[time_slot] = True
+                        self.booking_responses[time_slot] = self.last_snapshot
+                except Exception as e:
+                    logger.error(f"Failed to reserve {time_slot} slot: {str(e)}")
+                    attempted[time_slot] = False
+        
+            for time_slot, (confirm_button, _) in confirming.items():
+                self.driver.switch_to.window(self.slot_tabs[time_slot])
+                self.fire_click(confirm_button)
+        
+            for time_slot, (_, old_root) in confirming.items():
+                try:
+                    self.driver.switch_to.window(self.slot_tabs[time_slot])
+                    self.wait_for_reaction(old_root, "confirm")
+                    logger.info(f"Clicked confirmation button for {time_slot} slot")
+                    attempted[time_slot] = self.check_and_handle_advance_error()
+                    self.booking_responses[time_slot] = self.last_snapshot
+                except Exception as e:
+                    logger.error(f"Failed to confirm {time_slot} slot: {str(e)}")
+                    attempted[time_slot] = False
+        
+            return attempted
+        finally:
+            # Extra tabs never outlive the round, also when a step above failed
+            self.close_slot_tabs(main_handle)
+
+    def close_slot_tabs(self, main_handle):
+        """Close every tab but main_handle and switch back to it"""
+        for handle in self.driver.window_handles:
+            if handle == main_handle:
+                continue
+            try:
+                self.driver.switch_to.window(handle)
+                self.driver.close()
+            except Exception as e:
+                logger.warning(f"Could not close slot tab: {str(e)}")
+        self.driver.switch_to.window(main_handle)
+        self.slot_tabs = {}
+
+    def fetch_slot_grid(self):
+        """Fetch the day page's rows with the session cookies from inside the browser, or None"""
+        if not self.day_url:
+            return None
+        started = time.monotonic()
+        budget = self.step_timeouts.get("validate", 10)
+        try:
+            previous_timeout = self.driver.timeouts.script
+        except Exception:
+            previous_timeout = 30  # WebDriver's default script timeout
+        try:
+            self.driver.set_script_timeout(budget + 1)
+            grid = self.driver.execute_async_script(FETCH_SLOT_GRID_SCRIPT, self.day_url, int(budget * 1000))
+        except Exception as e:
+            logger.warning(f"Background fetch of the slot grid failed: {str(e)}")
+            return None
+        finally:
+            # Later execute_async_script calls keep the session's own timeout
+            try:
+                self.driver.set_script_timeout(previous_timeout)
+            except Exception as e:
+                logger.debug(f"Could not restore the script timeout: {str(e)}")
+        if grid is None or is_advance_error_snapshot(grid):
+            return None
+        logger.info(f"Slot grid fetched in {(time.monotonic() - started) * 1000:.0f} ms")
+        return grid
+
+    def return_to_day_page(self):
+        """Load the day page again (or reload the current page if its URL is unknown)"""
+        self.navigate(self.day_url, self.get_day_page_locator(), "slot", "Day page")
+
+    def validate_reservations(self, time_slots):
+        """Validate every booked slot from its booking response or a single read of the slot grid"""
+        attempts = {}
+        for time_slot in time_slots:
+            response = self.booking_responses.pop(time_slot, None)
+            status = get_response_slot_status(response, time_slot, self.apartment) if response else None
+            if status:
+                attempts[time_slot] = status
+        
+        pending = [time_slot for time_slot in time_slots if time_slot not in attempts]
+        if pending:
+            try:
+                grid = self.fetch_slot_grid()
+                if not grid or not all(any(time_slot in row["text"] for row in grid["rows"]) for time_slot in pending):
+                    logger.info("Re-reading the slot grid with a page load")
+                    self.return_to_day_page()
+                    grid = self.snapshot_page()
+                for time_slot in pending:
+                    attempts[time_slot] = get_slot_status(grid, time_slot, self.apartment)
+            except Exception as e:
+                logger.error(f"Failed to validate reservations: {str(e)}")
+                outcome = self.classify_failure(e)
+                attempts.update({time_slot: AttemptOutcome(outcome, f"Validation error: {str(e)}", time_slot) for time_slot in pending})
+        return attempts
+
     def validate_reservation(self, time_slot):
         """Validate that the reservation was successful by checking the time slot status"""
         try:
             logger.info(f"Validating reservation for {time_slot}")
             
-            # Refresh the page to get the latest status
-            self.driver.refresh()
-            time.sleep(1)  # Reduced from 3
-            
-            # Check if the time slot shows "Confirmado para G-502"
-            confirmed_elements = self.driver.find_elements(By.XPATH, f"//tr[contains(., '{time_slot}')]//td[contains(text(), 'Confirmado para G-502')]")
-            
-            if confirmed_elements:
-                logger.info(f"✅ Reservation confirmed! {time_slot} shows 'Confirmado para G-502'")
-                return True, "Confirmed successfully"
+            # The page the booking landed on usually already shows the slot's new status
+            response = self.booking_responses.pop(time_slot, None)
+            status = get_response_slot_status(response, time_slot, self.apartment) if response else None
+            if status:
+                logger.info(f"Validated {time_slot} from the booking response")
+                return status
             
-            # Check if there's still a "Disponible" button (means reservation failed)
-            available_buttons = self.driver.find_elements(By.XPATH, f"//tr[contains(., '{time_slot}')]//button[contains(text(), 'Disponible')] | //tr[contains(., '{time_slot}')]//a[contains(text(), 'Disponible')]")
+            # Otherwise fetch only the slot grid in the background, leaving the page on screen alone
+            grid = self.fetch_slot_grid()
+            if grid and any(time_slot in row["text"] for row in grid["rows"]):
+                logger.info(f"Validated {time_slot} from a background fetch of the slot grid")
+                return get_slot_status(grid, time_slot, self.apartment)
             
-            if available_buttons:
-                logger.warning(f"❌ Reservation failed! {time_slot} still shows 'Disponible' button")
-                return False, "Time slot still available - reservation not successful"
+            # Last resort: load the day page again (parallel slot tabs are already closed), returning once the slot's row exists
+            logger.info(f"Validating {time_slot} with a full page load")
+            self.navigate(self.day_url, (By.XPATH, f"//tr[contains(., '{time_slot}')]"), "validate", "Slot grid")
             
-            # Check for any other status in the time slot
-            time_slot_row = self.driver.find_elements(By.XPATH, f"//tr[contains(., '{time_slot}')]")
-            if time_slot_row:
-                row_text = time_slot_row[0].text
-                logger.info(f"Time slot row content: {row_text}")
-                
-                # Check if it shows any other confirmation status
-                if "Confirmado" in row_text:
-                    if "G-502" not in row_text:
-                        logger.warning(f"❌ Time slot confirmed for different apartment: {row_text}")
-                        return False, f"Time slot confirmed for different apartment"
-                    else:
-                        logger.info(f"✅ Reservation confirmed for G-502")
-                        return True, "Confirmed successfully"
-                
-                # Check for other statuses
-                if "Ocupado" in row_text or "Reservado" in row_text:
-                    logger.warning(f"❌ Time slot occupied by another user: {row_text}")
-                    return False, "Time slot occupied by another user"
-                
-                logger.warning(f"❌ Unexpected status for time slot: {row_text}")
-                return False, f"Unexpected status: {row_text}"
-            
-            logger.warning(f"❌ Could not find time slot {time_slot} in the table")
-            return False, "Time slot not found in table"
+            # Decide from a single snapshot of the slot table
+            return get_slot_status(self.snapshot_page(), time_slot, self.apartment)
             
         except Exception as e:
             logger.error(f"Failed to validate reservation: {str(e)}")
-            return False, f"Validation error: {str(e)}"
+            return AttemptOutcome(self.classify_failure(e), f"Validation error: {str(e)}", time_slot)
+
+class EngineFallbackError(Exception):
+    """Raised by a non-browser engine when a page cannot be handled without a real browser"""
+
+
+def extract_onclick_url(onclick):
+    """Pull the target URL out of an onclick handler such as location.href='x.php?a=1'"""
+    if not onclick:
+        return None
+    match = re.search(r"""['"]([^'"]*\.php[^'"]*)['"]""", onclick)
+    return html.unescape(match.group(1)) if match else None
+
+
+class CondomisoftPageParser(HTMLParser):
+    """Collect the forms, clickable elements and table rows of a condomisoft page"""
+    CLICKABLE_TAGS = ('a', 'button', 'td', 'span', 'div', 'li', 'img')
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.forms = []
+        self.clickables = []
+        self.rows = []
+        self.text_parts = []
+        self._form = None
+        self._open_rows = []
+        self._open_clickables = []
+        self._select_name = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {name: (value or '') for name, value in attrs}
+
+        if tag in ('td', 'th', 'br'):
+            # Keep cell texts apart, like the row text Selenium reports
+            for index in self._open_rows:
+                self.rows[index]["text"] += ' '
+        if tag in ('td', 'th'):
+            for index in self._open_rows:
+                self.rows[index]["cells"].append('')
+
+        if tag == 'form':
+            self.forms.append({
+                "action": attrs.get('action', ''),
+                "method": attrs.get('method', 'get').lower(),
+                "fields": {},
+                "password_fields": [],
+                "text_fields": [],
+            })
+            self._form = len(self.forms) - 1
+        elif tag == 'tr':
+            self.rows.append({"text": "", "cells": [], "clickables": []})
+            self._open_rows.append(len(self.rows) - 1)
+        elif tag == 'input':
+            input_type = attrs.get('type', 'text').lower()
+            name = attrs.get('name')
+            if input_type in ('submit', 'button', 'image'):
+                self._add_clickable(tag, attrs, text=attrs.get('value', ''), input_type=input_type)
+            elif self._form is not None and name:
+                form = self.forms[self._form]
+                if input_type in ('checkbox', 'radio') and 'checked' not in attrs:
+                    return
+                form["fields"][name] = attrs.get('value', '')
+                if input_type == 'password':
+                    form["password_fields"].append(name)
+                elif input_type in ('text', 'email'):
+                    form["text_fields"].append(name)
+        elif tag == 'select':
+            self._select_name = attrs.get('name')
+        elif tag == 'option' and self._select_name and self._form is not None:
+            fields = self.forms[self._form]["fields"]
+            if self._select_name not in fields or 'selected' in attrs:
+                fields[self._select_name] = attrs.get('value', '')
+        elif tag == 'button' or (tag in self.CLICKABLE_TAGS and (attrs.get('onclick') or attrs.get('href'))):
+            self._add_clickable(tag, attrs, input_type=attrs.get('type', 'submit' if tag == 'button' else '').lower())
+
+    def handle_endtag(self, tag):
+        if tag == 'form':
+            self._form = None
+        elif tag == 'tr' and self._open_rows:
+            self._open_rows.pop()
+        elif tag == 'select':
+            self._select_name = None
+        else:
+            for position in range(len(self._open_clickables) - 1, -1, -1):
+                if self.clickables[self._open_clickables[position]]["tag"] == tag:
+                    del self._open_clickables[position:]
+                    break
+
+    def handle_data(self, data):
+        self.text_parts.append(data)
+        for index in self._open_clickables:
+            self.clickables[index]["text"] += data
+        for index in self._open_rows:
+            self.rows[index]["text"] += data
+            if self.rows[index]["cells"]:
+                self.rows[index]["cells"][-1] += data
+
+    def _add_clickable(self, tag, attrs, text='', input_type=''):
+        element = {
+            "tag": tag,
+            "type": input_type,
+            "name": attrs.get('name'),
+            "value": attrs.get('value', ''),
+            "href": attrs.get('href', ''),
+            "onclick": attrs.get('onclick', ''),
+            "text": text,
+            "form": self._form,
+        }
+        self.clickables.append(element)
+        index = len(self.clickables) - 1
+        for row_index in self._open_rows:
+            self.rows[row_index]["clickables"].append(index)
+        if tag != 'input' and tag != 'img':
+            self._open_clickables.append(index)
+
+    @property
+    def text(self):
+        return ' '.join(' '.join(self.text_parts).split())
+
+
+class HttpPage:
+    """A fetched page together with its parsed forms, clickables and rows"""
+
+    def __init__(self, response):
+        self.url = response.url
+        self.status_code = response.status_code
+        self.html = response.text
+        parser = CondomisoftPageParser()
+        parser.feed(self.html)
+        parser.close()
+        self.forms = parser.forms
+        self.clickables = parser.clickables
+        self.rows = parser.rows
+        self.text = parser.text
+        self.snapshot = self.get_snapshot()
+
+    def get_snapshot(self):
+        """Return the page in the PAGE_SNAPSHOT_SCRIPT shape, so the shared snapshot helpers can read it"""
+        def describe(index):
+            element = self.clickables[index]
+            return {"ref": index, "tag": element["tag"], "text": ' '.join(element["text"].split()),
+                    "link": element["onclick"] or element["href"]}
+        rows = [{"text": ' '.join(row["text"].split()), "cells": [' '.join(cell.split()) for cell in row["cells"]],
+                 "buttons": [describe(index) for index in row["clickables"]]} for row in self.rows]
+        return {"url": self.url, "text": self.text, "calendar": None, "rows": rows,
+                "buttons": [describe(index) for index in range(len(self.clickables))]}
+
+    def find_clickables(self, predicate):
+        return [element for element in self.clickables if predicate(' '.join(element["text"].split()), element)]
+
+    def is_logged_in(self):
+        return 'Salir' in self.text or 'Logout' in self.text
+
+
+class HttpReservationEngine(ReservationEngine):
+    """HTTP engine - replays the condomisoft form posts with a pooled requests session"""
+    engine_name = "http"
+
+    def __init__(self, account=None):
+        super().__init__(account)
+        self.session: Optional[requests.Session] = None
+        self._local = threading.local()
+        self.page: Optional[HttpPage] = None
+        self.day_url: Optional[str] = None
+        try:
+            self.timeout = float(os.getenv('HTTP_TIMEOUT_SECONDS', '10'))
+        except Exception:
+            self.timeout = 10.0
+
+    def start_session(self):
+        """Create a pooled HTTP session that keeps cookies between requests"""
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=8)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+            "Accept-Language": "es-MX,es;q=0.9,en;q=0.8",
+        })
+        logger.info("HTTP session initialized")
+
+    @property
+    def page(self):
+        """The page last fetched by the calling thread - parallel booking workers each keep their own"""
+        return getattr(self._local, 'page', None)
+
+    @page.setter
+    def page(self, page):
+        self._local.page = page
+
+    def close(self):
+        """Close the pooled HTTP session"""
+        if self.session:
+            self.session.close()
+            logger.info("HTTP session closed")
+        self.session = None
+        self.page = None
+        super().close()
+
+    def _get(self, url, **kwargs):
+        response = self.session.get(url, timeout=self.timeout, **kwargs)
+        response.raise_for_status()
+        self.page = HttpPage(response)
+        return self.page
+
+    def _submit_form(self, page, form, clicked=None, values=None):
+        """Submit a parsed form the way the browser would"""
+        data = dict(form["fields"])
+        if clicked and clicked.get("name"):
+            data[clicked["name"]] = clicked.get("value", "")
+        data.update(values or {})
+
+        url = urljoin(page.url, form["action"] or page.url)
+        if form["method"] == 'post':
+            response = self.session.post(url, data=data, timeout=self.timeout)
+        else:
+            response = self.session.get(url, params=data, timeout=self.timeout)
+        response.raise_for_status()
+        self.page = HttpPage(response)
+        return self.page
+
+    def _activate(self, page, element):
+        """Follow a link, onclick handler or form button like a browser click would"""
+        href = element.get("href", "")
+        if href and not href.startswith(('#', 'javascript:')):
+            return self._get(urljoin(page.url, href))
+
+        onclick_url = extract_onclick_url(element.get("onclick"))
+        if onclick_url:
+            return self._get(urljoin(page.url, onclick_url))
+
+        if element.get("form") is not None and element.get("type") in ('submit', 'image', ''):
+            return self._submit_form(page, page.forms[element["form"]], clicked=element)
+
+        raise EngineFallbackError(f"Cannot activate <{element['tag']}> '{element['text'].strip()}' without a browser")
+
+    def login(self):
+        """Login by posting the parsed login form"""
+        try:
+            logger.info("Fetching login page")
+            page = self._get(self.login_url)
+
+            if page.is_logged_in():
+                logger.info("Already logged in")
+                return
+
+            login_forms = [form for form in page.forms if form["password_fields"]]
+            if not login_forms:
+                raise EngineFallbackError("Login form not found in login page")
+            form = login_forms[0]
+
+            username_field = next((name for name in ("usuario", "user") if name in form["fields"]), None)
+            if not username_field and form["text_fields"]:
+                username_field = form["text_fields"][0]
+            if not username_field:
+                raise EngineFallbackError("Username field not found in login form")
+            password_field = "clave" if "clave" in form["fields"] else form["password_fields"][0]
+
+            submit_buttons = [element for element in page.clickables
+                              if element["form"] == page.forms.index(form) and element["type"] in ('submit', 'image')]
+            logger.info("Posting credentials...")
+            page = self._submit_form(page, form, clicked=submit_buttons[0] if submit_buttons else None,
+                                     values={username_field: self.username, password_field: self.password})
+
+            if page.is_logged_in() or "login.php" not in page.url:
+                logger.info("Login successful")
+            else:
+                raise Exception("Login failed - still on login page after posting credentials")
+
+        except Exception as e:
+            logger.error(f"Login failed: {str(e)}")
+            raise
+
+    def select_apartment(self):
+        """Select the apartment from the dashboard returned after login"""
+        try:
+            logger.info(f"Selecting apartment {self.apartment}")
+            building, number = self.apartment.split('-', 1)
+
+            candidates = self.page.find_clickables(
+                lambda text, element: building in text and number in text)
+            if not candidates:
+                raise EngineFallbackError(f"{self.apartment} apartment button not found")
+
+            self._activate(self.page, candidates[0])
+            logger.info(f"Successfully selected {self.apartment} apartment")
+
+        except Exception as e:
+            logger.error(f"Failed to select apartment: {str(e)}")
+            raise
+
+    def navigate_to_reservation(self):
+        """Fetch the gym reservation page"""
+        try:
+            logger.info(f"Fetching reservation page: {self.reservation_url}")
+            self._get(self.reservation_url)
+            self.calendar_month = None
+            logger.info("Successfully fetched reservation page")
+
+        except Exception as e:
+            logger.error(f"Failed to fetch reservation page: {str(e)}")
+            raise
+
+    def refresh_reservation_page(self):
+        """Re-fetch the parked calendar page (the pre-positioned month, if any)"""
+        if self.calendar_month:
+            self._get(self.page.url)
+        else:
+            self.navigate_to_reservation()
+
+    def get_current_url(self):
+        """Return the URL of the last fetched page"""
+        return self.page.url
+
+    def advance_calendar(self, months, log_prefix=""):
+        """Follow the next-month link the given number of times"""
+        for i in range(months):
+            next_buttons = self.page.find_clickables(
+                lambda text, element: text == '>>' or 'next' in element["onclick"] or 'siguiente' in text.lower())
+            if not next_buttons:
+                raise EngineFallbackError(f"No next month link found for step {i+1}")
+            self._activate(self.page, next_buttons[-1])
+            self.note_month_advanced()
+            logger.info(f"{log_prefix}Advanced calendar to next month (step {i+1}/{months})")
+
+    def is_too_early(self):
+        """Check the last fetched page for the '7 days in advance' rejection"""
+        return self.page is not None and is_advance_error_snapshot(self.page.snapshot)
+
+    def learn_calendar_links(self):
+        """Learn the day page link pattern from the fetched calendar's day cells"""
+        self.learn_day_url([(element["onclick"] or element["href"], element["text"]) for element in self.page.clickables
+                            if element["tag"] == 'td' and (element["onclick"] or element["href"])])
+
+    def locate_target_day(self, target_date):
+        """Check the fetched calendar for the target day's link"""
+        self.learn_calendar_links()
+        return bool(self.page.find_clickables(
+            lambda text, element: element["tag"] == 'td' and text in (str(target_date.day), f"{target_date.day:02d}")))
+
+    def get_session_cookies(self):
+        """Return the session cookies as Selenium-style dicts so both engines share the cache"""
+        cookies = []
+        for cookie in self.session.cookies:
+            entry = {"name": cookie.name, "value": cookie.value, "domain": cookie.domain,
+                     "path": cookie.path, "secure": cookie.secure}
+            if cookie.expires:
+                entry["expiry"] = cookie.expires
+            cookies.append(entry)
+        return cookies
+
+    def apply_session_cookies(self, cookies):
+        """Load cached cookies into the HTTP session"""
+        for cookie in cookies:
+            self.session.cookies.set(cookie["name"], cookie["value"],
+                                     domain=cookie.get("domain", ""), path=cookie.get("path", "/"))
+        logger.info(f"Loaded {len(cookies)} cached cookies into the HTTP session")
+
+    def is_authenticated(self):
+        """Check that the reservation page was not replaced by the login form"""
+        return "login.php" not in self.page.url and not any(form["password_fields"] for form in self.page.forms)
+
+    def load_page(self, url):
+        """Fetch an arbitrary page"""
+        self._get(url)
+
+    def load_day_page(self, url):
+        """Fetch a day page with a single GET and check it shows the slot grid"""
+        page = self._get(url)
+        if is_advance_error_snapshot(page.snapshot):
+            return "too_early"
+        if not any(slot in page.text for slot in self.time_slots):
+            return "invalid"
+        self.day_url = page.url
+        return "ok"
+
+    def read_slot_grid(self, reload=True):
+        """Re-fetch the day page and return its snapshot, or None off the slot grid"""
+        page = self._get(self.day_url) if reload and self.day_url else self.page
+        if is_advance_error_snapshot(page.snapshot) or not any(slot in page.text for slot in self.time_slots):
+            return None
+        return page.snapshot
+
+    def get_page_links(self):
+        """Return the href/onclick targets of the current page's clickables"""
+        if not self.page:
+            return []
+        return [(element["href"] or element["onclick"], element["text"]) for element in self.page.clickables
+                if element["href"] or element["onclick"]]
+
+    def get_page_text(self):
+        """Return the text of the current page"""
+        return self.page.text if self.page else ''
+
+    def select_calendar_day(self):
+        """Follow the calendar link of the target day"""
+        try:
+            target_date = self.get_target_date()
+            target_day = target_date.day
+
+            # One GET of the day page when the calendar's link pattern is already known
+            if self.open_day_directly(target_date):
+                return True
+
+            self.advance_calendar(self.get_months_to_advance(target_date))
+            self.learn_calendar_links()
+
+            day_cells = self.page.find_clickables(
+                lambda text, element: element["tag"] == 'td' and text in (str(target_day), f"{target_day:02d}"))
+            if not day_cells:
+                logger.warning(f"Target day {target_day} not found in calendar for {target_date.strftime('%B %Y')}")
+                return False
+
+            page = self._activate(self.page, day_cells[0])
+            if is_advance_error_snapshot(page.snapshot):
+                logger.warning("Got '7 days in advance' error for the target day")
+                return False
+
+            if not any(slot in page.text for slot in self.time_slots):
+                raise EngineFallbackError("Day page does not contain the slot grid")
+
+            self.day_url = page.url
+            logger.info(f"Selected calendar day: {target_day} in {target_date.strftime('%B %Y')}")
+            return True
+
+        except EngineFallbackError:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to select calendar day: {str(e)}")
+            return False
+
+    def reserve_time_slot(self, time_slot, day_page=None):
+        """Follow the 'Disponible' action of the slot row and post the confirmation form"""
+        try:
+            logger.info(f"Attempting to reserve {time_slot} slot")
+
+            if day_page is None:
+                if self.day_url and self.page.url != self.day_url:
+                    self._get(self.day_url)
+                day_page = self.page
+
+            row = find_slot_row(day_page.snapshot, time_slot)
+            available = [button for button in row["buttons"] if 'Disponible' in button["text"]] if row else []
+            if not available:
+                logger.warning(f"No available slot found for {time_slot}")
+                return False
+
+            page = self._activate(day_page, day_page.clickables[available[0]["ref"]])
+            if is_advance_error_snapshot(page.snapshot):
+                logger.warning("Got '7 days in advance' error after selecting the slot")
+                return False
+
+            confirm_buttons = page.find_clickables(
+                lambda text, element: any(word in text for word in ('Confirmar', 'Reservar', 'Aceptar')))
+            if confirm_buttons:
+                page = self._activate(page, confirm_buttons[0])
+                logger.info(f"Posted confirmation for {time_slot} slot")
+                if is_advance_error_snapshot(page.snapshot):
+                    logger.warning("Got '7 days in advance' error after confirmation")
+                    return False
+            else:
+                logger.info(f"Reservation for {time_slot} initiated (no confirmation form found)")
+
+            self.booking_responses[time_slot] = page.snapshot
+            return True
+
+        except Exception as e:
+            logger.error(f"Failed to reserve {time_slot} slot: {str(e)}")
+            raise
+
+    def reserve_time_slots_parallel(self, time_slots):
+        """Post every slot's booking concurrently over the shared, pooled session.
+
+        Each worker thread sees only the pages it fetched (see page), so the day page stays current here.
+        """
+        day_page = self.page
+        attempted = {}
+        fire_start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=len(time_slots)) as executor:
+            futures = {executor.submit(self.reserve_time_slot, time_slot, day_page): time_slot for time_slot in time_slots}
+            for future in as_completed(futures):
+                time_slot = futures[future]
+                try:
+                    attempted[time_slot] = future.result()
+                except EngineFallbackError:
+                    raise
+                except Exception as e:
+                    logger.error(f"❌ Exception during parallel {time_slot} reservation: {str(e)}")
+                    attempted[time_slot] = False
+        logger.info(f"⚡ Booked {len(time_slots)} slots concurrently in {(time.monotonic() - fire_start) * 1000:.0f} ms")
+        return attempted
+
+    def get_booking_response_status(self, time_slot):
+        """Return the slot's AttemptOutcome from the page its booking landed on, or None if that page does not settle it"""
+        response = self.booking_responses.pop(time_slot, None)
+        status = get_response_slot_status(response, time_slot, self.apartment) if response else None
+        if status:
+            logger.info(f"Validated {time_slot} from the booking response")
+        return status
+
+    def validate_reservations(self, time_slots):
+        """Validate every booked slot from its booking response or a single fetch of the day page"""
+        try:
+            attempts = {}
+            day_page = None
+            for time_slot in time_slots:
+                status = self.get_booking_response_status(time_slot)
+                if status is None:
+                    if day_page is None:
+                        day_page = self._get(self.day_url) if self.day_url else self.page
+                    status = get_slot_status(day_page.snapshot, time_slot, self.apartment)
+                attempts[time_slot] = status
+            return attempts
+
+        except Exception as e:
+            logger.error(f"Failed to validate reservations: {str(e)}")
+            outcome = self.classify_failure(e)
+            return {time_slot: AttemptOutcome(outcome, f"Validation error: {str(e)}", time_slot) for time_slot in time_slots}
+
+    def validate_reservation(self, time_slot):
+        """Check the slot row status in the booking response, re-fetching the day page only if it is not there"""
+        try:
+            logger.info(f"Validating reservation for {time_slot}")
+            status = self.get_booking_response_status(time_slot)
+            if status:
+                return status
+            page = self._get(self.day_url) if self.day_url else self.page
+            return get_slot_status(page.snapshot, time_slot, self.apartment)
+
+        except Exception as e:
+            logger.error(f"Failed to validate reservation: {str(e)}")
+            return AttemptOutcome(self.classify_failure(e), f"Validation error: {str(e)}", time_slot)
 
-    def make_reservations(self):
-        """Main function to make both reservations"""
+
+def create_reservation_engine(engine_name=None, account=None):
+    """Create the reservation engine selected by RESERVATION_ENGINE (selenium or http)"""
+    engine_name = (engine_name or os.getenv('RESERVATION_ENGINE', 'selenium')).strip().lower()
+    if engine_name == 'http':
+        return HttpReservationEngine(account)
+    if engine_name != 'selenium':
+        logger.warning(f"Unknown RESERVATION_ENGINE '{engine_name}' - using selenium")
+    return GymReservationCloud(account)
+
+def batch_notifications(notifications):
+    """Merge queued notifications into one e-mail per recipient, keeping their order"""
+    by_recipient = {}
+    for notification in notifications:
+        by_recipient.setdefault(notification["email_to"], []).append(notification)
+
+    batched = []
+    for email_to, group in by_recipient.items():
+        if len(group) == 1:
+            batched.append(group[0])
+            continue
+        succeeded = sum(1 for notification in group if notification["success"])
+        sections = []
+        for notification in group:
+            match = re.search(r"<body>(.*)</body>", notification["body"], re.S)
+            sections.append(match.group(1) if match else notification["body"])
+        batched.append({
+            "subject": f"🏋️ Gym Reservations: {succeeded}/{len(group)} runs succeeded (Cloud)",
+            "body": f"<html><body>{'<hr>'.join(sections)}</body></html>",
+            "success": succeeded == len(group),
+            "email_to": email_to,
+        })
+    return batched
+
+
+class EmailNotifier:
+    """Background e-mail dispatcher: a queue drained by one worker thread over a reused SMTP connection.
+
+    Notifications queued within NOTIFY_BATCH_SECONDS of each other go out as one e-mail per
+    recipient, failed sends are retried after NOTIFY_RETRY_DELAYS over a fresh connection, and
+    flush() waits at most NOTIFY_FLUSH_SECONDS for the queue to drain.
+    """
+
+    def __init__(self, smtp_factory=None):
+        self.smtp_factory = smtp_factory or smtplib.SMTP
+        self.queue = queue.Queue()
+        self.server = None
+        self.server_used_at = 0.0
+        self.thread = None
+        self.lock = threading.Lock()
+        self.drained = threading.Condition()
+        self.pending = 0
+        self.flushing = False
         try:
-            self.setup_driver()
-            if not self.driver:
-                raise Exception("Failed to initialize driver")
-                
-            self.login()
-            self.select_apartment()
-            self.navigate_to_reservation()
-            
-            # Select the next occurrence of the same day of the week
-            if not self.select_calendar_day():
-                logger.warning("Failed to select target day from calendar")
-                return
-            
-            # Try each time slot until we get one successful reservation
-            for time_slot in self.time_slots:
-                logger.info(f"Attempting to reserve {time_slot}")
-                
+            self.batch_seconds = float(os.getenv('NOTIFY_BATCH_SECONDS', '2'))
+            self.retry_delays = [float(delay) for delay in os.getenv('NOTIFY_RETRY_DELAYS', '1,5,15').split(',') if delay.strip()]
+            self.idle_seconds = float(os.getenv('SMTP_IDLE_SECONDS', '60'))
+            self.flush_seconds = float(os.getenv('NOTIFY_FLUSH_SECONDS', '20'))
+        except ValueError:
+            logger.warning("Invalid notification settings, using 2s batching, 1,5,15 retries, 60s idle and 20s flush")
+            self.batch_seconds, self.retry_delays, self.idle_seconds, self.flush_seconds = 2.0, [1.0, 5.0, 15.0], 60.0, 20.0
+
+    def enqueue(self, notification):
+        """Queue a notification and return at once"""
+        with self.drained:
+            self.pending += 1
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name="notifier", daemon=True)
+                self.thread.start()
+        self.queue.put(notification)
+
+    def run(self):
+        while True:
+            try:
+                batch = [self.queue.get(timeout=self.idle_seconds)]
+            except queue.Empty:
+                self.disconnect()
+                continue
+
+            # Give other accounts' results a moment to arrive so they share one send
+            deadline = time.monotonic() + self.batch_seconds
+            while not self.flushing:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
                 try:
-                    reservation_attempted = self.reserve_time_slot(time_slot)
-                    
-                    if reservation_attempted:
-                        # Validate the reservation was successful
-                        validation_success, validation_message = self.validate_reservation(time_slot)
-                        
-                        if validation_success:
-                            logger.info(f"✅ {time_slot} reservation validated successfully: {validation_message}")
-                            self.reservation_results[time_slot]["success"] = True
-                            self.reservation_results[time_slot]["message"] = validation_message
-                        else:
-                            logger.error(f"❌ {time_slot} reservation validation failed: {validation_message}")
-                            self.reservation_results[time_slot]["success"] = False
-                            self.reservation_results[time_slot]["message"] = validation_message
-                    else:
-                        logger.error(f"❌ Failed to attempt {time_slot} reservation")
-                        self.reservation_results[time_slot]["success"] = False
-                        self.reservation_results[time_slot]["message"] = "Failed to find available time slot"
-                        
-                except Exception as e:
-                    logger.error(f"❌ Exception during {time_slot} reservation: {str(e)}")
-                    self.reservation_results[time_slot]["success"] = False
-                    self.reservation_results[time_slot]["message"] = f"Exception: {str(e)}"
-                
-                # Brief pause between reservations
-                time.sleep(1)  # Reduced from 2
-            
-            logger.info(f"Reservation process completed for both early morning time slots")
-            
-            # Log results for both slots
-            successful_slots = [slot for slot, result in self.reservation_results.items() if result["success"]]
-            failed_slots = [slot for slot, result in self.reservation_results.items() if not result["success"]]
-            
-            logger.info(f"✅ Successful reservations: {successful_slots if successful_slots else 'None'}")
-            logger.info(f"❌ Failed reservations: {failed_slots if failed_slots else 'None'}")
-            
-            # Check if at least one reservation was successful
-            any_success = any(result["success"] for result in self.reservation_results.values())
-            if not any_success:
-                raise Exception(f"Both early morning reservations failed - no available slots found")
-            
-        except Exception as e:
-            logger.error(f"Reservation process failed: {str(e)}")
-            raise
-        finally:
-            if self.driver:
-                self.driver.quit()
-                logger.info("Driver closed")
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
 
-def send_email_notification(subject, body, success=True):
-    """Send email notification with reservation results"""
-    try:
-        # Get email configuration from environment
-        email_host = os.getenv('EMAIL_HOST', 'smtp.gmail.com')
-        email_port = int(os.getenv('EMAIL_PORT', '587'))
+            try:
+                for notification in batch_notifications(batch):
+                    self.deliver(notification)
+            except Exception as e:
+                logger.error(f"Failed to send email notification: {str(e)}")
+            finally:
+                with self.drained:
+                    self.pending -= len(batch)
+                    self.drained.notify_all()
+
+    def connect(self):
+        """Return a logged-in SMTP connection, reusing the open one while the server still answers"""
+        if self.server is not None and time.monotonic() - self.server_used_at < self.idle_seconds:
+            try:
+                if self.server.noop()[0] == 250:
+                    return self.server
+            except Exception:
+                pass
+        self.disconnect()
+
+        server = self.smtp_factory(os.getenv('EMAIL_HOST', 'smtp.gmail.com'), int(os.getenv('EMAIL_PORT', '587')), timeout=30)
+        server.starttls()  # Enable security
+        server.login(os.getenv('EMAIL_USER'), os.getenv('EMAIL_PASSWORD'))
+        self.server = server
+        return server
+
+    def disconnect(self):
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except Exception:
+                pass
+            self.server = None
+
+    def deliver(self, notification):
+        """Send one notification, retrying with backoff over a fresh connection; returns True once sent"""
         email_user = os.getenv('EMAIL_USER')
-        email_password = os.getenv('EMAIL_PASSWORD')
-        email_to = os.getenv('EMAIL_TO', 'santiago.sbg@gmail.com')
-        
-        if not email_user or not email_password:
-            logger.warning("Email credentials not configured. Skipping email notification.")
-            return
-        
-        # Create message
         msg = MIMEMultipart()
         msg['From'] = email_user
-        msg['To'] = email_to
-        msg['Subject'] = subject
-        
-        # Add body to email
-        msg.attach(MIMEText(body, 'html'))
-        
-        # Gmail SMTP configuration
-        server = smtplib.SMTP(email_host, email_port)
-        server.starttls()  # Enable security
-        server.login(email_user, email_password)
-        
-        # Send email
+        msg['To'] = notification["email_to"]
+        msg['Subject'] = notification["subject"]
+        msg.attach(MIMEText(notification["body"], 'html'))
         text = msg.as_string()
-        server.sendmail(email_user, email_to, text)
-        server.quit()
-        
-        logger.info(f"Email notification sent successfully to {email_to}")
-        
+
+        for attempt, delay in enumerate([0.0] + self.retry_delays):
+            if delay:
+                time.sleep(delay)
+            try:
+                self.connect().sendmail(email_user, notification["email_to"], text)
+                self.server_used_at = time.monotonic()
+                logger.info(f"Email notification sent successfully to {notification['email_to']}")
+                return True
+            except Exception as e:
+                logger.warning(f"Email notification attempt {attempt + 1} failed: {str(e)}")
+                self.disconnect()
+        logger.error(f"Failed to send email notification to {notification['email_to']} after {len(self.retry_delays) + 1} attempts")
+        return False
+
+    def flush(self, timeout=None):
+        """Wait (bounded) for queued notifications to be sent; returns True if the queue drained"""
+        # Queued notifications go out at once instead of waiting for the batching window
+        self.flushing = True
+        deadline = time.monotonic() + (self.flush_seconds if timeout is None else timeout)
+        try:
+            with self.drained:
+                while self.pending:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        logger.warning(f"Gave up waiting for {self.pending} queued email notifications")
+                        return False
+                    self.drained.wait(remaining)
+            return True
+        finally:
+            self.flushing = False
+
+_email_notifier = None
+_email_notifier_lock = threading.Lock()
+
+def get_email_notifier():
+    """Return the process-wide notifier, flushed (bounded) when the process exits"""
+    global _email_notifier
+    with _email_notifier_lock:
+        if _email_notifier is None:
+            _email_notifier = EmailNotifier()
+            atexit.register(_email_notifier.flush)
+        return _email_notifier
+
+def send_email_notification(subject, body, success=True, email_to=None):
+    """Queue an email notification with reservation results; it is sent in the background"""
+    if not os.getenv('EMAIL_USER') or not os.getenv('EMAIL_PASSWORD'):
+        logger.warning("Email credentials not configured. Skipping email notification.")
+        return
+
+    get_email_notifier().enqueue({
+        "subject": subject,
+        "body": body,
+        "success": success,
+        "email_to": email_to or os.getenv('EMAIL_TO', 'santiago.sbg@gmail.com'),
+    })
+
+def warm_up_with_fallback(reservation):
+    """Warm up the engine, switching to Selenium if the HTTP engine cannot handle the pages"""
+    try:
+        reservation.warm_up()
+    except EngineFallbackError as e:
+        logger.warning(f"{reservation.engine_name} engine cannot handle the flow ({str(e)}) - warming up Selenium instead")
+        reservation.close()
+        reservation = GymReservationCloud(reservation.account)
+        return warm_up_with_fallback(reservation)
     except Exception as e:
-        logger.error(f"Failed to send email notification: {str(e)}")
+        # A failed warm-up should not cost us the run - fall back to a cold start
+        logger.warning(f"Warm-up failed, will start cold after the opening: {str(e)}")
+        reservation.close()
+    return reservation
 
-def run_cloud_reservation():
-    """Function to run the cloud reservation"""
+def run_cloud_reservation(wait_for_opening=None, account=None, notify=None):
+    """Function to run the cloud reservation for one account
+
+    If wait_for_opening is given, the browser session is warmed up first and the
+    callable is invoked to block until the reservation window opens. If notify is given,
+    it is called with the slot outcomes and the result e-mail is only sent when it returns True.
+    Returns {time_slot: Outcome} with each slot's final outcome.
+    """
     # Use Mexico City timezone
     mexico_tz = pytz.timezone('America/Mexico_City')
     start_time = datetime.now(mexico_tz)
+    account = account or get_default_account()
+    apartment = account.get("apartment", "G-502")
+    time_slots = list(account.get("time_slots") or DEFAULT_TIME_SLOTS)
     success = False
     error_message = ""
+    failure_outcome = Outcome.ERROR
     target_date = ""
     reservation_results = {}
     reservation = None
     
     try:
-        logger.info("Starting cloud reservation process")
-        reservation = GymReservationCloud()
+        logger.info(f"Starting cloud reservation process for {account.get('name') or account.get('username')} ({apartment})")
+        reservation = create_reservation_engine(account=account)
+        logger.info(f"Using {reservation.engine_name} reservation engine")
         
         # Get target date info for email
         target_date_obj = reservation.get_target_date()
         target_date = target_date_obj.strftime('%A, %B %d, %Y')
         
-        reservation.make_reservations()
+        if wait_for_opening is not None:
+            reservation = warm_up_with_fallback(reservation)
+            wait_for_opening()
+        
+        try:
+            reservation.make_reservations()
+        except EngineFallbackError as e:
+            logger.warning(f"{reservation.engine_name} engine cannot handle the flow ({str(e)}) - falling back to Selenium")
+            previous = reservation
+            reservation = GymReservationCloud(account)
+            
+            # Slots the HTTP engine already confirmed are kept, not booked again
+            confirmed = {slot: result for slot, result in previous.reservation_results.items() if result["success"]}
+            reservation.time_slots = [slot for slot in reservation.time_slots if slot not in confirmed]
+            reservation.reservation_results.update(confirmed)
+            reservation.outcomes = previous.outcomes
+            reservation.make_reservations()
         
         # Check the actual reservation status from validation
         success = any(result["success"] for result in reservation.reservation_results.values())
@@ -968,14 +3494,25 @@ def run_cloud_reservation():
         if success:
             logger.info("Cloud reservation completed successfully (at least one slot reserved)")
         else:
-            logger.error("Cloud reservation failed: Both time slots failed")
+            logger.error("Cloud reservation failed: All time slots failed")
             
     except Exception as e:
         success = False
         error_message = str(e)
+        failure_outcome = Outcome.TIMEOUT if is_transient_error(e) else Outcome.ERROR
         logger.error(f"Cloud reservation failed: {error_message}")
+        
+        # Say why each slot failed, from the recorded attempt outcomes, rather than the bare exception
+        if reservation is not None and describe_outcomes(reservation.reservation_results):
+            error_message = f"{error_message} ({describe_outcomes(reservation.reservation_results)})"
     
     finally:
+        if reservation is not None:
+            record_outcome_metrics(account.get("name") or account.get("username"), reservation.outcomes)
+        
+        # Slots the run never settled carry the reason it stopped
+        outcomes = get_final_outcomes(reservation.reservation_results if reservation is not None else {}, time_slots, failure_outcome)
+        
         # Send email notification
         end_time = datetime.now(mexico_tz)
         duration = end_time - start_time
@@ -985,19 +3522,32 @@ def run_cloud_reservation():
             successful_slots = [slot for slot, result in reservation_results.items() if result["success"]]
             failed_slots = [slot for slot, result in reservation_results.items() if not result["success"] and result["message"] != "Not attempted - earlier slot succeeded"]
             attempted_slots = [slot for slot, result in reservation_results.items() if result["message"] not in ["", "Not attempted - earlier slot succeeded"]]
-            all_success = len(successful_slots) == 2  # Success if we got both slots
-            partial_success = len(successful_slots) == 1  # Partial success if we got one slot
+            all_success = len(successful_slots) == len(time_slots)  # Success if we got every slot
+            partial_success = 0 < len(successful_slots) < len(time_slots)  # Partial success if we got some
             no_success = len(successful_slots) == 0
         else:
             successful_slots = []
-            failed_slots = ["07:30-08:00", "08:00-08:30"]
+            failed_slots = list(time_slots)
             attempted_slots = failed_slots
             all_success = False
             partial_success = False
             no_success = True
         
+        slot_rows = "".join([f'''
+                    <tr>
+                        <td style="padding: 8px;">{slot.replace('-', ' - ')}</td>
+                        <td style="padding: 8px;">
+                            {'<span style="color: green;">✅ SUCCESS</span>' if reservation_results[slot]["success"] else '<span style="color: red;">❌ FAILED</span>'}
+                        </td>
+                        <td style="padding: 8px;">{reservation_results[slot]["message"]}</td>
+                    </tr>''' for slot in time_slots if slot in reservation_results])
+        
+        # Point the manual fallback link and location at the resource that was actually booked
+        manual_url = reservation.reservation_url if reservation else DEFAULT_RESERVATION_URL
+        location = account.get("resource") or "Gym"
+        
         if all_success:
-            subject = f"✅ Gym Reservation Success - Both Slots Reserved! (Cloud)"
+            subject = f"✅ Gym Reservation Success - All {len(time_slots)} Slots Reserved! (Cloud)"
             
             body = f"""
             <html>
@@ -1007,10 +3557,10 @@ def run_cloud_reservation():
                 <p><strong>Reservation Summary:</strong></p>
                 <ul>
                     <li><strong>Date:</strong> {target_date}</li>
-                    <li><strong>Location:</strong> Gym - G-502</li>
+                    <li><strong>Location:</strong> {location} - {apartment}</li>
                     <li><strong>Reservation Made:</strong> {start_time.strftime('%Y-%m-%d %H:%M:%S')}</li>
                     <li><strong>Duration:</strong> {duration.total_seconds():.1f} seconds</li>
-                    <li><strong>Successful Slots:</strong> {len(successful_slots)}/2</li>
+                    <li><strong>Successful Slots:</strong> {len(successful_slots)}/{len(time_slots)}</li>
                     <li><strong>Deployment:</strong> Cloud ☁️</li>
                 </ul>
                 
@@ -1022,20 +3572,7 @@ def run_cloud_reservation():
                         <th style="padding: 8px; text-align: left;">Status</th>
                         <th style="padding: 8px; text-align: left;">Message</th>
                     </tr>
-                    <tr>
-                        <td style="padding: 8px;">07:30 - 08:00</td>
-                        <td style="padding: 8px;">
-                            {'<span style="color: green;">✅ SUCCESS</span>' if reservation_results["07:30-08:00"]["success"] else '<span style="color: red;">❌ FAILED</span>'}
-                        </td>
-                        <td style="padding: 8px;">{reservation_results["07:30-08:00"]["message"]}</td>
-                    </tr>
-                    <tr>
-                        <td style="padding: 8px;">08:00 - 08:30</td>
-                        <td style="padding: 8px;">
-                            {'<span style="color: green;">✅ SUCCESS</span>' if reservation_results["08:00-08:30"]["success"] else '<span style="color: red;">❌ FAILED</span>'}
-                        </td>
-                        <td style="padding: 8px;">{reservation_results["08:00-08:30"]["message"]}</td>
-                    </tr>
+                    {slot_rows}
                 </table>
                 
                 <p><strong>Overall Status:</strong> <span style="color: green;">✅ Both time slots reserved successfully!</span></p>
@@ -1056,10 +3593,10 @@ def run_cloud_reservation():
                 <p><strong>Reservation Summary:</strong></p>
                 <ul>
                     <li><strong>Date:</strong> {target_date}</li>
-                    <li><strong>Location:</strong> Gym - G-502</li>
+                    <li><strong>Location:</strong> {location} - {apartment}</li>
                     <li><strong>Reservation Made:</strong> {start_time.strftime('%Y-%m-%d %H:%M:%S')}</li>
                     <li><strong>Duration:</strong> {duration.total_seconds():.1f} seconds</li>
-                    <li><strong>Successful Slots:</strong> {len(successful_slots)}/2</li>
+                    <li><strong>Successful Slots:</strong> {len(successful_slots)}/{len(time_slots)}</li>
                     <li><strong>Deployment:</strong> Cloud ☁️</li>
                 </ul>
                 
@@ -1071,27 +3608,14 @@ def run_cloud_reservation():
                         <th style="padding: 8px; text-align: left;">Status</th>
                         <th style="padding: 8px; text-align: left;">Message</th>
                     </tr>
-                    <tr>
-                        <td style="padding: 8px;">07:30 - 08:00</td>
-                        <td style="padding: 8px;">
-                            {'<span style="color: green;">✅ SUCCESS</span>' if reservation_results["07:30-08:00"]["success"] else '<span style="color: red;">❌ FAILED</span>'}
-                        </td>
-                        <td style="padding: 8px;">{reservation_results["07:30-08:00"]["message"]}</td>
-                    </tr>
-                    <tr>
-                        <td style="padding: 8px;">08:00 - 08:30</td>
-                        <td style="padding: 8px;">
-                            {'<span style="color: green;">✅ SUCCESS</span>' if reservation_results["08:00-08:30"]["success"] else '<span style="color: red;">❌ FAILED</span>'}
-                        </td>
-                        <td style="padding: 8px;">{reservation_results["08:00-08:30"]["message"]}</td>
-                    </tr>
+                    {slot_rows}
                 </table>
                 
-                <p><strong>Overall Status:</strong> <span style="color: orange;">⚠️ Partial success - {len(successful_slots)}/2 slots reserved</span></p>
+                <p><strong>Overall Status:</strong> <span style="color: orange;">⚠️ Partial success - {len(successful_slots)}/{len(time_slots)} slots reserved</span></p>
                 
                 <p><strong>Manual Reservation Link:</strong></p>
                 <p>You can try to manually reserve the failed slot by clicking the link below:</p>
-                <p><a href="https://www.condomisoft.com/system/detalle_recursos.php?id_recurso=1780&nombre_recurso=GIMNASIO%20CUARTO%20PILATES%20Y%20%20SAL%C3%93N%20AEROBI" 
+                <p><a href="{manual_url}" 
                    style="background-color: #4CAF50; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px; display: inline-block;">
                    🏋️ Reserve Manually on Condomisoft
                 </a></p>
@@ -1116,7 +3640,7 @@ def run_cloud_reservation():
                 <ul>
                     <li><strong>Target Date:</strong> {target_date if target_date else 'Unable to determine'}</li>
                     <li><strong>Time Slots Attempted:</strong> {", ".join(attempted_slots)}</li>
-                    <li><strong>Location:</strong> Gym - G-502</li>
+                    <li><strong>Location:</strong> {location} - {apartment}</li>
                     <li><strong>Attempt Time:</strong> {start_time.strftime('%Y-%m-%d %H:%M:%S')}</li>
                     <li><strong>Duration:</strong> {duration.total_seconds():.1f} seconds</li>
                     <li><strong>Deployment:</strong> Cloud ☁️</li>
@@ -1154,7 +3678,7 @@ def run_cloud_reservation():
                 
                 <p><strong>Manual Reservation Link:</strong></p>
                 <p>You can try to make the reservation manually by clicking the link below:</p>
-                <p><a href="https://www.condomisoft.com/system/detalle_recursos.php?id_recurso=1780&nombre_recurso=GIMNASIO%20CUARTO%20PILATES%20Y%20%20SAL%C3%93N%20AEROBI" 
+                <p><a href="{manual_url}" 
                    style="background-color: #4CAF50; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px; display: inline-block;">
                    🏋️ Reserve Manually on Condomisoft
                 </a></p>
@@ -1167,35 +3691,233 @@ def run_cloud_reservation():
             </html>
             """
         
-        send_email_notification(subject, body, success=not no_success)
+        if notify is None or notify(outcomes):
+            send_email_notification(subject, body, success=not no_success, email_to=account.get("email_to"))
+        else:
+            logger.info("Result e-mail held back - this run will be retried")
+    
+    return outcomes
+
+def run_all_reservations(wait_for_opening=None):
+    """Run the reservation for every configured account, up to MAX_PARALLEL_ACCOUNTS at once.
+
+    Each account gets its own engine, results and email; MAX_CONCURRENT_ACCOUNTS bounds how many
+    browsers start up and log in at once (see get_startup_limiter). Each worker holds a live session
+    until its run ends, so accounts beyond MAX_PARALLEL_ACCOUNTS are queued and only start once an
+    earlier account finishes - after the opening. Returns True if every account reserved at least one slot.
+    """
+    accounts = load_accounts()
+    if len(accounts) == 1:
+        return is_reserved(run_cloud_reservation(wait_for_opening=wait_for_opening, account=accounts[0]))
+
+    max_workers = min(len(accounts), get_max_parallel_accounts())
+    logger.info(f"Running reservations for {len(accounts)} accounts, {max_workers} at a time, starting up to {get_max_concurrent_accounts()} at once")
+    if max_workers < len(accounts):
+        logger.warning(f"⚠️ {len(accounts) - max_workers} accounts are queued behind MAX_PARALLEL_ACCOUNTS={max_workers} and will start after the opening")
+
+    def run_account(account):
+        threading.current_thread().name = account.get("name") or account.get("username")
+        return run_cloud_reservation(wait_for_opening=wait_for_opening, account=account)
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="account") as executor:
+        futures = {executor.submit(run_account, account): account for account in accounts}
+        for future in as_completed(futures):
+            account_label = futures[future].get("name") or futures[future].get("username")
+            try:
+                results[account_label] = is_reserved(future.result())
+            except Exception as e:
+                logger.error(f"❌ Reservation for {account_label} crashed: {str(e)}")
+                results[account_label] = False
+
+    for account_label, account_success in results.items():
+        logger.info(f"{'✅' if account_success else '❌'} {account_label}")
+    return all(results.values())
+
+def get_max_concurrent_accounts():
+    """Return how many accounts may start their browsers and log in at the same time"""
+    try:
+        return max(1, int(os.getenv('MAX_CONCURRENT_ACCOUNTS', '2')))
+    except Exception:
+        return 2
+
+def get_max_parallel_accounts():
+    """Return how many accounts may hold a live session at the same time"""
+    try:
+        return max(1, int(os.getenv('MAX_PARALLEL_ACCOUNTS', '4')))
+    except Exception:
+        return 4
+
+_startup_limiter = None
+_startup_limiter_lock = threading.Lock()
+
+def get_startup_limiter():
+    """Return the process-wide semaphore bounding concurrent session start-ups to MAX_CONCURRENT_ACCOUNTS"""
+    global _startup_limiter
+    with _startup_limiter_lock:
+        if _startup_limiter is None:
+            _startup_limiter = threading.BoundedSemaphore(get_max_concurrent_accounts())
+        return _startup_limiter
+
+def get_reservation_opening(target_date):
+    """Return the moment reservations for target_date open (7 days before, at midnight)"""
+    mexico_tz = pytz.timezone('America/Mexico_City')
+
+    # Ensure target_date is timezone-aware
+    if target_date.tzinfo is None:
+        target_date = mexico_tz.localize(target_date)
+
+    reservation_opens = target_date - timedelta(days=7)
+    return reservation_opens.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def get_poll_interval(seconds_since_opening, fastest=0.25, slowest=5.0, tight_seconds=15.0):
+    """Seconds to wait before the next availability poll.
+
+    Closing in on the opening the interval halves with the time left (never below fastest); for
+    tight_seconds after it polls at fastest, then doubles every tight_seconds up to slowest.
+    """
+    if seconds_since_opening < 0:
+        return max(fastest, min(slowest, -seconds_since_opening / 2))
+    backoff_steps = min(32.0, max(0.0, seconds_since_opening - tight_seconds) / tight_seconds)
+    return min(slowest, fastest * 2 ** backoff_steps)
+
+def get_warm_pool_lead_seconds():
+    """Return how many seconds before the opening to warm up the browser (0 disables warm pool)"""
+    try:
+        return max(0, int(os.getenv('WARM_POOL_LEAD_SECONDS', '300')))
+    except Exception:
+        return 300
+
+def estimate_clock_offset(samples):
+    """Estimate server clock offset (server minus local, seconds) from Date header probes.
+
+    Each sample is (sent_at, received_at, server_second) in epoch seconds. The Date header is
+    truncated to whole seconds, so each probe bounds the offset to
+    [server_second - received_at, server_second + 1 - sent_at]; intersecting those intervals
+    NTP-style narrows it down. Returns a dict with offset, lower, upper and rtt.
+    """
+    if not samples:
+        return None
+
+    lower = max(server_second - received_at for sent_at, received_at, server_second in samples)
+    upper = min(server_second + 1 - sent_at for sent_at, received_at, server_second in samples)
+    rtt = min(received_at - sent_at for sent_at, received_at, server_second in samples)
+
+    if lower > upper:
+        # Inconsistent probes (e.g. server-side delay) - use the fastest probe's midpoint
+        sent_at, received_at, server_second = min(samples, key=lambda sample: sample[1] - sample[0])
+        midpoint = server_second + 0.5 - (sent_at + received_at) / 2
+        half_width = 0.5 + (received_at - sent_at) / 2
+        lower, upper = midpoint - half_width, midpoint + half_width
+
+    return {"offset": (lower + upper) / 2, "lower": lower, "upper": upper, "rtt": rtt}
+
+def measure_server_clock_offset(url=None, probes=None):
+    """Probe the condomisoft server's Date header and estimate its clock offset"""
+    url = url or os.getenv('CLOCK_SYNC_URL', 'https://www.condomisoft.com/system/login.php')
+    if probes is None:
+        try:
+            probes = int(os.getenv('CLOCK_SYNC_PROBES', '8'))
+        except Exception:
+            probes = 8
+
+    samples = []
+    with requests.Session() as session:
+        for i in range(probes):
+            try:
+                sent_at = time.time()
+                response = session.head(url, timeout=5, allow_redirects=False)
+                received_at = time.time()
+                server_date = response.headers.get('Date')
+                if server_date:
+                    samples.append((sent_at, received_at, parsedate_to_datetime(server_date).timestamp()))
+            except Exception as e:
+                logger.warning(f"Clock sync probe {i+1}/{probes} failed: {str(e)}")
+            # Spread probes across the second so the truncated Date header ticks at different phases
+            time.sleep(1.0 / max(probes, 1))
+
+    estimate = estimate_clock_offset(samples)
+    if estimate:
+        logger.info(f"🕐 Server clock offset {estimate['offset']:+.3f}s (range {estimate['lower']:+.3f}..{estimate['upper']:+.3f}s, "
+                    f"best RTT {estimate['rtt'] * 1000:.0f} ms, {len(samples)}/{probes} probes)")
+    else:
+        logger.warning("Clock sync failed - no usable Date headers, trusting the local clock")
+    return estimate
+
+def sleep_until(target_time, label="target"):
+    """Sleep until target_time with sub-millisecond precision and log the measured jitter.
+
+    Coarse sleeps are re-anchored to the wall clock every chunk (so clock adjustments during a
+    long wait are picked up), then the last PRECISE_SPIN_SECONDS are spun on the monotonic clock.
+    Returns the jitter in seconds (positive = late).
+    """
+    try:
+        spin_seconds = float(os.getenv('PRECISE_SPIN_SECONDS', '0.02'))
+    except Exception:
+        spin_seconds = 0.02
+
+    while True:
+        remaining = (target_time - datetime.now(target_time.tzinfo)).total_seconds()
+        if remaining <= spin_seconds:
+            break
+        # Never sleep more than 30s at once so the wall clock is re-checked regularly
+        time.sleep(min(remaining - spin_seconds, 30))
+
+    # Final approach on the monotonic clock: busy-wait the last few milliseconds
+    deadline = time.monotonic() + max(0.0, (target_time - datetime.now(target_time.tzinfo)).total_seconds())
+    while time.monotonic() < deadline:
+        pass
+
+    fired_at = datetime.now(target_time.tzinfo)
+    jitter = (fired_at - target_time).total_seconds()
+    logger.info(f"🎯 Fired {label} at {fired_at.strftime('%H:%M:%S.%f')[:-3]} (jitter {jitter * 1000:+.2f} ms)")
+    return jitter
+
+def wait_for_warm_up_time(target_date, lead_seconds):
+    """Sleep until lead_seconds before the reservation window opens"""
+    mexico_tz = pytz.timezone('America/Mexico_City')
+    warm_up_at = get_reservation_opening(target_date) - timedelta(seconds=lead_seconds)
+    current_time = datetime.now(mexico_tz)
+
+    if current_time < warm_up_at:
+        wait_seconds = (warm_up_at - current_time).total_seconds()
+        logger.info(f"🔥 Warm pool: waiting {wait_seconds / 60:.1f} minutes to warm up at {warm_up_at.strftime('%Y-%m-%d %H:%M:%S %Z')} ({lead_seconds}s before opening)")
+        sleep_until(warm_up_at, "warm-up")
+    else:
+        logger.info(f"🔥 Warm pool: inside the {lead_seconds}s lead window - warming up now")
 
 def wait_for_exact_reservation_time(target_date, holdoff_seconds=None):
     """Wait until 7 days before target date, then hold until 00:01+ buffer.
 
     By default, waits until 00:01:05 Mexico City time to avoid race conditions
-    at midnight. Override with RESERVATION_HOLDOFF_SECONDS env var.
+    at midnight. Override with RESERVATION_HOLDOFF_SECONDS env var. With
+    AVAILABILITY_POLLING the wait ends at the opening itself, where polling is tightest.
     """
     mexico_tz = pytz.timezone('America/Mexico_City')
 
-    # Resolve holdoff seconds (env override -> parameter default 65s)
+    # Resolve holdoff seconds (polling -> none, env override -> parameter default 65s)
+    if holdoff_seconds is None and os.getenv('AVAILABILITY_POLLING', 'false').lower() == 'true':
+        holdoff_seconds = 0
     if holdoff_seconds is None:
         try:
             holdoff_seconds = int(os.getenv('RESERVATION_HOLDOFF_SECONDS', '65'))
         except Exception:
             holdoff_seconds = 65
 
-    # Ensure target_date is timezone-aware
-    if target_date.tzinfo is None:
-        target_date = mexico_tz.localize(target_date)
-
-    # Calculate the exact moment reservations become available (7 days before at midnight)
-    reservation_opens = target_date - timedelta(days=7)
-    reservation_opens = reservation_opens.replace(hour=0, minute=0, second=0, microsecond=0)
+    reservation_opens = get_reservation_opening(target_date)
     desired_start = reservation_opens + timedelta(seconds=holdoff_seconds)
 
     logger.info(f"Target reservation date: {target_date.strftime('%A, %B %d, %Y')}")
     logger.info(f"Reservations open at: {reservation_opens.strftime('%A, %B %d, %Y at %H:%M:%S %Z')} (holding {holdoff_seconds}s -> start at {desired_start.strftime('%H:%M:%S')})")
 
+    # The 7-day rule is enforced with the server's clock - shift our local fire time by its offset.
+    # Use the lower bound of the estimate so we are never early by the server's reckoning.
+    if os.getenv('CLOCK_SYNC_ENABLED', 'true').lower() == 'true' and datetime.now(mexico_tz) < desired_start:
+        estimate = measure_server_clock_offset()
+        if estimate:
+            desired_start = desired_start - timedelta(seconds=estimate["lower"])
+            logger.info(f"Adjusted local start to {desired_start.strftime('%H:%M:%S.%f')[:-3]} to match the server clock")
+
     current_time = datetime.now(mexico_tz)
 
     # If we are before midnight opening, sleep until after holdoff
@@ -1203,123 +3925,261 @@ def wait_for_exact_reservation_time(target_date, holdoff_seconds=None):
         wait_seconds = (desired_start - current_time).total_seconds()
         wait_minutes = wait_seconds / 60
         logger.info(f"⏰ Waiting {wait_minutes:.1f} minutes ({wait_seconds:.1f} seconds) until {desired_start.strftime('%Y-%m-%d %H:%M:%S %Z')}...")
-        time.sleep(wait_seconds)
-        final_time = datetime.now(mexico_tz)
-        logger.info(f"🎯 Proceeding at: {final_time.strftime('%Y-%m-%d %H:%M:%S %Z')} (after holdoff)")
+        sleep_until(desired_start, "reservation")
     else:
         # We are already past desired start time – proceed immediately
         time_diff = (current_time - desired_start).total_seconds()
         logger.info(f"✅ Already {time_diff:.1f}s past desired start ({desired_start.strftime('%H:%M:%S')}). Proceeding now.")
 
-def run_cloud_reservation_with_retry():
-    """Function to run cloud reservation with precise timing and retry logic"""
+def get_next_opening(now, gym_days=None):
+    """Return (opening, target_date) for the first reservation window opening strictly after now"""
     mexico_tz = pytz.timezone('America/Mexico_City')
-    current_time = datetime.now(mexico_tz)
-    
-    logger.info(f"GitHub Action started at {current_time.strftime('%Y-%m-%d %H:%M:%S %Z')}")
-    
-    try:
-        # Determine the target date (FOLLOWING week's gym day) without requiring credentials
-        mexico_tz_local = pytz.timezone('America/Mexico_City')
-        now_local = datetime.now(mexico_tz_local)
-
-        # Compute base day (night-before -> tomorrow; early morning -> today; daytime -> today)
-        if now_local.hour >= 23:
-            base_day = now_local + timedelta(days=1)
-        elif 0 <= now_local.hour < 6:
-            base_day = now_local
-        else:
-            base_day = now_local
+    now = now.astimezone(mexico_tz)
+    gym_days = GYM_DAYS if gym_days is None else gym_days
 
-        # Next gym day relative to base_day (Mon=0, Wed=2, Fri=4)
-        gym_days = [0, 2, 4]
-        days_until_next_gym = min(((d - base_day.weekday()) % 7) for d in gym_days)
-        next_gym_day = base_day + timedelta(days=days_until_next_gym)
+    for days_ahead in range(8):
+        day = (now + timedelta(days=days_ahead)).date()
+        if day.weekday() not in gym_days:
+            continue
+        opening = mexico_tz.localize(datetime(day.year, day.month, day.day))
+        if opening > now:
+            return opening, opening + timedelta(days=7)
+    return None
 
-        # Target is the same weekday in the FOLLOWING week
-        target_date = next_gym_day + timedelta(days=7)
+def get_job_lead_seconds():
+    """Seconds before the opening a scheduled job starts: the warm pool lead, or enough to sync clocks"""
+    return get_warm_pool_lead_seconds() or 60
 
-        # Wait for the exact moment reservations become available, then hold past 00:01
-        holdoff_seconds = int(os.getenv('RESERVATION_HOLDOFF_SECONDS', '65')) if os.getenv('RESERVATION_HOLDOFF_SECONDS') else 65
-        wait_for_exact_reservation_time(target_date, holdoff_seconds)
-        
-        # Now run the actual reservation
-        run_cloud_reservation()
-        logger.info("✅ Reservation completed successfully with precise timing")
-        return True
-        
-    except Exception as e:
-        error_msg = str(e).lower()
-        
-        # Check if error is related to "7 days in advance" or timing issues
-        if "7 días" in error_msg or "7 days" in error_msg or "advance" in error_msg:
-            logger.warning("⚠️ Still got 'too early' error even after waiting - scheduling additional retries")
-            
-            # Schedule retry attempts with small delays
-            schedule.every().day.at("00:00:30").do(run_cloud_reservation_retry, attempt="30-seconds").tag('retry')
-            schedule.every().day.at("00:01:00").do(run_cloud_reservation_retry, attempt="1-minute").tag('retry')
-            schedule.every().day.at("00:02:00").do(run_cloud_reservation_retry, attempt="2-minute").tag('retry')
-            
-            logger.info("🔄 Scheduled additional retry attempts at 30s, 1min, and 2min past midnight")
-            return False
-        else:
-            # Other error, just log and report
-            logger.error(f"❌ Reservation failed with non-timing error: {e}")
+def run_scheduled_job(job, account, notify=None):
+    """Run one scheduler job in a worker thread; returns the run's {time_slot: Outcome}"""
+    threading.current_thread().name = account.get("name") or account.get("username")
+
+    if job["kind"] == "retry":
+        logger.info(f"🔄 Retry attempt {job['attempt']} for {job['account']}")
+        return run_cloud_reservation(account=account, notify=notify)
+
+    # The scheduler wakes us at the warm-up deadline; the exact opening is hit with sleep_until
+    target_date = datetime.fromisoformat(job["target_date"])
+    lead_seconds = get_warm_pool_lead_seconds()
+    if lead_seconds > 0:
+        wait_for_warm_up_time(target_date, lead_seconds)
+        return run_cloud_reservation(wait_for_opening=lambda: wait_for_exact_reservation_time(target_date), account=account, notify=notify)
+
+    wait_for_exact_reservation_time(target_date)
+    return run_cloud_reservation(account=account, notify=notify)
+
+class ReservationScheduler:
+    """Asyncio daemon that starts every account's reservation at its exact next opening.
+
+    Pending jobs are persisted in CACHE_DIR so a restart resumes the queue, runs that reserved
+    nothing for a reason a later run can fix are retried after SCHEDULER_RETRY_DELAYS seconds
+    (one result e-mail per job, once no retry follows), and SIGTERM/SIGINT stop the daemon cleanly.
+    """
+
+    def __init__(self, accounts=None):
+        accounts = accounts or load_accounts()
+        self.accounts = {account.get("name") or account.get("username"): account for account in accounts}
+        self.path = os.path.join(cache_dir, "scheduler_queue.json")
+        self.jobs = {}
+        self.running = {}
+        self.stopping = False
+        self.wake = None
+
+        try:
+            self.retry_delays = [float(delay) for delay in os.getenv('SCHEDULER_RETRY_DELAYS', '30,60,120').split(',') if delay.strip()]
+        except ValueError:
+            logger.warning("Invalid SCHEDULER_RETRY_DELAYS, using 30,60,120")
+            self.retry_delays = [30.0, 60.0, 120.0]
+        try:
+            self.missed_grace_seconds = float(os.getenv('SCHEDULER_MISSED_GRACE_SECONDS', '900'))
+        except ValueError:
+            self.missed_grace_seconds = 900.0
+
+    def load(self):
+        """Restore the persisted queue, dropping jobs of unknown accounts or missed by too long"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as queue_file:
+                jobs = json.load(queue_file).get("jobs", [])
+        except (ValueError, OSError) as e:
+            logger.warning(f"Ignoring unreadable scheduler queue: {str(e)}")
+            return
+
+        now = time.time()
+        for job in jobs:
+            if job.get("account") not in self.accounts:
+                logger.info(f"Dropping queued job {job.get('id')} - account no longer configured")
+            elif job["run_at"] < now - self.missed_grace_seconds:
+                logger.warning(f"⚠️ Dropping job {job['id']} - missed its deadline by {(now - job['run_at']) / 60:.0f} minutes")
+            else:
+                self.jobs[job["id"]] = job
+        logger.info(f"Restored {len(self.jobs)} pending jobs from {self.path}")
+
+    def save(self):
+        """Persist the pending queue (running jobs included, so a crash re-runs them)"""
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as queue_file:
+                json.dump({"saved_at": time.time(), "jobs": sorted(self.jobs.values(), key=lambda job: job["run_at"])}, queue_file, indent=2)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not save scheduler queue: {str(e)}")
+
+    def add_job(self, kind, account_key, run_at, target_date, opening, attempt=0):
+        """Queue a job and wake the loop so it recomputes the earliest deadline"""
+        job = {
+            "id": f"{kind}:{account_key}:{target_date}:{attempt}",
+            "kind": kind,
+            "account": account_key,
+            "run_at": run_at,
+            "target_date": target_date,
+            "opening": opening,
+            "attempt": attempt,
+        }
+        self.jobs[job["id"]] = job
+        if self.wake:
+            self.wake.set()
+        return job
+
+    def plan_account(self, account_key, after=None):
+        """Queue the account's next reservation unless one is already pending"""
+        if any(job["account"] == account_key and job["kind"] == "reservation" for job in self.jobs.values()):
+            return None
+        mexico_tz = pytz.timezone('America/Mexico_City')
+        now = datetime.now(mexico_tz)
+        if after and after > now.timestamp():
+            now = datetime.fromtimestamp(after, mexico_tz)
+        opening, target_date = get_next_opening(now)
+        return self.add_job("reservation", account_key, opening.timestamp() - get_job_lead_seconds(),
+                            target_date.date().isoformat(), opening.timestamp())
+
+    def wants_retry(self, job, outcomes):
+        """Whether a finished job runs again: nothing was reserved, retries are left and some slot
+        failed with a SCHEDULER_RETRY_OUTCOMES outcome whose RETRY_POLICIES entry allows retries"""
+        if is_reserved(outcomes) or job.get("attempt", 0) >= len(self.retry_delays):
             return False
+        policies = get_retry_policies()
+        return any(outcome in SCHEDULER_RETRY_OUTCOMES and policies.get(outcome, (0, 0.0))[0] > 0
+                   for outcome in outcomes.values())
 
-def run_cloud_reservation_retry(attempt="unknown"):
-    """Retry function that clears itself after successful run"""
-    mexico_tz = pytz.timezone('America/Mexico_City')
-    current_time = datetime.now(mexico_tz)
-    
-    logger.info(f"🔄 Retry attempt '{attempt}' at {current_time.strftime('%Y-%m-%d %H:%M:%S %Z')}")
-    
-    try:
-        run_cloud_reservation()
-        logger.info(f"✅ Reservation completed successfully on retry attempt: {attempt}")
-        
-        # Clear all retry jobs after successful completion
-        schedule.clear('retry')
-        logger.info("🧹 Cleared all retry schedules after successful reservation")
+    def schedule_retry(self, job):
+        """Queue the next retry of a failed job, backing off per SCHEDULER_RETRY_DELAYS"""
+        attempt = job.get("attempt", 0)
+        if attempt >= len(self.retry_delays):
+            logger.error(f"❌ {job['account']}: no retries left for {job['target_date']}")
+            return None
+        delay = self.retry_delays[attempt]
+        logger.info(f"🔄 Retrying {job['account']} in {delay:.0f}s (attempt {attempt + 1}/{len(self.retry_delays)})")
+        return self.add_job("retry", job["account"], time.time() + delay, job["target_date"], job["opening"], attempt + 1)
+
+    def cancel(self, job_id):
+        """Remove a pending job; jobs already running cannot be cancelled"""
+        if job_id in self.running:
+            logger.warning(f"Job {job_id} is already running and cannot be cancelled")
+            return False
+        if self.jobs.pop(job_id, None) is None:
+            return False
+        self.save()
+        if self.wake:
+            self.wake.set()
+        logger.info(f"Cancelled job {job_id}")
         return True
-        
-    except Exception as e:
-        logger.error(f"❌ Retry attempt '{attempt}' failed: {e}")
-        return False
+
+    def stop(self):
+        """Stop scheduling new jobs; running ones are allowed to finish"""
+        logger.info("🛑 Stop requested - no new jobs will be started")
+        self.stopping = True
+        if self.wake:
+            self.wake.set()
+
+    def log_queue(self):
+        mexico_tz = pytz.timezone('America/Mexico_City')
+        logger.info("Pending jobs:")
+        for job in sorted(self.jobs.values(), key=lambda job: job["run_at"]):
+            run_at = datetime.fromtimestamp(job["run_at"], mexico_tz)
+            logger.info(f"  - {job['id']} at {run_at.strftime('%A %Y-%m-%d %H:%M:%S %Z')}")
+
+    async def _run_job(self, job):
+        account = self.accounts[job["account"]]
+        outcomes = {}
+        try:
+            # MAX_CONCURRENT_ACCOUNTS is applied to session start-up only (get_startup_limiter), so
+            # no job waits for another to finish before sleeping until its opening
+            logger.info(f"⏰ Starting {job['id']} ({(time.time() - job['run_at']) * 1000:+.0f} ms from its deadline)")
+            # The run e-mails its result only when no retry will follow
+            outcomes = await asyncio.to_thread(run_scheduled_job, job, account, lambda outcomes: not self.wants_retry(job, outcomes))
+        except Exception as e:
+            logger.error(f"❌ Job {job['id']} crashed: {str(e)}")
+        finally:
+            self.running.pop(job["id"], None)
+            self.jobs.pop(job["id"], None)
+
+        if self.wants_retry(job, outcomes):
+            self.schedule_retry(job)
+        elif not is_reserved(outcomes):
+            logger.warning(f"❌ {job['account']}: no slot reserved for {job['target_date']} - not retrying ({', '.join(outcome.value for outcome in outcomes.values()) or 'crashed'})")
+        if job["kind"] == "reservation":
+            self.plan_account(job["account"], after=job["opening"])
+        self.save()
+        self.wake.set()
+
+    async def run(self):
+        """Sleep until the earliest deadline, start every due job concurrently, repeat until stopped"""
+        self.wake = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        # Each running job holds a thread until its run ends - room for a reservation and a retry per account
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=max(4, 2 * len(self.accounts)), thread_name_prefix="job"))
+        for signal_number in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(signal_number, self.stop)
+            except (NotImplementedError, RuntimeError):
+                pass
+        self.load()
+        for account_key in self.accounts:
+            self.plan_account(account_key)
+        self.save()
+        self.log_queue()
+
+        while not self.stopping:
+            self.wake.clear()
+            now = time.time()
+            for job in sorted(self.jobs.values(), key=lambda job: job["run_at"]):
+                if job["id"] not in self.running and job["run_at"] <= now:
+                    self.running[job["id"]] = asyncio.create_task(self._run_job(job))
+
+            pending = [job["run_at"] for job in self.jobs.values() if job["id"] not in self.running]
+            # Re-check the wall clock at least every 5 minutes so clock adjustments are picked up
+            timeout = min(max(min(pending) - time.time(), 0), 300) if pending else 300
+            try:
+                await asyncio.wait_for(self.wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+        if self.running:
+            logger.info(f"🛑 Waiting for {len(self.running)} running jobs to finish...")
+            await asyncio.gather(*self.running.values(), return_exceptions=True)
+        self.save()
+        logger.info("🛑 Scheduler stopped")
 
 def main():
-    """Main function to set up cloud scheduling with retry logic"""
-    # Schedule the script to run the night before at 11:30 PM Mexico City time
-    # Sunday night for Monday, Tuesday night for Wednesday, Thursday night for Friday
-    schedule.every().sunday.at("23:30").do(run_cloud_reservation_with_retry)
-    schedule.every().tuesday.at("23:30").do(run_cloud_reservation_with_retry)
-    schedule.every().thursday.at("23:30").do(run_cloud_reservation_with_retry)
-    
-    # Log current Mexico City time for reference
+    """Run the reservation scheduler daemon until SIGTERM/SIGINT"""
     mexico_tz = pytz.timezone('America/Mexico_City')
     current_time = datetime.now(mexico_tz)
-    
-    logger.info("Cloud scheduler started with retry logic")
-    logger.info("Will run on Sunday/Tuesday/Thursday at 11:30 PM Mexico City time")
-    logger.info("Automatic retries at 00:01 and 01:01 if needed")
+
+    logger.info("Cloud scheduler daemon started")
+    logger.info("Each account starts at its exact warm-up deadline before the Mon/Wed/Fri openings")
     logger.info(f"Current time in Mexico City: {current_time.strftime('%Y-%m-%d %H:%M:%S %Z')}")
-    logger.info("Next scheduled runs:")
-    
-    # Show next scheduled times
-    jobs = schedule.get_jobs()
-    for job in jobs:
-        logger.info(f"  - {job}")
-    
-    while True:
-        schedule.run_pending()
-        time.sleep(60)  # Check every minute
+
+    asyncio.run(ReservationScheduler().run())
 
 if __name__ == "__main__":
     # Check if we should run immediately (for GitHub Actions manual trigger)
     import os
     if os.getenv('GITHUB_ACTIONS') == 'true':
         logger.info("Running in GitHub Actions - executing immediately")
-        run_cloud_reservation()
+        run_all_reservations()
     else:
         # For immediate testing, uncomment the line below
         # run_cloud_reservation()
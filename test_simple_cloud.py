@@ -7,6 +7,8 @@ Tests the core logic without requiring specific drivers
 import os
 import sys
 import logging
+import time
+from contextlib import contextmanager
 from unittest.mock import Mock, patch
 from datetime import datetime, timedelta
 import pytz
@@ -23,6 +25,32 @@ os.environ.update({
     'EMAIL_PASSWORD': 'testapppass'
 })
 
+def make_test_account(**overrides):
+    """Return a fresh account dict for engine tests"""
+    return dict({"name": "test", "username": "test@example.com", "password": "testpass123", "apartment": "G-502"}, **overrides)
+
+@contextmanager
+def isolated_engine_env(**env):
+    """Keep engine state in a temporary CACHE_DIR with the session cache off; yields the directory"""
+    import tempfile
+    import gym_reservation_cloud
+    with tempfile.TemporaryDirectory() as temp_dir, patch.object(gym_reservation_cloud, 'cache_dir', temp_dir), \
+            patch.dict(os.environ, dict({'SESSION_CACHE_ENABLED': 'false'}, **env)):
+        yield temp_dir
+
+def stub_engine():
+    """Base class for engine stubs: a ReservationEngine whose page is neither the too-early error nor logged out"""
+    from gym_reservation_cloud import ReservationEngine
+    
+    class StubEngine(ReservationEngine):
+        def is_too_early(self):
+            return False
+        def is_authenticated(self):
+            return True
+        def get_page_text(self):
+            return ""
+    return StubEngine
+
 def test_timezone_logic():
     """Test timezone logic for Mexico City"""
     logger.info("Testing timezone logic...")
@@ -136,6 +164,1271 @@ def test_date_calculation():
         logger.error(f"❌ Date calculation failed: {e}")
         return False
 
+def test_warm_pool():
+    """Test that a warmed-up session is reused at the opening and a failed warm-up falls back to a cold start"""
+    logger.info("Testing warm pool...")
+    
+    try:
+        import gym_reservation_cloud
+        from gym_reservation_cloud import warm_up_with_fallback
+        
+        class WarmEngine(stub_engine()):
+            def __init__(self, account):
+                super().__init__(account)
+                self.calls = []
+            def start_session(self):
+                self.calls.append("start")
+            def login(self):
+                self.calls.append("login")
+            def select_apartment(self):
+                self.calls.append("apartment")
+            def navigate_to_reservation(self):
+                self.calls.append("navigate")
+            def preposition_calendar(self):
+                self.calls.append("preposition")
+            def refresh_reservation_page(self):
+                self.calls.append("refresh")
+            def run_with_retries(self):
+                self.calls.append("book")
+                self.reservation_results["07:30-08:00"]["success"] = True
+            def close(self):
+                self.calls.append("close")
+                super().close()
+        
+        account = make_test_account()
+        with isolated_engine_env():
+            # Warm-up logs in and parks before the opening; the booking then only reloads the page
+            engine = warm_up_with_fallback(WarmEngine(account))
+            assert engine.session_ready
+            assert engine.calls == ["start", "login", "apartment", "navigate", "preposition"]
+            engine.calls.clear()
+            engine.make_reservations()
+            assert engine.calls == ["refresh", "book", "close"]
+            
+            # A cold engine does the whole start-up after the opening
+            cold = WarmEngine(account)
+            cold.make_reservations()
+            assert cold.calls == ["start", "login", "apartment", "navigate", "preposition", "book", "close"]
+            
+            # A failed warm-up is closed and left for a cold start instead of failing the run
+            failing = WarmEngine(account)
+            failing.login = Mock(side_effect=Exception("login page did not load"))
+            assert warm_up_with_fallback(failing) is failing
+            assert not failing.session_ready and failing.calls[-1] == "close"
+        
+        # The warm-up is scheduled the configured lead before the opening
+        target_date = datetime.now(pytz.timezone('America/Mexico_City')) + timedelta(days=8)
+        with patch.object(gym_reservation_cloud, 'sleep_until') as sleep_until:
+            gym_reservation_cloud.wait_for_warm_up_time(target_date, 300)
+        assert sleep_until.call_args[0][0] == gym_reservation_cloud.get_reservation_opening(target_date) - timedelta(seconds=300)
+        
+        logger.info("✅ Warm sessions are reused and failed warm-ups fall back to cold starts")
+        return True
+    except Exception as e:
+        logger.error(f"❌ Warm pool failed: {e}")
+        return False
+
+def test_readiness_waits():
+    """Test the per-step readiness budgets that replaced the fixed sleeps"""
+    logger.info("Testing readiness waits...")
+    
+    try:
+        import gym_reservation_cloud
+        from selenium.common.exceptions import StaleElementReferenceException
+        
+        with patch.dict(os.environ, {'STEP_TIMEOUTS': 'slot=0.3, confirm=abc,bogus'}):
+            timeouts = gym_reservation_cloud.get_step_timeouts()
+        assert timeouts["slot"] == 0.3
+        assert timeouts["confirm"] == gym_reservation_cloud.DEFAULT_STEP_TIMEOUTS["confirm"]
+        
+        account = make_test_account()
+        with isolated_engine_env(STEP_TIMEOUTS='slot=0.3,confirm=0.3'):
+            engine = gym_reservation_cloud.GymReservationCloud(account)
+            engine.driver = Mock()
+            
+            # A condition that is already met returns at once with its value
+            started = time.monotonic()
+            assert engine.wait_until("slot", lambda driver: "ready", "Slot grid") == "ready"
+            assert time.monotonic() - started < 0.1
+            
+            # A condition that never holds costs exactly the step budget and does not raise
+            started = time.monotonic()
+            assert engine.wait_until("slot", lambda driver: False, "Slot grid") is None
+            assert 0.3 <= time.monotonic() - started < 1.0
+            
+            # A click that replaces the document is noticed as soon as the old root goes stale
+            old_root = Mock()
+            old_root.is_enabled.side_effect = StaleElementReferenceException()
+            engine.driver.execute_script.return_value = True
+            started = time.monotonic()
+            engine.wait_for_reaction(old_root, "confirm")
+            assert time.monotonic() - started < 0.3
+            
+            # The background fetch of the slot grid puts the session's script timeout back, also when it fails
+            engine.day_url = "https://www.condomisoft.com/system/detalle_recursos.php?id_recurso=1780&fecha=2025-10-20"
+            engine.driver.timeouts.script = 30
+            engine.driver.execute_async_script.side_effect = Exception("script timeout")
+            assert engine.fetch_slot_grid() is None
+            engine.driver.set_script_timeout.assert_called_with(30)
+        
+        logger.info("✅ Readiness waits return on the event and are bounded by the step budget")
+        return True
+    except Exception as e:
+        logger.error(f"❌ Readiness waits failed: {e}")
+        return False
+
+def test_http_page_parsing():
+    """Test form and slot grid parsing used by the HTTP engine"""
+    logger.info("Testing HTTP engine page parsing...")
+    
+    try:
+        from gym_reservation_cloud import HttpPage, extract_onclick_url, find_slot_row
+        
+        response = Mock()
+        response.url = "https://www.condomisoft.com/system/detalle_recursos.php?id_recurso=1780"
+        response.status_code = 200
+        response.text = """
+        <form action="login.php" method="POST">
+            <input type="text" name="usuario"><input type="password" name="clave">
+            <input type="hidden" name="token" value="abc"><input type="submit" name="entrar" value="Entrar">
+        </form>
+        <table>
+            <tr><td onclick="location.href='detalle_recursos.php?id_recurso=1780&amp;fecha=2025-10-20'">20</td></tr>
+            <tr><td>07:30-08:00</td><td><button onclick="window.location='reservar.php?h=1'">Disponible</button></td></tr>
+            <tr><td>08:00-08:30</td><td>Confirmado para G-502</td></tr>
+        </table>
+        <a href="salir.php">Salir</a>
+        """
+        page = HttpPage(response)
+        
+        assert page.forms[0]["method"] == "post"
+        assert page.forms[0]["password_fields"] == ["clave"]
+        assert page.forms[0]["fields"]["token"] == "abc"
+        assert page.is_logged_in()
+        
+        slot_row = find_slot_row(page.snapshot, "07:30-08:00")
+        assert slot_row["buttons"][0]["text"] == "Disponible"
+        assert extract_onclick_url(page.clickables[slot_row["buttons"][0]["ref"]]["onclick"]) == "reservar.php?h=1"
+        assert "Confirmado para G-502" in find_slot_row(page.snapshot, "08:00-08:30")["cells"]
+        
+        day_cell = page.find_clickables(lambda text, element: element["tag"] == "td" and text == "20")[0]
+        assert extract_onclick_url(day_cell["onclick"]).endswith("fecha=2025-10-20")
+        
+        logger.info("✅ Forms, slot rows and onclick targets parsed correctly")
+        return True
+    except Exception as e:
+        logger.error(f"❌ HTTP page parsing failed: {e}")
+        return False
+
+def test_http_nested_slot_rows():
+    """Test that the HTTP engine books each slot from its own row, also when layout tables nest the grid or slots run in parallel"""
+    logger.info("Testing HTTP engine slot rows in nested tables...")
+    
+    try:
+        from gym_reservation_cloud import HttpPage, HttpReservationEngine, Outcome, get_available_slots
+        
+        response = Mock()
+        response.url = "https://www.condomisoft.com/system/detalle_recursos.php?id_recurso=1780&fecha=2025-10-20"
+        response.status_code = 200
+        response.text = """
+        <table><tr><td>Menu</td><td>
+            <table>
+                <tr><td>07:30-08:00</td><td><button onclick="window.location='reservar.php?h=1'">Disponible</button></td></tr>
+                <tr><td>08:00-08:30</td><td><button onclick="window.location='reservar.php?h=2'">Disponible</button></td></tr>
+                <tr><td>08:30-09:00</td><td>Confirmado para G-502</td></tr>
+            </table>
+        </td></tr></table>
+        """
+        page = HttpPage(response)
+        assert get_available_slots(page.snapshot, ["07:30-08:00", "08:00-08:30", "08:30-09:00"]) == ["07:30-08:00", "08:00-08:30"]
+        
+        account = make_test_account()
+        with isolated_engine_env():
+            engine = HttpReservationEngine(account)
+            activated = []
+            def activate(day_page, element):
+                activated.append(element["onclick"])
+                return day_page
+            engine._activate = activate
+            
+            # The 08:00 booking follows the 08:00 button, not the first 'Disponible' of the outer row
+            assert engine.reserve_time_slot("08:00-08:30", day_page=page)
+            assert activated == ["window.location='reservar.php?h=2'"]
+            
+            # The outer row's 'Confirmado para G-502' does not confirm the 07:30 slot
+            # The booking landed on the grid, which already settles the slot without another fetch
+            assert engine.get_booking_response_status("08:00-08:30").outcome is Outcome.NOT_CONFIRMED
+            engine.page = page
+            assert engine.validate_reservation("07:30-08:00").outcome is Outcome.NOT_CONFIRMED
+            assert engine.validate_reservation("08:30-09:00").outcome is Outcome.CONFIRMED
+        
+            # Parallel workers land on their own pages without replacing the day page of the caller
+            def grid_response(url, body):
+                return Mock(url=url, status_code=200, text=f"<table>{body}</table>", raise_for_status=Mock())
+            landing_pages = {
+                "reservar.php?h=1": "<tr><td>07:30-08:00</td><td>Confirmado para G-502</td></tr>",
+                "reservar.php?h=2": "<tr><td>08:00-08:30</td><td>Confirmado para G-502</td></tr>",
+            }
+            def get(url, **kwargs):
+                if url.endswith("h=1"):
+                    time.sleep(0.05)
+                return grid_response(url, landing_pages[url.rsplit('/', 1)[-1]])
+            engine = HttpReservationEngine(account)
+            engine.session = Mock(get=get)
+            engine.page = page
+            attempted = engine.reserve_time_slots_parallel(["07:30-08:00", "08:00-08:30"])
+            assert attempted == {"07:30-08:00": True, "08:00-08:30": True}
+            assert engine.page is page
+            assert engine.validate_reservation("07:30-08:00").outcome is Outcome.CONFIRMED
+            assert engine.validate_reservation("08:00-08:30").outcome is Outcome.CONFIRMED
+        
+        logger.info("✅ Each slot is booked and validated from its own row")
+        return True
+    except Exception as e:
+        logger.error(f"❌ HTTP nested slot rows failed: {e}")
+        return False
+
+def test_booking_engine_fallback():
+    """Test that a booking step the HTTP engine cannot handle reaches the Selenium fallback"""
+    logger.info("Testing engine fallback from the booking step...")
+    
+    try:
+        from gym_reservation_cloud import EngineFallbackError
+        
+        class JsOnlyEngine(stub_engine()):
+            def reserve_time_slot(self, time_slot):
+                raise EngineFallbackError("'Disponible' only works through JavaScript")
+        
+        account = make_test_account()
+        with isolated_engine_env():
+            engine = JsOnlyEngine(account)
+            for book in (engine.book_slots, engine.book_then_validate):
+                try:
+                    book(["07:30-08:00"], {})
+                    raise AssertionError(f"{book.__name__} swallowed the engine fallback")
+                except EngineFallbackError:
+                    pass
+            assert engine.outcomes == []
+        
+        logger.info("✅ Booking steps hand engine fallbacks to the caller")
+        return True
+    except Exception as e:
+        logger.error(f"❌ Booking engine fallback failed: {e}")
+        return False
+
+def test_session_cache():
+    """Test encrypted session cache round trip and expiry"""
+    logger.info("Testing session cache...")
+    
+    try:
+        import tempfile
+        import gym_reservation_cloud
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with patch.object(gym_reservation_cloud, 'cache_dir', temp_dir):
+                cache = gym_reservation_cloud.SessionCache('test@example.com', 'testpass123')
+                cookies = [{"name": "PHPSESSID", "value": "abc123", "domain": "www.condomisoft.com", "path": "/"}]
+                cache.save(cookies, "G-502")
+                
+                with open(cache.path, 'rb') as cache_file:
+                    assert b"abc123" not in cache_file.read()
+                assert cache.load("G-502") == cookies
+                assert cache.load("H-101") is None
+                
+                # An invalid SESSION_CACHE_KEY falls back to the derived key instead of failing the run
+                with patch.dict(os.environ, {'SESSION_CACHE_KEY': 'not-a-fernet-key'}):
+                    assert gym_reservation_cloud.SessionCache('test@example.com', 'testpass123').load("G-502") == cookies
+                
+                # A different password cannot decrypt the cache
+                other = gym_reservation_cloud.SessionCache('test@example.com', 'otherpass')
+                assert other.load("G-502") is None
+                
+                # By default a session outlives the longest gap between two runs
+                with patch.dict(os.environ):
+                    os.environ.pop('SESSION_CACHE_TTL_MINUTES', None)
+                    default_ttl = gym_reservation_cloud.SessionCache('test@example.com', 'testpass123').ttl_minutes
+                gym_days = sorted(gym_reservation_cloud.GYM_DAYS)
+                longest_gap_days = max((later - earlier) % 7 or 7 for earlier, later in zip(gym_days, gym_days[1:] + gym_days[:1]))
+                assert default_ttl > longest_gap_days * 24 * 60
+                
+                cache.save(cookies, "G-502")
+                cache.ttl_minutes = -1
+                cache.save(cookies, "G-502")
+                assert cache.load("G-502") is None
+        
+        logger.info("✅ Session cache encrypts, restores and expires correctly")
+        return True
+    except Exception as e:
+        logger.error(f"❌ Session cache failed: {e}")
+        return False
+
+def test_precise_launcher():
+    """Test that sleep_until fires at the target instant, spinning only for the last few milliseconds"""
+    logger.info("Testing precise launcher...")
+    
+    try:
+        import gym_reservation_cloud
+        
+        mexico_tz = pytz.timezone('America/Mexico_City')
+        with patch.dict(os.environ, {'PRECISE_SPIN_SECONDS': '0.02'}):
+            target = datetime.now(mexico_tz) + timedelta(seconds=0.2)
+            real_sleep = time.sleep
+            with patch.object(gym_reservation_cloud.time, 'sleep', side_effect=real_sleep) as coarse_sleep:
+                jitter = gym_reservation_cloud.sleep_until(target, "test")
+            assert -0.005 <= jitter < 0.02
+            
+            # Coarse sleeps stop short of the target and leave the spin window to the busy-wait
+            assert coarse_sleep.called and all(call.args[0] <= 0.2 for call in coarse_sleep.call_args_list)
+            
+            # A target in the past fires at once
+            started = time.monotonic()
+            assert gym_reservation_cloud.sleep_until(datetime.now(mexico_tz) - timedelta(seconds=1), "late") >= 1
+            assert time.monotonic() - started < 0.05
+        
+        logger.info(f"✅ Fired {jitter * 1000:.2f} ms after the target")
+        return True
+    except Exception as e:
+        logger.error(f"❌ Precise launcher failed: {e}")
+        return False
+
+def test_clock_offset_estimation():
+    """Test NTP-style server clock offset estimation from 1-second Date headers"""
+    logger.info("Testing clock offset estimation...")
+    
+    try:
+        from gym_reservation_cloud import estimate_clock_offset
+        
+        # Server clock is 2.3s ahead; probes with a 40ms round trip at different sub-second phases
+        true_offset = 2.3
+        samples = []
+        for phase in [0.0, 0.125, 0.25, 0.375, 0.5, 0.625, 0.75, 0.875]:
+            sent_at = 1000.0 + phase
+            received_at = sent_at + 0.04
+            server_second = float(int(sent_at + 0.02 + true_offset))
+            samples.append((sent_at, received_at, server_second))
+        
+        estimate = estimate_clock_offset(samples)
+        assert estimate["lower"] <= true_offset <= estimate["upper"]
+        assert abs(estimate["offset"] - true_offset) < 0.15
+        assert abs(estimate["rtt"] - 0.04) < 1e-9
+        assert estimate_clock_offset([]) is None
+        
+        logger.info(f"✅ Estimated offset {estimate['offset']:+.3f}s for a true offset of {true_offset:+.3f}s")
+        return True
+    except Exception as e:
+        logger.error(f"❌ Clock offset estimation failed: {e}")
+        return False
+
+def test_multi_account_loading():
+    """Test account list parsing and that every account runs at once regardless of the start-up bound"""
+    logger.info("Testing multi-account orchestration...")
+    
+    try:
+        import json
+        import tempfile
+        import threading
+        import gym_reservation_cloud
+        
+        entries = [
+            {"name": "Resident 2", "username": "r2@example.com", "password_env": "RESIDENT2_PASSWORD",
+             "apartment": "H-101", "time_slots": ["07:00-07:30"]},
+            {"username": "r3@example.com", "password": "secret3"},
+        ]
+        env = {'CONDOMISOFT_USERNAME': 'main@example.com', 'CONDOMISOFT_PASSWORD': 'mainpass',
+               'APARTMENT': 'G-502', 'RESIDENT2_PASSWORD': 'secret2', 'MAX_CONCURRENT_ACCOUNTS': '1'}
+        with tempfile.TemporaryDirectory() as temp_dir:
+            accounts_file = os.path.join(temp_dir, "accounts.json")
+            with open(accounts_file, 'w') as f:
+                json.dump(entries, f)
+            
+            with patch.dict(os.environ, env):
+                os.environ.pop('ACCOUNTS_FILE', None)
+                default_accounts = gym_reservation_cloud.load_accounts()
+                assert [account["username"] for account in default_accounts] == ["main@example.com"]
+                
+                os.environ['ACCOUNTS_FILE'] = accounts_file
+                accounts = gym_reservation_cloud.load_accounts()
+        
+        assert accounts[0]["name"] == "Resident 2" and accounts[0]["password"] == "secret2"
+        assert accounts[0]["apartment"] == "H-101" and accounts[0]["time_slots"] == ["07:00-07:30"]
+        assert "password_env" not in accounts[0]
+        assert accounts[1]["name"] == "r3@example.com" and accounts[1]["password"] == "secret3"
+        assert accounts[1]["apartment"] == "G-502"
+        
+        # With MAX_CONCURRENT_ACCOUNTS=1 every account must still be running at the same time
+        at_opening = threading.Barrier(len(accounts) + 1, timeout=5)
+        def run_cloud_reservation(wait_for_opening=None, account=None):
+            at_opening.wait()
+            return {"07:00-07:30": gym_reservation_cloud.Outcome.CONFIRMED}
+        with patch.dict(os.environ, {'MAX_CONCURRENT_ACCOUNTS': '1', 'MAX_PARALLEL_ACCOUNTS': '4'}), \
+                patch.object(gym_reservation_cloud, 'load_accounts', return_value=accounts + [dict(accounts[1], name="r4")]), \
+                patch.object(gym_reservation_cloud, 'run_cloud_reservation', run_cloud_reservation):
+            assert gym_reservation_cloud.run_all_reservations()
+        
+        # MAX_PARALLEL_ACCOUNTS caps the live sessions; the other accounts are queued, not dropped
+        live = []
+        peak = []
+        live_lock = threading.Lock()
+        def run_cloud_reservation(wait_for_opening=None, account=None):
+            with live_lock:
+                live.append(account["name"])
+                peak.append(len(live))
+            time.sleep(0.05)
+            with live_lock:
+                live.remove(account["name"])
+            return {"07:00-07:30": gym_reservation_cloud.Outcome.CONFIRMED}
+        with patch.dict(os.environ, {'MAX_PARALLEL_ACCOUNTS': '2'}), \
+                patch.object(gym_reservation_cloud, 'load_accounts', return_value=accounts + [dict(accounts[1], name="r4")]), \
+                patch.object(gym_reservation_cloud, 'run_cloud_reservation', run_cloud_reservation):
+            assert gym_reservation_cloud.run_all_reservations()
+        assert len(peak) == 3 and max(peak) == 2
+        
+        logger.info("✅ Accounts parsed and run side by side")
+        return True
+    except Exception as e:
+        logger.error(f"❌ Multi-account orchestration failed: {e}")
+        return False
+
+def test_resource_index():
+    """Test amenity discovery, name lookup and slot grid caching"""
+    logger.info("Testing resource index...")
+    
+    try:
+        import tempfile
+        import gym_reservation_cloud
+        
+        links = [
+            ("detalle_recursos.php?id_recurso=1780&nombre_recurso=GIMNASIO%20CUARTO%20PILATES", "Gimnasio"),
+            ("window.location='detalle_recursos.php?id_recurso=1781&amp;nombre_recurso=ALBERCA';", "Alberca"),
+            ("detalle_recursos.php?id_recurso=1782", "Salón de Fiestas"),
+            ("avisos.php", "Avisos"),
+        ]
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with patch.object(gym_reservation_cloud, 'cache_dir', temp_dir):
+                index = gym_reservation_cloud.ResourceIndex('test@example.com')
+                assert index.add_links(links, "https://www.condomisoft.com/system/") == 3
+                assert index.add_links(links, "https://www.condomisoft.com/system/") == 0
+                
+                assert index.find("alberca")["url"] == "https://www.condomisoft.com/system/detalle_recursos.php?id_recurso=1781&nombre_recurso=ALBERCA"
+                assert index.find("salon de fiestas")["id"] == "1782"
+                assert index.find("gimnasio")["id"] == "1780"
+                assert index.find("1781")["name"] == "ALBERCA"
+                assert index.find("cancha") is None
+                
+                # Absolute and root-relative links keep their path
+                absolute_links = [
+                    ("/system/detalle_recursos.php?id_recurso=1783&nombre_recurso=LUDOTECA", "Ludoteca"),
+                    ("location.href='https://www.condomisoft.com/system/detalle_recursos.php?id_recurso=1784'", "Terraza"),
+                ]
+                assert index.add_links(absolute_links, "https://www.condomisoft.com/system/recursos.php") == 2
+                assert index.find("ludoteca")["url"] == "https://www.condomisoft.com/system/detalle_recursos.php?id_recurso=1783&nombre_recurso=LUDOTECA"
+                assert index.find("terraza")["url"] == "https://www.condomisoft.com/system/detalle_recursos.php?id_recurso=1784"
+                
+                assert index.record_slots("1780", "07:30 - 08:00 Disponible 08:00-08:30 Reservado")
+                assert not index.record_slots("1780", "08:00 - 08:30 07:30 - 08:00")
+                index.save()
+                
+                reloaded = gym_reservation_cloud.ResourceIndex('test@example.com')
+                assert reloaded.find("gimnasio")["slots"] == ["07:30-08:00", "08:00-08:30"]
+        
+        logger.info("✅ Resource index discovers, finds and caches amenities correctly")
+        return True
+    except Exception as e:
+        logger.error(f"❌ Resource index failed: {e}")
+        return False
+
+def test_calendar_preposition():
+    """Test moving the parked calendar to the target month before the opening"""
+    logger.info("Testing calendar pre-positioning...")
+    
+    try:
+        now = datetime.now(pytz.timezone('America/Mexico_City'))
+        next_month = (now.year + now.month // 12, now.month % 12 + 1)
+        target_date = now.replace(year=next_month[0], month=next_month[1], day=5)
+        
+        class CalendarEngine(stub_engine()):
+            def __init__(self, account, month_in_url=True, fail=False):
+                super().__init__(account)
+                self.month_in_url = month_in_url
+                self.fail = fail
+                self.url = self.reservation_url
+                self.calls = []
+            def get_target_date(self):
+                return target_date
+            def advance_calendar(self, months, log_prefix=""):
+                if self.fail:
+                    raise Exception("no next month link")
+                for _ in range(months):
+                    self.calls.append("next")
+                    self.note_month_advanced()
+                    if self.month_in_url:
+                        self.url = f"{self.reservation_url}&mes={self.calendar_month[1]}"
+            def get_current_url(self):
+                return self.url
+            def locate_target_day(self, target_date):
+                self.calls.append("locate")
+                return True
+            def navigate_to_reservation(self):
+                self.calls.append("reload")
+                self.url = self.reservation_url
+                self.calendar_month = None
+        
+        account = make_test_account()
+        with isolated_engine_env():
+            # The month is in the URL: park on it so only the day click is left after the opening
+            engine = CalendarEngine(account)
+            engine.preposition_calendar()
+            assert engine.calls == ["next", "locate"]
+            assert engine.calendar_month == next_month and engine.get_months_to_advance(target_date) == 0
+            
+            # The month is not URL-addressable: the reload at the opening would lose it, so stay put
+            engine = CalendarEngine(account, month_in_url=False)
+            engine.preposition_calendar()
+            assert engine.calls == ["next", "reload"]
+            assert engine.calendar_month is None and engine.get_months_to_advance(target_date) == 1
+            
+            # Any failure leaves the session parked on the reservation page
+            engine = CalendarEngine(account, fail=True)
+            engine.preposition_calendar()
+            assert engine.calls == ["reload"]
+        
+        logger.info("✅ Calendar is pre-positioned only when the opening reload keeps the month")
+        return True
+    except Exception as e:
+        logger.error(f"❌ Calendar pre-positioning failed: {e}")
+        return False
+
+def test_day_url_template():
+    """Test learning and rebuilding the calendar's direct day page links"""
+    logger.info("Testing day page link learning...")
+    
+    try:
+        from datetime import datetime
+        from gym_reservation_cloud import learn_day_url_template, build_day_url
+        
+        page_url = "https://www.condomisoft.com/system/detalle_recursos.php?id_recurso=1780"
+        
+        # Full date in one parameter - valid for any month
+        links = [(f"location.href='reservar.php?id_recurso=1780&amp;fecha=2026-10-{day:02d}'", str(day)) for day in (12, 14, 16)]
+        template = learn_day_url_template(links + [("", "Lun")], 2026, 10, page_url)
+        assert template["month"] is None
+        assert build_day_url(template, datetime(2026, 11, 2)) == "https://www.condomisoft.com/system/reservar.php?id_recurso=1780&fecha=2026-11-02"
+        
+        # Separate day/month/year parameters
+        links = [(f"reservar.php?id_recurso=1780&dia={day}&mes=10&anio=2026", f"{day:02d}") for day in (5, 7)]
+        template = learn_day_url_template(links, 2026, 10, page_url)
+        assert build_day_url(template, datetime(2027, 1, 4)) == "https://www.condomisoft.com/system/reservar.php?id_recurso=1780&dia=4&mes=1&anio=2027"
+        
+        # Only the day is encoded - the pattern is limited to the month it was learned in
+        links = [(f"reservar.php?id_recurso=1780&d={day}&x=10", str(day)) for day in (5, 7)]
+        template = learn_day_url_template(links, 2026, 10, page_url)
+        assert build_day_url(template, datetime(2026, 10, 9)).endswith("reservar.php?id_recurso=1780&d=9&x=10")
+        assert build_day_url(template, datetime(2026, 11, 9)) is None
+        
+        # Inconsistent or insufficient links are not learned
+        assert learn_day_url_template(links[:1], 2026, 10, page_url) is None
+        assert learn_day_url_template([("reservar.php?token=a", "5"), ("reservar.php?token=b", "7")], 2026, 10, page_url) is None
+        
+        logger.info("✅ Day page links are learned and rebuilt correctly")
+        return True
+    except Exception as e:
+        logger.error(f"❌ Day page link learning failed: {e}")
+        return False
+
+def test_availability_polling():
+    """Test the adaptive poll interval and reading available slots from a snapshot"""
+    logger.info("Testing availability polling...")
+    
+    try:
+        from gym_reservation_cloud import get_poll_interval, get_available_slots
+        
+        # Closing in on the opening, then tight, then backing off to the slowest interval
+        assert get_poll_interval(-60) == 5.0
+        assert get_poll_interval(-2) == 1.0
+        assert get_poll_interval(-0.1) == 0.25
+        assert get_poll_interval(0) == 0.25
+        assert get_poll_interval(15) == 0.25
+        assert get_poll_interval(30) == 0.5
+        assert get_poll_interval(45) == 1.0
+        assert get_poll_interval(600) == 5.0
+        assert get_poll_interval(10 ** 6) == 5.0
+        assert get_poll_interval(30, fastest=1, slowest=1.5, tight_seconds=10) == 1.5
+        
+        snapshot = {"rows": [
+            {"text": "07:30 - 08:00 Disponible 08:00 - 08:30 Reservado", "buttons": [{"text": "Disponible"}]},
+            {"text": "07:30 - 08:00 Disponible", "buttons": [{"text": "Disponible"}]},
+            {"text": "08:00 - 08:30 Reservado", "buttons": []},
+        ]}
+        assert get_available_slots(snapshot, ["07:30 - 08:00", "08:00 - 08:30", "09:00 - 09:30"]) == ["07:30 - 08:00"]
+        
+        import gym_reservation_cloud
+        from gym_reservation_cloud import Outcome
+        
+        # Polling stops as soon as every wanted slot shows a final status, without booking it
+        taken_grid = {"url": "", "text": "07:30-08:00 08:00-08:30", "rows": [
+            {"text": "07:30-08:00 Confirmado para H-101", "cells": ["07:30-08:00", "Confirmado para H-101"], "buttons": []},
+            {"text": "08:00-08:30 Confirmado para G-502", "cells": ["08:00-08:30", "Confirmado para G-502"], "buttons": []},
+        ]}
+        class PollingEngine(stub_engine()):
+            grids = [None, taken_grid]
+            booked = []
+            def select_calendar_day(self):
+                return True
+            def read_slot_grid(self, reload=True):
+                return self.grids.pop(0)
+            def navigate_to_reservation(self):
+                pass
+            def reserve_time_slot(self, time_slot):
+                self.booked.append(time_slot)
+                return False
+        
+        account = make_test_account()
+        with isolated_engine_env(AVAILABILITY_POLLING='true', CLOCK_SYNC_ENABLED='false'), \
+                patch.object(gym_reservation_cloud.time, 'sleep'):
+            engine = PollingEngine(account)
+            failures = engine.attempt_reservations(["07:30-08:00", "08:00-08:30"])
+            assert failures == {"07:30-08:00": Outcome.TAKEN_BY_OTHER}
+            assert engine.reservation_results["08:00-08:30"]["success"]
+            assert PollingEngine.grids == [] and PollingEngine.booked == []
+            
+            # POLL_INTERVALS is spread into get_poll_interval(), so only 1-3 positive values are taken
+            defaults = [0.25, 5.0, 15.0]
+            for configured, expected in (("0.5", [0.5]), ("0.5,2,10", [0.5, 2.0, 10.0]), ("0.5,2,10,4", defaults),
+                                         ("0,5", defaults), ("-1", defaults), ("fast", defaults)):
+                with patch.dict(os.environ, {'POLL_INTERVALS': configured}):
+                    intervals = PollingEngine(account).poll_intervals
+                assert intervals == expected and get_poll_interval(30, *intervals) > 0
+            
+            # With polling the wait for the opening has no holdoff, so the tight phase is used
+            target_date = datetime.now(pytz.timezone('America/Mexico_City')) + timedelta(days=8)
+            with patch.object(gym_reservation_cloud, 'sleep_until') as sleep_until:
+                gym_reservation_cloud.wait_for_exact_reservation_time(target_date)
+            assert sleep_until.call_args[0][0] == gym_reservation_cloud.get_reservation_opening(target_date)
+        
+        logger.info("✅ Poll interval adapts around the opening and available slots are detected")
+        return True
+    except Exception as e:
+        logger.error(f"❌ Availability polling failed: {e}")
+        return False
+
+def test_deferred_validation():
+    """Test that deferred validation books every slot in order before validating them in one pass"""
+    logger.info("Testing deferred validation...")
+    
+    try:
+        import gym_reservation_cloud
+        from gym_reservation_cloud import AttemptOutcome, Outcome
+        
+        class DeferredEngine(stub_engine()):
+            calls = []
+            def reserve_time_slot(self, time_slot):
+                self.calls.append(("book", time_slot))
+                return time_slot != "09:00-09:30"
+            def validate_reservations(self, time_slots):
+                self.calls.append(("validate", list(time_slots)))
+                return {"07:30-08:00": AttemptOutcome(Outcome.CONFIRMED, "Confirmed successfully", "07:30-08:00"),
+                        "08:00-08:30": AttemptOutcome(Outcome.TAKEN_BY_OTHER, "Time slot occupied by another user", "08:00-08:30")}
+            def validate_reservation(self, time_slot):
+                raise AssertionError("slots must not be validated one by one")
+        
+        account = make_test_account(time_slots=["07:30-08:00", "08:00-08:30", "09:00-09:30"])
+        with isolated_engine_env():
+            engine = DeferredEngine(account)
+            failures = engine.book_then_validate(engine.time_slots, {})
+            
+            # The browser engine goes back to the day page when the last booking left it elsewhere
+            browser = gym_reservation_cloud.GymReservationCloud(account)
+            browser.driver = Mock(current_url="https://www.condomisoft.com/system/reservar.php?h=1")
+            browser.day_url = "https://www.condomisoft.com/system/detalle_recursos.php?id_recurso=1780&fecha=2025-10-20"
+            with patch.object(browser, 'return_to_day_page') as return_to_day_page, \
+                    patch.object(browser, 'find_slot_button', return_value=None):
+                assert not browser.reserve_time_slot("08:00-08:30")
+            assert return_to_day_page.called
+            
+            # Parallel slot tabs are closed and the main tab is back in front, also when booking fails
+            browser.driver = Mock(current_url=browser.day_url, current_window_handle="main", window_handles=["main"])
+            def open_tab(script, *args):
+                browser.driver.window_handles = ["main", "tab"]
+            browser.driver.execute_script.side_effect = open_tab
+            with patch.object(browser, 'wait_until'), \
+                    patch.object(browser, 'find_slot_button', side_effect=Exception("stale element")):
+                try:
+                    browser.reserve_time_slots_parallel(["07:30-08:00", "08:00-08:30"])
+                    raise AssertionError("the failed lookup was swallowed")
+                except Exception as e:
+                    assert str(e) == "stale element"
+            assert browser.driver.close.call_count == 1
+            browser.driver.switch_to.window.assert_called_with("main")
+            assert browser.slot_tabs == {}
+        
+        assert DeferredEngine.calls == [("book", "07:30-08:00"), ("book", "08:00-08:30"), ("book", "09:00-09:30"),
+                                        ("validate", ["07:30-08:00", "08:00-08:30"])]
+        assert failures == {"08:00-08:30": Outcome.TAKEN_BY_OTHER, "09:00-09:30": Outcome.SELECTOR_MISS}
+        assert engine.reservation_results["07:30-08:00"]["success"]
+        assert [attempt.time_slot for attempt in engine.outcomes] == ["09:00-09:30", "07:30-08:00", "08:00-08:30"]
+        
+        logger.info("✅ Slots booked in order and validated together")
+        return True
+    except Exception as e:
+        logger.error(f"❌ Deferred validation failed: {e}")
+        return False
+
+def test_session_retry():
+    """Test in-session retry budgets, backoff, deadline and failure classification"""
+    logger.info("Testing in-session retry...")
+    
+    try:
+        import gym_reservation_cloud
+        from gym_reservation_cloud import SessionRetry, Outcome
+        
+        now = [0.0]
+        policies = {Outcome.TOO_EARLY: (3, 0.5), Outcome.TAKEN_BY_OTHER: (0, 0.0), Outcome.TIMEOUT: (5, 1.0)}
+        retry = SessionRetry(policies, deadline_seconds=10, max_backoff=4, jitter=0, clock=lambda: now[0])
+        
+        # Doubling backoff up to the per-outcome retry limit
+        assert [retry.next_delay(Outcome.TOO_EARLY) for _ in range(4)] == [0.5, 1.0, 2.0, None]
+        assert retry.next_delay(Outcome.TAKEN_BY_OTHER) is None
+        assert retry.next_delay(Outcome.ERROR) is None
+        
+        # Backoff ceiling and the total deadline
+        assert [retry.next_delay(Outcome.TIMEOUT) for _ in range(3)] == [1.0, 2.0, 4.0]
+        now[0] = 7.0
+        assert retry.next_delay(Outcome.TIMEOUT) is None
+        
+        # Jitter stays within the configured fraction
+        jittered = SessionRetry(policies, deadline_seconds=10, max_backoff=4, jitter=0.25, clock=lambda: 0.0)
+        assert 0.75 <= jittered.next_delay(Outcome.TIMEOUT) <= 1.25
+        
+        with patch.dict(os.environ, {'RETRY_POLICIES': 'too_early=2:0.1,bogus,unknown=1:1'}):
+            policies = gym_reservation_cloud.get_retry_policies()
+            assert policies[Outcome.TOO_EARLY] == (2, 0.1)
+            assert policies[Outcome.TAKEN_BY_OTHER] == (0, 0.0)
+        
+        logger.info("✅ In-session retries are bounded and back off correctly")
+        return True
+    except Exception as e:
+        logger.error(f"❌ In-session retry failed: {e}")
+        return False
+
+def test_run_with_retries():
+    """Test that a retry round settles pending slots from the slot grid before booking any of them again"""
+    logger.info("Testing retries settled from the slot grid...")
+    
+    try:
+        import gym_reservation_cloud
+        from gym_reservation_cloud import AttemptOutcome, Outcome
+        
+        # The first round's bookings went through too slowly to validate, and 08:00 was taken meanwhile
+        settled_grid = {"url": "", "text": "07:30-08:00 08:00-08:30", "rows": [
+            {"text": "07:30-08:00 Confirmado para G-502", "cells": ["07:30-08:00", "Confirmado para G-502"], "buttons": []},
+            {"text": "08:00-08:30 Confirmado para H-101", "cells": ["08:00-08:30", "Confirmado para H-101"], "buttons": []},
+        ]}
+        class RetryEngine(stub_engine()):
+            booked = []
+            retries = []
+            def select_calendar_day(self):
+                return True
+            def read_slot_grid(self, reload=True):
+                return settled_grid
+            def reserve_time_slot(self, time_slot):
+                self.booked.append(time_slot)
+                return True
+            def validate_reservation(self, time_slot):
+                return AttemptOutcome(Outcome.NOT_CONFIRMED, "Reservation status unclear", time_slot)
+            def prepare_retry(self, outcome):
+                self.retries.append(outcome)
+        
+        account = make_test_account(time_slots=["07:30-08:00", "08:00-08:30"])
+        with isolated_engine_env(AVAILABILITY_POLLING='false'), \
+                patch.object(gym_reservation_cloud.time, 'sleep'):
+            engine = RetryEngine(account)
+            engine.run_with_retries()
+        
+        # One retry round, which books nothing: the grid already confirms one slot and shows the other taken
+        assert RetryEngine.booked == ["07:30-08:00", "08:00-08:30"]
+        assert RetryEngine.retries == [Outcome.NOT_CONFIRMED]
+        assert engine.reservation_results["07:30-08:00"]["success"]
+        assert engine.reservation_results["08:00-08:30"]["outcome"] == Outcome.TAKEN_BY_OTHER.value
+        assert [(attempt.time_slot, attempt.outcome) for attempt in engine.outcomes] == [
+            ("07:30-08:00", Outcome.NOT_CONFIRMED), ("08:00-08:30", Outcome.NOT_CONFIRMED),
+            ("07:30-08:00", Outcome.CONFIRMED), ("08:00-08:30", Outcome.TAKEN_BY_OTHER)]
+        
+        logger.info("✅ Retry rounds rebook only the slots still showing 'Disponible'")
+        return True
+    except Exception as e:
+        logger.error(f"❌ Retries settled from the slot grid failed: {e}")
+        return False
+
+def test_email_notifier():
+    """Test background e-mail dispatch: batching, connection reuse, retries and bounded flush"""
+    logger.info("Testing email notifier...")
+    
+    try:
+        from gym_reservation_cloud import EmailNotifier, batch_notifications
+        
+        def notification(subject, success, email_to="a@example.com"):
+            return {"subject": subject, "body": f"<html><body><p>{subject}</p></body></html>", "success": success, "email_to": email_to}
+        
+        batched = batch_notifications([notification("one", True), notification("two", False), notification("three", True, "b@example.com")])
+        assert len(batched) == 2
+        assert batched[0]["subject"] == "🏋️ Gym Reservations: 1/2 runs succeeded (Cloud)"
+        assert "<p>one</p><hr><p>two</p>" in batched[0]["body"] and not batched[0]["success"]
+        assert batched[1]["subject"] == "three"
+        
+        class FakeSMTP:
+            connections = 0
+            failures = 1
+            sent = []
+            
+            def __init__(self, host, port, timeout=None):
+                FakeSMTP.connections += 1
+            def starttls(self):
+                pass
+            def login(self, user, password):
+                pass
+            def noop(self):
+                return (250, b"OK")
+            def quit(self):
+                pass
+            def sendmail(self, sender, recipient, text):
+                if FakeSMTP.failures:
+                    FakeSMTP.failures -= 1
+                    raise OSError("connection dropped")
+                FakeSMTP.sent.append(recipient)
+        
+        env = {'EMAIL_USER': 'bot@example.com', 'EMAIL_PASSWORD': 'secret', 'NOTIFY_BATCH_SECONDS': '0.2',
+               'NOTIFY_RETRY_DELAYS': '0.01,0.01', 'SMTP_IDLE_SECONDS': '60'}
+        with patch.dict(os.environ, env):
+            notifier = EmailNotifier(smtp_factory=FakeSMTP)
+            started = time.monotonic()
+            notifier.enqueue(notification("one", True))
+            notifier.enqueue(notification("two", True, "b@example.com"))
+            assert time.monotonic() - started < 0.1  # Queuing never waits for SMTP
+            assert notifier.flush(timeout=5)
+            
+            # The first send failed and was retried on a fresh connection, which was then reused
+            assert FakeSMTP.sent == ["a@example.com", "b@example.com"]
+            assert FakeSMTP.connections == 2
+            
+            notifier.enqueue(notification("three", True))
+            assert notifier.flush(timeout=5)
+            assert FakeSMTP.connections == 2 and len(FakeSMTP.sent) == 3
+        
+        logger.info("✅ Notifications are queued, batched and sent over a reused connection")
+        return True
+    except Exception as e:
+        logger.error(f"❌ Email notifier failed: {e}")
+        return False
+
+def test_scheduler_deadlines():
+    """Test next-opening deadlines, retry backoff and queue persistence of the scheduler"""
+    logger.info("Testing scheduler deadlines...")
+    
+    try:
+        import tempfile
+        import gym_reservation_cloud
+        from gym_reservation_cloud import get_next_opening, ReservationScheduler, Outcome
+        
+        mexico_tz = pytz.timezone('America/Mexico_City')
+        
+        # Sunday 23:30 -> Monday 00:00 opening for the Monday after
+        opening, target = get_next_opening(mexico_tz.localize(datetime(2025, 1, 5, 23, 30)))
+        assert opening == mexico_tz.localize(datetime(2025, 1, 6))
+        assert target.date() == datetime(2025, 1, 13).date()
+        
+        # Exactly at an opening, the next one (Wednesday) is returned
+        opening, target = get_next_opening(mexico_tz.localize(datetime(2025, 1, 6)))
+        assert opening == mexico_tz.localize(datetime(2025, 1, 8))
+        
+        # Friday afternoon rolls over the weekend to Monday
+        opening, target = get_next_opening(mexico_tz.localize(datetime(2025, 1, 10, 15, 0)))
+        assert opening == mexico_tz.localize(datetime(2025, 1, 13))
+        
+        accounts = [{"name": "Resident 1", "username": "r1@example.com", "password": "x"}]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with patch.object(gym_reservation_cloud, 'cache_dir', temp_dir), \
+                 patch.dict(os.environ, {'WARM_POOL_LEAD_SECONDS': '300', 'SCHEDULER_RETRY_DELAYS': '30,60'}):
+                scheduler = ReservationScheduler(accounts)
+                job = scheduler.plan_account("Resident 1")
+                assert job["opening"] - job["run_at"] == 300
+                assert scheduler.plan_account("Resident 1") is None
+                
+                first_retry = scheduler.schedule_retry(job)
+                second_retry = scheduler.schedule_retry(first_retry)
+                assert second_retry["run_at"] - first_retry["run_at"] >= 29
+                assert scheduler.schedule_retry(second_retry) is None
+                
+                assert scheduler.cancel(second_retry["id"])
+                scheduler.save()
+                
+                restored = ReservationScheduler(accounts)
+                restored.load()
+                assert set(restored.jobs) == {job["id"], first_retry["id"]}
+                
+                # Only an unreserved run that a later run can fix is retried, while retries are left
+                assert scheduler.wants_retry(job, {"07:30-08:00": Outcome.TOO_EARLY, "08:00-08:30": Outcome.TAKEN_BY_OTHER})
+                assert not scheduler.wants_retry(job, {"07:30-08:00": Outcome.CONFIRMED, "08:00-08:30": Outcome.TIMEOUT})
+                assert not scheduler.wants_retry(job, {"07:30-08:00": Outcome.TAKEN_BY_OTHER, "08:00-08:30": Outcome.NOT_CONFIRMED})
+                assert not scheduler.wants_retry(second_retry, {"07:30-08:00": Outcome.TIMEOUT})
+                with patch.dict(os.environ, {'RETRY_POLICIES': 'timeout=0:0'}):
+                    assert not scheduler.wants_retry(job, {"07:30-08:00": Outcome.TIMEOUT})
+        
+        # A timed-out run is retried without an e-mail; the final run's result is e-mailed once
+        import asyncio
+        accounts = [{"name": "Resident 1", "username": "r1@example.com", "password": "x"}]
+        emailed = []
+        def run_scheduled_job(job, account, notify=None):
+            outcomes = {"07:30-08:00": Outcome.TIMEOUT}
+            emailed.append(notify(outcomes))
+            return outcomes
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with patch.object(gym_reservation_cloud, 'cache_dir', temp_dir), \
+                 patch.object(gym_reservation_cloud, 'run_scheduled_job', run_scheduled_job), \
+                 patch.dict(os.environ, {'SCHEDULER_RETRY_DELAYS': '30'}):
+                scheduler = ReservationScheduler(accounts)
+                job = scheduler.plan_account("Resident 1")
+                async def run_job(job):
+                    scheduler.wake = asyncio.Event()
+                    await scheduler._run_job(job)
+                asyncio.run(run_job(job))
+                retry = next(queued for queued in scheduler.jobs.values() if queued["kind"] == "retry")
+                asyncio.run(run_job(retry))
+                assert emailed == [False, True]
+                assert not any(queued["kind"] == "retry" for queued in scheduler.jobs.values())
+        
+        # Jobs of more accounts than MAX_CONCURRENT_ACCOUNTS all wait for the opening side by side
+        import threading
+        accounts = [{"name": f"Resident {number}", "username": f"r{number}@example.com", "password": "x"} for number in range(1, 4)]
+        at_opening = threading.Barrier(len(accounts), timeout=5)
+        def run_scheduled_job(job, account, notify=None):
+            at_opening.wait()
+            return {"07:30-08:00": Outcome.CONFIRMED}
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with patch.object(gym_reservation_cloud, 'cache_dir', temp_dir), \
+                 patch.object(gym_reservation_cloud, 'run_scheduled_job', run_scheduled_job), \
+                 patch.dict(os.environ, {'MAX_CONCURRENT_ACCOUNTS': '1'}):
+                scheduler = ReservationScheduler(accounts)
+                jobs = [scheduler.plan_account(account["name"]) for account in accounts]
+                async def run_jobs():
+                    scheduler.wake = asyncio.Event()
+                    await asyncio.gather(*(scheduler._run_job(job) for job in jobs))
+                asyncio.run(run_jobs())
+                assert not any(job["kind"] == "retry" for job in scheduler.jobs.values())
+        
+        logger.info("✅ Scheduler computes deadlines, backs off and persists its queue correctly")
+        return True
+    except Exception as e:
+        logger.error(f"❌ Scheduler deadlines failed: {e}")
+        return False
+
+def test_locator_registry():
+    """Test that the last successful locator strategy is tried first and persisted"""
+    logger.info("Testing locator registry...")
+    
+    try:
+        import tempfile
+        from gym_reservation_cloud import LocatorRegistry, LOCATOR_STRATEGIES, LOOSE_LOCATOR_STRATEGIES
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "locators.json")
+            registry = LocatorRegistry(path)
+            default_order = [name for name, xpath in LOCATOR_STRATEGIES["login_username"]]
+            assert [name for name, xpath in registry.ordered("login_username")] == default_order
+            
+            # Fallback found the field: it becomes the first strategy tried
+            registry.record("login_username", default_order[:2], default_order[1])
+            assert registry.ordered("login_username")[0][0] == default_order[1]
+            registry.record("login_username", [default_order[1]], default_order[1])
+            registry.save()
+            
+            reloaded = LocatorRegistry(path)
+            entry = reloaded.steps["login_username"]
+            assert reloaded.ordered("login_username")[0][0] == default_order[1]
+            assert entry["lookups"] == 2 and entry["first_try_hits"] == 1
+            assert entry["strategies"][default_order[0]] == {"hits": 0, "misses": 1}
+            assert entry["strategies"][default_order[1]] == {"hits": 2, "misses": 0}
+            
+            # A lookup where nothing matched keeps the preferred strategy
+            reloaded.record("login_username", default_order, None)
+            assert reloaded.steps["login_username"]["last"] == default_order[1]
+            
+            # A catch-all strategy that happened to match once is counted but never tried first
+            reloaded.record("login_username", default_order, default_order[-1])
+            assert reloaded.steps["login_username"]["last"] == default_order[1]
+            reloaded.steps["slot_button"] = {"last": "clickable_with_time"}
+            assert reloaded.ordered("slot_button") == LOCATOR_STRATEGIES["slot_button"]
+            assert LOOSE_LOCATOR_STRATEGIES <= {name for strategies in LOCATOR_STRATEGIES.values() for name, xpath in strategies}
+        
+        logger.info("✅ Locator registry prefers and persists known-good strategies")
+        return True
+    except Exception as e:
+        logger.error(f"❌ Locator registry failed: {e}")
+        return False
+
+def test_bounded_locator_waits():
+    """Test that lookups run without an implicit wait and a strategy chain shares one bounded wait"""
+    logger.info("Testing bounded locator waits...")
+    
+    try:
+        import gym_reservation_cloud
+        from gym_reservation_cloud import LocatorRegistry, LOCATOR_STRATEGIES
+        
+        account = make_test_account()
+        with isolated_engine_env(STEP_TIMEOUTS='slot=0.3') as temp_dir:
+            engine = gym_reservation_cloud.GymReservationCloud(account)
+            engine.locators = LocatorRegistry(os.path.join(temp_dir, "locators.json"))
+            
+            def setup_chrome_driver():
+                engine.driver = Mock()
+                engine.driver_type = "chrome"
+                return True
+            engine.setup_chrome_driver = setup_chrome_driver
+            engine.setup_driver()
+            engine.driver.implicitly_wait.assert_called_with(0)
+            
+            # Nothing matches: every strategy is checked on each poll, and the whole chain costs one budget
+            engine.driver.execute_script.return_value = None
+            started = time.monotonic()
+            assert engine.find_with_strategies("slot_button", time_slot="07:30-08:00") == []
+            assert 0.3 <= time.monotonic() - started < 0.6
+            xpaths = engine.driver.execute_script.call_args[0][1]
+            assert len(xpaths) == len(LOCATOR_STRATEGIES["slot_button"]) and all("07:30-08:00" in xpath for xpath in xpaths)
+            
+            # The second strategy matches: its elements are returned and it is tried first next time
+            button = Mock()
+            engine.driver.execute_script.return_value = [1, [button]]
+            assert engine.find_with_strategies("slot_button", time_slot="07:30-08:00") == [button]
+            assert engine.locators.ordered("slot_button")[0][0] == LOCATOR_STRATEGIES["slot_button"][1][0]
+        
+        logger.info("✅ Locator chains run as one bounded explicit wait")
+        return True
+    except Exception as e:
+        logger.error(f"❌ Bounded locator waits failed: {e}")
+        return False
+
+def test_slot_status_from_snapshot():
+    """Test reservation validation decisions made from a page snapshot"""
+    logger.info("Testing slot status from snapshot...")
+    
+    try:
+        from gym_reservation_cloud import get_slot_status, get_response_slot_status, is_advance_error_snapshot, describe_outcomes, Outcome
+        
+        def row(text, cells, buttons=()):
+            return {"text": text, "cells": cells, "buttons": [{"ref": "0", "tag": "button", "text": b} for b in buttons]}
+        
+        slot_rows = [
+            row("07:30-08:00 Confirmado para G-502", ["07:30-08:00", "Confirmado para G-502"]),
+            row("08:00-08:30 Disponible", ["08:00-08:30", "Disponible"], ["Disponible"]),
+            row("08:30-09:00 Confirmado para H-101", ["08:30-09:00", "Confirmado para H-101"]),
+            row("09:00-09:30 Ocupado", ["09:00-09:30", "Ocupado"]),
+        ]
+        # Outer layout row containing every slot must not be mistaken for a slot row
+        layout_row = row(" ".join(r["text"] for r in slot_rows), [" ".join(r["text"] for r in slot_rows)], ["Disponible"])
+        snapshot = {"url": "https://www.condomisoft.com/system/detalle_recursos.php", "text": "", "rows": [layout_row] + slot_rows, "buttons": []}
+        
+        def decision(attempt):
+            return attempt.outcome, attempt.message
+        
+        assert decision(get_slot_status(snapshot, "07:30-08:00", "G-502")) == (Outcome.CONFIRMED, "Confirmed successfully")
+        assert get_slot_status(snapshot, "07:30-08:00", "G-502").success
+        assert get_slot_status(snapshot, "08:00-08:30", "G-502").outcome is Outcome.NOT_CONFIRMED
+        assert decision(get_slot_status(snapshot, "08:30-09:00", "G-502")) == (Outcome.TAKEN_BY_OTHER, "Time slot confirmed for different apartment")
+        assert decision(get_slot_status(snapshot, "09:00-09:30", "G-502")) == (Outcome.TAKEN_BY_OTHER, "Time slot occupied by another user")
+        assert decision(get_slot_status(snapshot, "10:00-10:30", "G-502")) == (Outcome.SELECTOR_MISS, "Time slot not found in table")
+        
+        # A booking response settles a slot only when its row carries a final status
+        assert get_response_slot_status(snapshot, "07:30-08:00", "G-502").success
+        assert not get_response_slot_status(snapshot, "08:00-08:30", "G-502").success
+        confirm_form = dict(snapshot, rows=[row("Horario: 07:30-08:00", ["Horario:", "07:30-08:00"], ["Confirmar"])])
+        assert get_response_slot_status(confirm_form, "07:30-08:00", "G-502") is None
+        assert get_response_slot_status(snapshot, "10:00-10:30", "G-502") is None
+        
+        # Notifications explain failures from the outcomes
+        results = {
+            "07:30-08:00": {"success": True, "message": "Confirmed successfully", "outcome": "confirmed"},
+            "08:00-08:30": {"success": False, "message": "Time slot occupied by another user", "outcome": "taken_by_other"},
+            "08:30-09:00": {"success": False, "message": "", "outcome": None},
+        }
+        assert describe_outcomes(results) == "08:00-08:30: already taken by another user"
+        
+        assert not is_advance_error_snapshot(snapshot)
+        assert is_advance_error_snapshot(dict(snapshot, text="Error: No se acepta reservaciones con más de 7 días de anticipación"))
+        
+        logger.info("✅ Slot status decisions from snapshots are correct")
+        return True
+    except Exception as e:
+        logger.error(f"❌ Slot status from snapshot failed: {e}")
+        return False
+
+def test_lean_profile():
+    """Test that the lean browser profile loads pages eagerly and blocks non-essential requests"""
+    logger.info("Testing lean browser profile...")
+    
+    try:
+        import gym_reservation_cloud
+        from gym_reservation_cloud import LEAN_BLOCKED_URL_PATTERNS
+        
+        account = make_test_account()
+        with isolated_engine_env(BROWSER_PROFILE='lean', LEAN_BLOCKED_URLS='*widgets.example.com*, '):
+            os.environ.pop('PAGE_LOAD_STRATEGY', None)
+            engine = gym_reservation_cloud.GymReservationCloud(account)
+            assert engine.page_load_strategy == "eager"
+            
+            engine.driver = Mock()
+            engine.driver_type = "chrome"
+            engine.block_lean_resources()
+            engine.driver.execute_cdp_cmd.assert_called_with('Network.setBlockedURLs', {'urls': LEAN_BLOCKED_URL_PATTERNS + ['*widgets.example.com*']})
+            assert "*.png" in LEAN_BLOCKED_URL_PATTERNS and not any(pattern.endswith(('.js', '.css')) for pattern in LEAN_BLOCKED_URL_PATTERNS)
+            
+            # Firefox relies on its preferences instead of DevTools
+            engine.driver = Mock()
+            engine.driver_type = "firefox"
+            engine.block_lean_resources()
+            assert not engine.driver.execute_cdp_cmd.called
+            
+            with patch.dict(os.environ, {'BROWSER_PROFILE': 'standard'}):
+                assert gym_reservation_cloud.GymReservationCloud(account).page_load_strategy == "normal"
+            
+            # Cloud and lean flags overlap; Chrome gets each argument once
+            with patch.dict(os.environ, {'RENDER': 'true'}), \
+                    patch.object(gym_reservation_cloud, 'get_cached_driver_path', return_value="/usr/bin/chromedriver"), \
+                    patch.object(gym_reservation_cloud.webdriver, 'Chrome') as chrome:
+                assert gym_reservation_cloud.GymReservationCloud(account).setup_chrome_driver()
+            arguments = chrome.call_args.kwargs["options"].arguments
+            assert len(arguments) == len(set(arguments))
+            assert {"--disable-gpu", "--blink-settings=imagesEnabled=false", "--disable-remote-fonts"} <= set(arguments)
+            assert len([argument for argument in arguments if argument.startswith("--disable-features=")]) == 1
+        
+        logger.info("✅ Lean profile blocks images, fonts and trackers but keeps first-party scripts")
+        return True
+    except Exception as e:
+        logger.error(f"❌ Lean browser profile failed: {e}")
+        return False
+
+def test_page_load_strategy():
+    """Test the configurable page-load strategy and per-navigation readiness targets"""
+    logger.info("Testing page-load strategy...")
+    
+    try:
+        import gym_reservation_cloud
+        from selenium.common.exceptions import StaleElementReferenceException
+        from gym_reservation_cloud import PAGE_READY_LOCATORS
+        
+        account = make_test_account()
+        with isolated_engine_env(BROWSER_PROFILE='standard', STEP_TIMEOUTS='calendar=0.3'):
+            for configured, expected in (("none", "none"), ("EAGER", "eager"), ("bogus", "normal")):
+                with patch.dict(os.environ, {'PAGE_LOAD_STRATEGY': configured}):
+                    assert gym_reservation_cloud.GymReservationCloud(account).page_load_strategy == expected
+            
+            engine = gym_reservation_cloud.GymReservationCloud(account)
+            old_root = Mock()
+            calendar_cell = Mock()
+            engine.driver = Mock()
+            engine.driver.find_element.return_value = old_root
+            engine.driver.find_elements.return_value = [calendar_cell]
+            
+            # Navigation returns as soon as the new document shows its readiness target
+            def load(url):
+                old_root.is_enabled.side_effect = StaleElementReferenceException()
+            engine.driver.get.side_effect = load
+            started = time.monotonic()
+            assert engine.navigate(engine.reservation_url, PAGE_READY_LOCATORS["calendar"], "calendar", "Reservation page") == [calendar_cell]
+            assert time.monotonic() - started < 0.3
+            engine.driver.find_elements.assert_called_with(*PAGE_READY_LOCATORS["calendar"])
+            
+            # The page being replaced never counts as ready, even if it matches the target
+            old_root.is_enabled.side_effect = None
+            engine.driver.get.side_effect = None
+            assert engine.navigate(engine.reservation_url, PAGE_READY_LOCATORS["calendar"], "calendar", "Reservation page") is None
+        
+        logger.info("✅ Page-load strategy and readiness targets behave correctly")
+        return True
+    except Exception as e:
+        logger.error(f"❌ Page-load strategy failed: {e}")
+        return False
+
+def test_driver_cache():
+    """Test that a working driver is reused until the browser's major version changes"""
+    logger.info("Testing driver cache...")
+    
+    try:
+        import tempfile
+        import gym_reservation_cloud
+        
+        capabilities = {"browserVersion": "120.0.6099.109", "chrome": {"chromedriverVersion": "120.0.6099.109 (abc123)"}}
+        with tempfile.TemporaryDirectory() as temp_dir:
+            driver_path = os.path.join(temp_dir, "chromedriver")
+            with open(driver_path, 'w') as driver_file:
+                driver_file.write("#!/bin/sh\n")
+            os.chmod(driver_path, 0o755)
+            
+            with patch.object(gym_reservation_cloud, 'cache_dir', temp_dir):
+                assert gym_reservation_cloud.get_cached_driver_path("chrome") is None
+                gym_reservation_cloud.record_working_driver("chrome", driver_path, capabilities)
+                
+                with patch.object(gym_reservation_cloud, 'get_browser_version', return_value="120.0.6099.200"):
+                    assert gym_reservation_cloud.get_cached_driver_path("chrome") == driver_path
+                with patch.object(gym_reservation_cloud, 'get_browser_version', return_value="121.0.6167.85"):
+                    assert gym_reservation_cloud.get_cached_driver_path("chrome") is None
+                
+                gym_reservation_cloud.forget_cached_driver("chrome")
+                with patch.object(gym_reservation_cloud, 'get_browser_version', return_value="120.0.6099.200"):
+                    assert gym_reservation_cloud.get_cached_driver_path("chrome") is None
+        
+        logger.info("✅ Driver cache reuses and invalidates drivers correctly")
+        return True
+    except Exception as e:
+        logger.error(f"❌ Driver cache failed: {e}")
+        return False
+
+def test_browser_profile():
+    """Test persistent browser profile locking and size trimming"""
+    logger.info("Testing browser profile...")
+    
+    try:
+        import tempfile
+        import gym_reservation_cloud
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with patch.object(gym_reservation_cloud, 'cache_dir', temp_dir), \
+                 patch.dict(os.environ, {'PROFILE_MAX_MB': '1'}):
+                profile = gym_reservation_cloud.BrowserProfile('test@example.com')
+                assert profile.acquire()
+                assert not gym_reservation_cloud.BrowserProfile('test@example.com').acquire()
+                
+                cache_path = os.path.join(profile.path, "Default", "Cache")
+                os.makedirs(cache_path)
+                with open(os.path.join(cache_path, "data_1"), 'wb') as cache_file:
+                    cache_file.write(b"0" * 2 * 1024 * 1024)
+                with open(os.path.join(profile.path, "Default", "Cookies"), 'wb') as cookie_file:
+                    cookie_file.write(b"cookies")
+                profile.release()
+                
+                # Re-acquiring trims the oversized cache but keeps the cookies
+                reopened = gym_reservation_cloud.BrowserProfile('test@example.com')
+                assert reopened.acquire()
+                assert not os.path.exists(cache_path)
+                assert os.path.exists(os.path.join(reopened.path, "Default", "Cookies"))
+                reopened.release()
+                
+                # A Chrome that fails to start hands the profile back before the Firefox fallback
+                account = make_test_account()
+                with patch.dict(os.environ, {'SESSION_CACHE_ENABLED': 'false', 'PERSISTENT_PROFILE': 'true'}), \
+                        patch.object(gym_reservation_cloud, 'get_cached_driver_path', return_value=None), \
+                        patch.object(gym_reservation_cloud, 'resolve_managed_driver_path', side_effect=Exception("no chromedriver")), \
+                        patch.object(gym_reservation_cloud.os.path, 'exists', side_effect=lambda path: "chromedriver" not in path and os.path.lexists(path)):
+                    engine = gym_reservation_cloud.GymReservationCloud(account)
+                    assert not engine.setup_chrome_driver()
+                assert engine.profile is None
+                assert gym_reservation_cloud.BrowserProfile('test@example.com').acquire()
+        
+        logger.info("✅ Browser profile locks and trims correctly")
+        return True
+    except Exception as e:
+        logger.error(f"❌ Browser profile failed: {e}")
+        return False
+
 def main():
     """Run all tests"""
     logger.info("🚀 Starting cloud version logic tests...")
@@ -144,7 +1437,32 @@ def main():
         ("Environment Variables", test_environment_variables),
         ("Timezone Logic", test_timezone_logic),
         ("Email Formatting", test_email_formatting),
-        ("Date Calculation", test_date_calculation)
+        ("Date Calculation", test_date_calculation),
+        ("Warm Pool", test_warm_pool),
+        ("Readiness Waits", test_readiness_waits),
+        ("HTTP Page Parsing", test_http_page_parsing),
+        ("HTTP Nested Slot Rows", test_http_nested_slot_rows),
+        ("Booking Engine Fallback", test_booking_engine_fallback),
+        ("Session Cache", test_session_cache),
+        ("Precise Launcher", test_precise_launcher),
+        ("Clock Offset Estimation", test_clock_offset_estimation),
+        ("Multi-Account Loading", test_multi_account_loading),
+        ("Resource Index", test_resource_index),
+        ("Scheduler Deadlines", test_scheduler_deadlines),
+        ("Locator Registry", test_locator_registry),
+        ("Bounded Locator Waits", test_bounded_locator_waits),
+        ("Slot Status From Snapshot", test_slot_status_from_snapshot),
+        ("Lean Browser Profile", test_lean_profile),
+        ("Page Load Strategy", test_page_load_strategy),
+        ("Driver Cache", test_driver_cache),
+        ("Browser Profile", test_browser_profile),
+        ("Calendar Pre-positioning", test_calendar_preposition),
+        ("Day Page Links", test_day_url_template),
+        ("Availability Polling", test_availability_polling),
+        ("Deferred Validation", test_deferred_validation),
+        ("Session Retry", test_session_retry),
+        ("Retries Settled From Grid", test_run_with_retries),
+        ("Email Notifier", test_email_notifier)
     ]
     
     passed = 0